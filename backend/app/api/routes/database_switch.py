@@ -1,13 +1,18 @@
 """
 Database switching API routes.
 UPDATED: Properly handles session clearing with database context
+UPDATED: Invalidates cached SQL results of the database switched to
+UPDATED: The switch only updates app state; requests pass its connection string to db_service
+UPDATED: Switching sets the default for new sessions and no longer clears every session
+UPDATED: /databases includes each database's last probed health
+UPDATED: Database names that aren't plain identifiers or aren't allowed are rejected with 400
 """
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
+from typing import Optional
 import logging
 
 from app.core.logging import configure_logging
-from app.core.config import get_settings
 
 # Configure logging
 logger = configure_logging(logger_name="db-switch-routes")
@@ -17,6 +22,7 @@ router = APIRouter()
 
 class DatabaseSwitchRequest(BaseModel):
     database: str
+    session_id: Optional[str] = None  # Also rebind this session (cleared) to the database
 
 class DatabaseSwitchResponse(BaseModel):
     status: str
@@ -27,36 +33,34 @@ class DatabaseSwitchResponse(BaseModel):
 @router.post("/switch-database", response_model=DatabaseSwitchResponse)
 async def switch_database(request: Request, switch_request: DatabaseSwitchRequest):
     """
-    Switch to a different database and clear all sessions
+    Switch the database new sessions are created on
     UPDATED: Passes database context when clearing sessions
-    
+    UPDATED: Sessions keep their own database - only the given session_id (if any) is rebound
+
     Args:
         request: FastAPI request object
         switch_request: Database switch request
-        
+
     Returns:
         DatabaseSwitchResponse with switch result
     """
+    from app.services.database_registry import validate_database_name
+
     database_name = switch_request.database.strip().lower()
     logger.info(f"Database switch requested: {database_name}")
 
+    invalid = validate_database_name(database_name)
+    if invalid:
+        raise HTTPException(status_code=400, detail=invalid)
+
     try:
         # Import here to avoid circular imports
-        from app.services.schema_discovery import discover_database_schema_with_connection
-        from app.services.ai_service import clear_all_sessions
-        from app.services.db_service import set_connection_string
-
-        # Build new connection string
-        settings = get_settings()
-        new_connection_string = settings.build_connection_string(database_name)
-
-        if not new_connection_string:
-            raise HTTPException(status_code=400, detail="Could not build connection string")
+        from app.services.ai_service import clear_session, llm_client
+        from app.services.database_registry import discover_database
+        from app.services.db_service import invalidate_result_cache
 
-        logger.info(f"Built connection string for database: {database_name}")
-
-        # Discover schema with new connection first (to validate connection)
-        schema_context, error = discover_database_schema_with_connection(new_connection_string)
+        # Rediscover the schema (validating the connection) and register it alongside the others
+        target, error = await discover_database(database_name)
 
         if error:
             logger.error(f"Schema discovery failed for {database_name}: {error}")
@@ -66,18 +70,24 @@ async def switch_database(request: Request, switch_request: DatabaseSwitchReques
                 message=f"Failed to connect to database '{database_name}': {error}"
             )
 
-        # Update app state FIRST (before clearing sessions)
+        schema_context = target["context"]
+
+        # Drop cached results so the refreshed database doesn't serve data from before the switch
+        invalidate_result_cache(target["connection_string"])
+
+        # New sessions start on this database; existing sessions stay on theirs
         request.app.state.db_context = schema_context
         request.app.state.current_database = database_name
-        request.app.state.current_connection_string = new_connection_string
+        request.app.state.current_connection_string = target["connection_string"]
 
-        # Update the global connection string in db_service
-        set_connection_string(new_connection_string)
+        # Refresh the cached schema prompt so sessions pick up the rediscovered schema
+        await llm_client.invalidate_context_cache(database_name)
 
-        # Clear all existing chat sessions AFTER updating app state
-        # This ensures any new sessions created will use the new database context
-        cleared_count = clear_all_sessions()
-        logger.info(f"Cleared {cleared_count} chat sessions for database switch to: {database_name}")
+        # Rebind the caller's session to the new database with clean history
+        rebound = False
+        if switch_request.session_id:
+            rebound = await clear_session(switch_request.session_id, database_name, schema_context)
+            logger.info(f"Rebound session {switch_request.session_id[:8]}... to database: {database_name}")
 
         # Create preview of schema (first 500 chars)
         schema_preview = schema_context[:500] + "..." if len(schema_context) > 500 else schema_context
@@ -93,7 +103,9 @@ async def switch_database(request: Request, switch_request: DatabaseSwitchReques
         return DatabaseSwitchResponse(
             status="success",
             database=database_name,
-            message=f"Successfully switched to database '{database_name}'. All sessions cleared and database-specific rules applied.",
+            message=(f"Successfully switched to database '{database_name}'. New sessions use it"
+                     f"{' and your session was rebound to it' if rebound else ''}; "
+                     f"other sessions keep their database. Database-specific rules applied."),
             schema_preview=schema_preview
         )
 
@@ -102,6 +114,23 @@ async def switch_database(request: Request, switch_request: DatabaseSwitchReques
         logger.error(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
+@router.get("/databases")
+async def list_registered_databases(request: Request):
+    """Databases with a loaded schema, and how many sessions are bound to each"""
+    from app.services.ai_service import get_session_count
+    from app.services.database_registry import database_connection_strings, list_databases
+    from app.services.health_monitor import get_health
+
+    return {
+        "current_database": getattr(request.app.state, 'current_database', 'pa'),
+        "databases": list_databases(),
+        "sessions": get_session_count()["by_database"],
+        "health": {
+            database_name: get_health(connection_string)
+            for database_name, connection_string in database_connection_strings().items()
+        }
+    }
+
 @router.get("/current-database")
 async def get_current_database(request: Request):
     """Get currently selected database with rule information"""
@@ -1,13 +1,39 @@
 """
 Database query API routes.
 UPDATED: Now passes current database to AI service
+UPDATED: Added /chat/stream Server-Sent Events endpoint
+UPDATED: Added /interpretation/{id} for deferred result interpretation
+UPDATED: Added /chat/batch streaming NDJSON results for many questions
+UPDATED: Added /results/{cursor_id} for paging through large results
+UPDATED: Added /cache/flush for the SQL result cache
+UPDATED: Chat queries are cancelled if the client disconnects
+UPDATED: Each request passes the current database's connection string along explicitly
+UPDATED: Requests run against their session's database, not a process-wide one
+UPDATED: /status checks off the event loop and reports the database's circuit breaker
+UPDATED: /status serves the background prober's last result; ?fresh=1 probes live
+UPDATED: /cache/flush looks a database's cache key up in the registry; unknown databases are 404
 """
-from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from typing import Optional
 import logging
+import time
 
-from app.models.api import ChatMessage, ChatResponse, ClearRequest
-from app.services.ai_service import process_db_message, clear_session
-from app.services.db_service import check_database_connection
+from app.core.config import get_settings
+from app.models.api import BatchChatRequest, ChatMessage, ChatResponse, ClearRequest, InterpretationResponse, ResultPage
+from app.services.ai_service import (
+    clear_session,
+    process_db_message,
+    resolve_session_database,
+    stream_db_batch,
+    stream_db_message
+)
+from app.services.database_registry import get_database
+from app.services.db_service import get_circuit_state, get_result_cache_stats, invalidate_result_cache
+from app.services.health_monitor import get_health, probe_health
+from app.services.interpretation_service import get_interpretation
+from app.services.result_cursor_store import get_result_cursor_store
+from app.utils.ndjson import ndjson_response
+from app.utils.sse import sse_response
 from app.core.logging import configure_logging
 
 # Configure logging
@@ -17,21 +43,30 @@ logger = configure_logging(logger_name="db-query-routes")
 router = APIRouter()
 
 @router.get("/status")
-async def db_status():
-    """Check database connection status"""
-    db_connected = check_database_connection()
+async def db_status(request: Request, fresh: bool = Query(False, description="Probe the database now instead of serving the last result")):
+    """
+    Database connection status, probe latency and the circuit breaker state
+    Served from the background prober's last result unless fresh is set
+    """
+    connection_string = getattr(request.app.state, 'current_connection_string', None)
 
-    if db_connected:
-        return {"status": "connected"}
-    else:
-        return {"status": "disconnected"}
+    health = None if fresh else get_health(connection_string)
+    if health is None or get_settings().DB_HEALTH_PROBE_INTERVAL_SECONDS <= 0:
+        health = await probe_health(connection_string)
+
+    return {
+        **health,
+        "checked_seconds_ago": round(time.time() - health["checked_at"], 1),
+        "circuit_breaker": get_circuit_state(connection_string)
+    }
 
 @router.post("/chat", response_model=ChatResponse)
 async def db_chat(request: Request, chat_request: ChatMessage):
     """
     Process a database chat message and return the response
     UPDATED: Now passes current database to AI service
-    
+    UPDATED: Uses the session's database (or chat_request.database), with its own schema context
+
     Args:
         request: FastAPI request object
         chat_request: Chat message request
@@ -42,28 +77,145 @@ async def db_chat(request: Request, chat_request: ChatMessage):
     request_id = chat_request.session_id or "new"
     logger.info(f"DB Chat [{request_id[:8]}]: '{chat_request.message[:30]}...'")
 
-    # Access the context and current database from the app state
-    context = request.app.state.db_context
-    current_database = getattr(request.app.state, 'current_database', 'pa')  # Default to 'pa'
+    # The session's database, or the current one for new sessions
+    current_database, target = await _resolve_database(request, chat_request.session_id, chat_request.database)
 
     logger.info(f"Processing request for database: {current_database}")
 
     # Process the message with database-specific instructions
-    response = process_db_message(
+    response = await process_db_message(
         chat_request.message,
         chat_request.session_id,
-        context,
-        current_database  # ← NEW: Pass current database
+        target["context"],
+        current_database,  # ← NEW: Pass current database
+        chat_request.defer_interpretation,
+        request.is_disconnected,
+        target["connection_string"]
     )
 
     return response
 
+async def _resolve_database(request: Request, session_id: Optional[str], requested_database: Optional[str]):
+    """Database name and registry entry for a request; 400 if the database can't be used"""
+    default_database = getattr(request.app.state, 'current_database', 'pa')
+    database_name, target, error = await resolve_session_database(session_id, requested_database, default_database)
+
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    return database_name, target
+
+@router.get("/interpretation/{interpretation_id}", response_model=InterpretationResponse)
+async def db_interpretation(interpretation_id: str):
+    """
+    Get the AI interpretation for a /chat response sent with defer_interpretation
+    Computed on first request (or in the background when prefetch is enabled)
+    """
+    result = await get_interpretation(interpretation_id)
+
+    if result is None:
+        raise HTTPException(status_code=404, detail="Interpretation not found or expired")
+
+    return InterpretationResponse(interpretation_id=interpretation_id, **result)
+
+@router.get("/results/{cursor_id}", response_model=ResultPage)
+async def db_results(
+        cursor_id: str,
+        offset: int = Query(0, ge=0),
+        limit: int = Query(100, ge=1),
+        sort: Optional[str] = Query(None, description="Column to sort by, prefix with '-' for descending"),
+        filter: Optional[str] = Query(None, description="Keep rows containing this text (case-insensitive)"),
+        filter_column: Optional[str] = Query(None, description="Only match the filter against this column")
+):
+    """
+    Get a page of a result kept server-side
+    /db/chat returns the first page and a cursor_id when a result is larger than one page
+    """
+    limit = min(limit, get_settings().RESULT_PAGE_MAX_LIMIT)
+    page, error = get_result_cursor_store().page(cursor_id, offset, limit, sort, filter, filter_column)
+
+    if error:
+        raise HTTPException(status_code=400, detail=error)
+    if page is None:
+        raise HTTPException(status_code=404, detail="Result cursor not found or expired")
+
+    return page
+
+@router.post("/chat/stream")
+async def db_chat_stream(request: Request, chat_request: ChatMessage):
+    """
+    Stream a database chat response as Server-Sent Events
+
+    Emits "session", "sql_generated", "sql_result" (or "sql_error"), "result_cursor"
+    when the result is paged, then the interpretation as "token" events and
+    finally "done" with the full ChatResponse.
+    """
+    request_id = chat_request.session_id or "new"
+    logger.info(f"DB Chat stream [{request_id[:8]}]: '{chat_request.message[:30]}...'")
+
+    current_database, target = await _resolve_database(request, chat_request.session_id, chat_request.database)
+
+    return sse_response(stream_db_message(
+        chat_request.message,
+        chat_request.session_id,
+        target["context"],
+        current_database,
+        request.is_disconnected,
+        target["connection_string"]
+    ))
+
+@router.post("/chat/batch")
+async def db_chat_batch(request: Request, batch_request: BatchChatRequest):
+    """
+    Answer many questions against the current database in one request
+
+    Questions run concurrently (identical ones once) and results stream back as
+    NDJSON lines in completion order; each line's "indices" maps it to the request.
+    """
+    questions = batch_request.questions
+    max_questions = get_settings().BATCH_MAX_QUESTIONS
+
+    if not questions:
+        raise HTTPException(status_code=400, detail="At least one question is required")
+    if len(questions) > max_questions:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {max_questions} questions")
+
+    current_database, target = await _resolve_database(request, None, batch_request.database)
+
+    logger.info(f"DB Chat batch: {len(questions)} questions for database: {current_database}")
+
+    return ndjson_response(stream_db_batch(
+        questions,
+        target["context"],
+        current_database,
+        batch_request.defer_interpretation,
+        target["connection_string"]
+    ))
+
+@router.post("/cache/flush")
+async def flush_result_cache(database: Optional[str] = None):
+    """
+    Drop cached SQL results
+    Flushes one database when given, otherwise every database
+    """
+    if database:
+        # Results are keyed by the registered connection string, which a rebuilt one may not match
+        entry = get_database(database.strip().lower())
+        if entry is None:
+            raise HTTPException(status_code=404, detail=f"Database '{database}' is not registered")
+        flushed = invalidate_result_cache(entry["connection_string"])
+    else:
+        flushed = invalidate_result_cache()
+
+    logger.info(f"Flushed {flushed} cached SQL results{f' for database: {database}' if database else ''}")
+    return {"status": "flushed", "entries_flushed": flushed, "cache": get_result_cache_stats()}
+
 @router.post("/clear")
 async def clear_db_chat(request: Request, clear_request: ClearRequest):
     """
     Clear a database chat session
     UPDATED: Now passes current database for proper session recreation
-    
+    UPDATED: The session keeps the database it was bound to
+
     Args:
         request: FastAPI request object
         clear_request: Clear request with session ID
@@ -76,10 +228,10 @@ async def clear_db_chat(request: Request, clear_request: ClearRequest):
     if not session_id:
         raise HTTPException(status_code=400, detail="Session ID is required")
 
-    # Get current database for proper session recreation
-    current_database = getattr(request.app.state, 'current_database', 'pa')
+    # Get the session's database and schema for proper session recreation
+    current_database, target = await _resolve_database(request, session_id, None)
 
-    success = clear_session(session_id, current_database)  # ← NEW: Pass current database
+    success = await clear_session(session_id, current_database, target["context"])
 
     if success:
         logger.info(f"Cleared DB chat session: {session_id[:8]} for database: {current_database}")
@@ -7,9 +7,10 @@ import uuid
 import os
 
 from app.models.api import ChatMessage, ChatResponse, ClearRequest, FileUploadResponse, FileInfo
-from app.services.ai_service import process_file_message, process_file_upload, clear_session
+from app.services.ai_service import process_file_message, process_file_upload, stream_file_message, clear_session
 from app.services.file_service import ensure_upload_folder
 from app.utils.file_processor import process_file
+from app.utils.sse import sse_response
 from app.core.logging import configure_logging
 
 # Configure logging
@@ -60,7 +61,7 @@ async def upload_file(
             f.write(await file.read())
         
         # Get AI analysis
-        response = process_file_upload(text_representation, session_id)
+        response = await process_file_upload(text_representation, session_id)
         
         # Create file info
         file_info = FileInfo(
@@ -103,10 +104,28 @@ async def file_chat(chat_request: ChatMessage):
     logger.info(f"File chat [{session_id[:8]}]: '{chat_request.message[:30]}...'")
     
     # Process message
-    response = process_file_message(chat_request.message, session_id)
+    response = await process_file_message(chat_request.message, session_id)
     
     return response
 
+@router.post("/chat/stream")
+async def file_chat_stream(chat_request: ChatMessage):
+    """
+    Stream a file analysis chat response as Server-Sent Events
+    Emits "session", then "token" events and finally "done"
+    """
+    session_id = chat_request.session_id
+
+    if not session_id:
+        raise HTTPException(
+            status_code=400,
+            detail="Session ID is required. Please upload a file first."
+        )
+
+    logger.info(f"File chat stream [{session_id[:8]}]: '{chat_request.message[:30]}...'")
+
+    return sse_response(stream_file_message(chat_request.message, session_id))
+
 @router.post("/clear")
 async def clear_file_chat(clear_request: ClearRequest):
     """
@@ -123,7 +142,7 @@ async def clear_file_chat(clear_request: ClearRequest):
     if not session_id:
         raise HTTPException(status_code=400, detail="Session ID is required")
     
-    success = clear_session(session_id)
+    success = await clear_session(session_id)
     
     if success:
         logger.info(f"Cleared file chat session: {session_id[:8]}")
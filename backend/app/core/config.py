@@ -5,6 +5,7 @@ UPDATED: Fixed Pydantic BaseSettings import
 import os
 from pydantic_settings import BaseSettings  # ← Fixed import
 import re
+from typing import Dict, List, Optional, Tuple
 
 class Settings(BaseSettings):
     """Application settings loaded from environment variables"""
@@ -14,12 +15,136 @@ class Settings(BaseSettings):
     API_PORT: int = 8000
     BASE_URL: str = "http://localhost:8000"
 
+    # LLM backend: "gemini" or "mock" (offline load testing, no key or quota needed)
+    LLM_BACKEND: str = "gemini"
+
     # Gemini API Configuration
-    GEMINI_API_KEY: str
+    GEMINI_API_KEY: str = ""  # Required when LLM_BACKEND is "gemini"
     GEMINI_MODEL: str = "gemini-2.5-pro-experimental"
 
+    # Schema prompt context caching: "gemini", "local" (offline fake) or "off"
+    GEMINI_CONTEXT_CACHE: str = "gemini"
+    GEMINI_CONTEXT_CACHE_TTL_SECONDS: int = 3600
+
+    # Gemini admission control (a rate of 0 disables that limit)
+    GEMINI_MAX_IN_FLIGHT: int = 8
+    GEMINI_REQUESTS_PER_MINUTE: int = 60
+    GEMINI_TOKENS_PER_MINUTE: int = 1_000_000
+    GEMINI_MAX_RETRIES: int = 3
+    GEMINI_BACKOFF_BASE_SECONDS: float = 1.0
+    GEMINI_BACKOFF_MAX_SECONDS: float = 30.0
+    GEMINI_QUEUE_TIMEOUT_SECONDS: float = 60.0
+
+    # Mock LLM Configuration (LLM_BACKEND=mock)
+    # Latency distribution: "fixed", "uniform" (0..2x median) or "lognormal"
+    MOCK_LLM_LATENCY_DISTRIBUTION: str = "lognormal"
+    MOCK_LLM_LATENCY_MEDIAN_MS: float = 800.0
+    MOCK_LLM_LATENCY_SIGMA: float = 0.5
+    MOCK_LLM_FAILURE_RATE: float = 0.0  # Fraction of calls failing with a 503
+    MOCK_LLM_SEED: Optional[int] = None  # Fixed seed makes latencies and failures reproducible
+    MOCK_LLM_SQL: str = "SELECT TOP 10 TABLE_SCHEMA, TABLE_NAME FROM INFORMATION_SCHEMA.TABLES"
+
     # Database Configuration
     DB_CONNECTION_STRING: str
+    DB_MAX_WORKERS: int = 8  # Bounded thread pool for blocking pyodbc calls
+
+    # Connection pool per connection string (sized to match DB_MAX_WORKERS by default)
+    DB_POOL_ENABLED: bool = True
+    DB_POOL_MIN_SIZE: int = 1  # Idle connections kept open past the idle timeout
+    DB_POOL_MAX_SIZE: int = 8
+    DB_POOL_IDLE_TIMEOUT_SECONDS: int = 300
+    DB_POOL_VALIDATE_AFTER_SECONDS: int = 30  # Liveness-check connections idle longer than this on checkout
+    DB_POOL_ACQUIRE_TIMEOUT_SECONDS: int = 30
+
+    # Read replicas per database (JSON), e.g. {"pa": [{"role": "replica", "connection_string": "..."}]}
+    # SELECTs go to the least-busy healthy replica, everything else to the primary
+    DB_ENDPOINTS: Dict[str, List[Dict[str, str]]] = {}
+    DB_ENDPOINT_EJECT_AFTER_FAILURES: int = 3  # Consecutive connection failures before a replica is ejected
+    DB_ENDPOINT_EJECT_SECONDS: int = 30
+
+    # Transient errors (connection loss, deadlocks) are retried with full-jitter backoff;
+    # syntax/permission errors never are
+    DB_CONNECT_TIMEOUT_SECONDS: int = 10  # Login timeout, so a dead server fails instead of hanging
+    DB_RETRY_MAX_ATTEMPTS: int = 3
+    DB_RETRY_BACKOFF_BASE_SECONDS: float = 0.5
+    DB_RETRY_BACKOFF_MAX_SECONDS: float = 5.0
+
+    # Background health probe of every registered database; /db/status serves the last result (0 = probe per request)
+    DB_HEALTH_PROBE_INTERVAL_SECONDS: float = 15.0
+
+    # Circuit breaker per database: fail fast after repeated connection failures
+    DB_BREAKER_FAILURE_THRESHOLD: int = 5
+    DB_BREAKER_RESET_SECONDS: int = 30  # Open time before a half-open probe query is let through
+
+    # Query timeouts (0 disables); per-database overrides are JSON, e.g. {"erp_icad": 120}
+    DB_QUERY_TIMEOUT_SECONDS: int = 30
+    DB_QUERY_TIMEOUTS: Dict[str, int] = {}
+    DB_CANCEL_POLL_SECONDS: float = 0.5  # How often a running query checks for client disconnects
+
+    # Databases clients may bind sessions or switch to, JSON list (empty = any plain identifier)
+    DB_ALLOWED_DATABASES: List[str] = []
+    # Seconds before a database whose schema discovery failed is tried again for chat requests
+    DB_DISCOVERY_RETRY_SECONDS: int = 60
+
+    # SQL result cache for chat SELECTs (TTL 0 disables); table TTLs are JSON, e.g. {"Employees": 600}
+    SQL_RESULT_CACHE_ENABLED: bool = True
+    SQL_RESULT_CACHE_TTL_SECONDS: int = 60
+    SQL_RESULT_CACHE_TABLE_TTLS: Dict[str, int] = {}
+    SQL_RESULT_CACHE_MAX_BYTES: int = 128 * 1024 * 1024
+
+    # Result fetching: rows are streamed with fetchmany and capped per query
+    DB_FETCH_BATCH_SIZE: int = 500
+    DB_MAX_RESULT_ROWS: int = 10000
+    DB_MAX_RESULT_BYTES: int = 32 * 1024 * 1024
+    # Rows to count past the cap for an exact total; 0 stops at the cap and reports a lower bound
+    # (counting streams every extra row from the server, the cost the cap is there to avoid)
+    DB_COUNT_TRUNCATED_ROWS_LIMIT: int = 0
+
+    # NL->SQL Cache Configuration
+    QUERY_CACHE_ENABLED: bool = True
+    QUERY_CACHE_PATH: str = "query_cache.sqlite3"
+    QUERY_CACHE_MAX_ENTRIES: int = 5000
+    QUERY_CACHE_TTL_SECONDS: int = 7 * 24 * 3600
+
+    # Schema Pruning Configuration
+    # Overrides are JSON, e.g. {"erp_icad": {"top_k": 12, "max_tokens": 8000}}
+    SCHEMA_PRUNING_ENABLED: bool = True
+    SCHEMA_PRUNING_TOP_K: int = 8
+    SCHEMA_PRUNING_MAX_TOKENS: int = 6000
+    SCHEMA_PRUNING_OVERRIDES: Dict[str, Dict[str, int]] = {}
+    SCHEMA_SYNONYMS: Dict[str, List[str]] = {}
+
+    # Token budget for the SQL result digest sent to Gemini for interpretation
+    RESULT_DIGEST_MAX_TOKENS: int = 2000
+
+    # Result Cursor Configuration - results over one page stay server-side
+    RESULT_PAGE_SIZE: int = 100
+    RESULT_PAGE_MAX_LIMIT: int = 1000
+    RESULT_CURSOR_TTL_SECONDS: int = 900
+    RESULT_CURSOR_MAX_BYTES: int = 256 * 1024 * 1024
+
+    # Deferred Interpretation Configuration
+    INTERPRETATION_TTL_SECONDS: int = 900
+    INTERPRETATION_PREFETCH: bool = False  # Compute eagerly instead of on first fetch
+
+    # Include per-stage timings and token counts in /db/chat responses
+    REQUEST_TIMINGS_IN_RESPONSE: bool = True
+
+    # Batch Question Configuration (Gemini and DB limits still apply underneath)
+    BATCH_MAX_QUESTIONS: int = 500
+    BATCH_MAX_CONCURRENCY: int = 16
+
+    # Session Store Configuration
+    SESSION_MAX_SESSIONS: int = 500
+    SESSION_MAX_BYTES: int = 256 * 1024 * 1024
+    SESSION_IDLE_TTL_SECONDS: int = 3600
+    SESSION_SWEEP_INTERVAL_SECONDS: int = 60
+
+    # History Compaction Configuration
+    SESSION_COMPACTION_TOKEN_THRESHOLD: int = 30000
+    SESSION_COMPACTION_KEEP_TURNS: int = 3
+    SESSION_ARTIFACT_MIN_CHARS: int = 4000
+    ARTIFACT_STORE_MAX_BYTES: int = 128 * 1024 * 1024
 
     # File Configuration
     CONTEXT_FOLDER: str = "context"
@@ -45,6 +170,20 @@ class Settings(BaseSettings):
             return None
         return template.replace('{database_name}', database_name)
 
+    def get_query_timeout(self, database_name: Optional[str]) -> int:
+        """Get the query timeout in seconds for a database (0 = no timeout)"""
+        if database_name:
+            return self.DB_QUERY_TIMEOUTS.get(database_name.lower(), self.DB_QUERY_TIMEOUT_SECONDS)
+        return self.DB_QUERY_TIMEOUT_SECONDS
+
+    def get_schema_budget(self, database_name: str) -> Tuple[int, int]:
+        """Get (top_k, max_tokens) schema pruning budget for a database"""
+        override = self.SCHEMA_PRUNING_OVERRIDES.get(database_name.lower(), {})
+        return (
+            override.get("top_k", self.SCHEMA_PRUNING_TOP_K),
+            override.get("max_tokens", self.SCHEMA_PRUNING_MAX_TOKENS)
+        )
+
     class Config:
         env_file = ".env"
         case_sensitive = True
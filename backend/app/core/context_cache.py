@@ -0,0 +1,219 @@
+"""
+Explicit Gemini context caching for per-database schema prompts.
+One cached-content handle per (database, schema fingerprint) is shared by
+every DB chat session, so the large system instruction is uploaded once
+instead of with every request.
+UPDATED: Failed-create backoff entries are dropped once they expire or a create succeeds
+"""
+import asyncio
+import datetime
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from google.genai import types
+
+from app.core.logging import configure_logging
+from app.utils.hashing import schema_fingerprint
+
+# Configure logging
+logger = configure_logging(logger_name="context-cache")
+
+# Don't retry cache creation for a prompt that was just rejected (e.g. below the minimum token count)
+FAILED_CREATE_BACKOFF_SECONDS = 300
+
+@dataclass
+class ContextCacheHandle:
+    """A cached system instruction shared by sessions of one database"""
+    name: str
+    database: str
+    fingerprint: str
+    system_instruction: str
+    expires_at: float
+    remote: bool  # False for the local fake - sessions must inline the instruction
+
+class LocalCachesAPI:
+    """
+    Offline stand-in for client.aio.caches
+
+    Implements create/get/update/delete with the same signatures and return
+    types, keeping the cached contents in memory.
+    """
+
+    def __init__(self):
+        self._contents: Dict[str, Tuple[types.CachedContent, Optional[types.ContentUnion]]] = {}
+
+    @staticmethod
+    def _expire_time(ttl: Optional[str]) -> datetime.datetime:
+        seconds = float((ttl or "3600s").rstrip("s"))
+        return datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(seconds=seconds)
+
+    async def create(self, *, model: str, config: Optional[types.CreateCachedContentConfig] = None) -> types.CachedContent:
+        config = config or types.CreateCachedContentConfig()
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cached = types.CachedContent(
+            name=f"cachedContents/local-{uuid.uuid4().hex[:12]}",
+            display_name=config.display_name,
+            model=model,
+            create_time=now,
+            update_time=now,
+            expire_time=self._expire_time(config.ttl)
+        )
+        self._contents[cached.name] = (cached, config.system_instruction)
+        return cached
+
+    async def get(self, *, name: str, config=None) -> types.CachedContent:
+        cached, _ = self._contents[name]
+        if cached.expire_time <= datetime.datetime.now(datetime.timezone.utc):
+            del self._contents[name]
+            raise KeyError(f"Cached content {name} has expired")
+        return cached
+
+    async def update(self, *, name: str, config: Optional[types.UpdateCachedContentConfig] = None) -> types.CachedContent:
+        cached = await self.get(name=name)
+        cached.expire_time = self._expire_time(config.ttl if config else None)
+        cached.update_time = datetime.datetime.now(datetime.timezone.utc)
+        return cached
+
+    async def delete(self, *, name: str, config=None) -> types.DeleteCachedContentResponse:
+        self._contents.pop(name, None)
+        return types.DeleteCachedContentResponse()
+
+    def system_instruction(self, name: str) -> Optional[types.ContentUnion]:
+        """The instruction stored under a cache name (test helper)"""
+        entry = self._contents.get(name)
+        return entry[1] if entry else None
+
+class ContextCacheManager:
+    """
+    Keeps one cached-content handle per (database, schema fingerprint)
+
+    Handles are refreshed (TTL extended) when they get close to expiry,
+    recreated after they expire, and dropped on invalidate().
+    """
+
+    def __init__(self, caches_api, model_name: str, ttl_seconds: int = 3600, remote: bool = True):
+        """
+        Args:
+            caches_api: client.aio.caches, or a LocalCachesAPI
+            model_name: Model the cached content is created for
+            ttl_seconds: Lifetime requested for each handle
+            remote: Whether handles can be referenced by real Gemini sessions
+        """
+        self.caches_api = caches_api
+        self.model_name = model_name
+        self.ttl_seconds = ttl_seconds
+        self.refresh_margin = max(60, ttl_seconds // 10)
+        self.remote = remote
+
+        self._handles: Dict[str, ContextCacheHandle] = {}
+        self._failed: Dict[Tuple[str, str], float] = {}
+        self._lock = asyncio.Lock()
+
+        self._stats = {"created": 0, "refreshed": 0, "reused": 0, "failed": 0, "invalidated": 0}
+
+    async def get_handle(self, database_name: str, system_instruction: str) -> Optional[ContextCacheHandle]:
+        """
+        Get a live handle for this database's system instruction,
+        creating or refreshing it as needed
+
+        Returns:
+            The handle, or None if caching is unavailable for this prompt
+        """
+        fingerprint = schema_fingerprint(system_instruction)
+
+        async with self._lock:
+            handle = self._handles.get(database_name)
+            now = time.time()
+            self._purge_failed(now)
+
+            if handle and handle.fingerprint != fingerprint:
+                # Schema (or rules) changed - the old handle is stale
+                await self._delete(handle)
+                handle = None
+
+            if handle and now < handle.expires_at - self.refresh_margin:
+                self._stats["reused"] += 1
+                return handle
+
+            if handle and now < handle.expires_at:
+                try:
+                    await self.caches_api.update(
+                        name=handle.name,
+                        config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s")
+                    )
+                    handle.expires_at = now + self.ttl_seconds
+                    self._stats["refreshed"] += 1
+                    return handle
+                except Exception as e:
+                    logger.warning(f"Could not refresh context cache {handle.name}: {str(e)}")
+
+            failed_at = self._failed.get((database_name, fingerprint))
+            if failed_at and now - failed_at < FAILED_CREATE_BACKOFF_SECONDS:
+                return None
+
+            try:
+                cached = await self.caches_api.create(
+                    model=self.model_name,
+                    config=types.CreateCachedContentConfig(
+                        display_name=f"schema-{database_name}-{fingerprint}",
+                        system_instruction=system_instruction,
+                        ttl=f"{self.ttl_seconds}s"
+                    )
+                )
+            except Exception as e:
+                # Usually the prompt is below the model's minimum cacheable size
+                self._failed[(database_name, fingerprint)] = now
+                self._handles.pop(database_name, None)
+                self._stats["failed"] += 1
+                logger.warning(f"Context caching unavailable for {database_name}: {str(e)}")
+                return None
+
+            handle = ContextCacheHandle(
+                name=cached.name,
+                database=database_name,
+                fingerprint=fingerprint,
+                system_instruction=system_instruction,
+                expires_at=now + self.ttl_seconds,
+                remote=self.remote
+            )
+            self._handles[database_name] = handle
+            self._failed.pop((database_name, fingerprint), None)
+            self._stats["created"] += 1
+            logger.info(f"Created context cache {handle.name} for database: {database_name}")
+            return handle
+
+    def _purge_failed(self, now: float):
+        """Forget failed creates whose backoff has passed"""
+        expired = [key for key, failed_at in self._failed.items() if now - failed_at >= FAILED_CREATE_BACKOFF_SECONDS]
+        for key in expired:
+            del self._failed[key]
+
+    async def invalidate(self, database_name: str):
+        """Drop the handle for a database (e.g. after a database switch)"""
+        async with self._lock:
+            handle = self._handles.pop(database_name, None)
+            self._failed = {key: value for key, value in self._failed.items() if key[0] != database_name}
+            if handle:
+                await self._delete(handle)
+
+    async def _delete(self, handle: ContextCacheHandle):
+        """Best-effort remote delete of a handle"""
+        self._handles.pop(handle.database, None)
+        self._stats["invalidated"] += 1
+        try:
+            await self.caches_api.delete(name=handle.name)
+        except Exception as e:
+            logger.warning(f"Could not delete context cache {handle.name}: {str(e)}")
+
+    def stats(self) -> Dict[str, object]:
+        """Handle counters plus the live handles"""
+        now = time.time()
+        return {
+            **self._stats,
+            "handles": {
+                database: {"name": handle.name, "expires_in": round(handle.expires_at - now)}
+                for database, handle in self._handles.items()
+            }
+        }
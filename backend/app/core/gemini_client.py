@@ -2,12 +2,18 @@
 Gemini AI client for interacting with Google's Gemini API.
 IMPROVED VERSION - Simplified prompts for better performance
 UPDATED: Added database-specific instructions
+UPDATED: Added AsyncGeminiClient for non-blocking chat sessions
+UPDATED: DB sessions share an explicitly cached schema prompt per database
+UPDATED: Async calls go through an admission scheduler (concurrency, RPM/TPM, retries)
+UPDATED: AsyncGeminiClient implements the pluggable LLMClient interface
 """
 from google import genai
 from google.genai import types
 from typing import Dict, List, Optional, Any
 
 from app.core.config import get_settings
+from app.core.context_cache import ContextCacheManager, LocalCachesAPI
+from app.core.llm_client import LLMClient
 from app.core.logging import configure_logging
 
 # Configure logging
@@ -36,7 +42,8 @@ class GeminiClient:
     def create_chat_session(
             self,
             system_instruction: str,
-            temperature: float = 0.1  # Lower temperature for more consistent responses
+            temperature: float = 0.1,  # Lower temperature for more consistent responses
+            history: Optional[List[types.Content]] = None
     ):
         """
         Create a new chat session with Gemini
@@ -48,7 +55,8 @@ class GeminiClient:
                 config=types.GenerateContentConfig(
                     system_instruction=system_instruction,
                     temperature=temperature
-                )
+                ),
+                history=history
             )
 
             return chat
@@ -61,6 +69,16 @@ class GeminiClient:
         Create a chat session for database queries
         SQL SERVER SPECIFIC system instruction with database-specific rules
         
+        Args:
+            context: Database schema context
+            database_name: Current database name (pa, erp_mbl, erp_icad)
+        """
+        return self.create_chat_session(self.build_db_system_instruction(context, database_name))
+
+    def build_db_system_instruction(self, context: str, database_name: str = "pa") -> str:
+        """
+        Build the SQL Server system instruction with database-specific rules
+
         Args:
             context: Database schema context
             database_name: Current database name (pa, erp_mbl, erp_icad)
@@ -69,10 +87,10 @@ class GeminiClient:
         # Database-specific filtering rules
         if database_name.lower() in ['pa', 'erp_mbl']:
             attendance_filter_rule = "CRITICAL: When querying the EmployeeAttendance table always add the restriction ProjectId=64"
-            logger.info(f"Applied ProjectId=64 filter for database: {database_name}")
+            logger.debug(f"Applied ProjectId=64 filter for database: {database_name}")
         else:  # erp_icad or any other database
             attendance_filter_rule = "NOTE: No special ProjectId filtering required for EmployeeAttendance table in this database"
-            logger.info(f"No ProjectId filter applied for database: {database_name}")
+            logger.debug(f"No ProjectId filter applied for database: {database_name}")
 
         system_instruction = f"""You are PHD, a helpful SQL SERVER database assistant. 
 
@@ -113,9 +131,9 @@ Rules:
 3. Be concise and helpful
 4. Always use LIKE with wildcards for text searches unless user explicitly requests exact match"""
 
-        return self.create_chat_session(system_instruction)
+        return system_instruction
 
-    def create_file_analysis_session(self):
+    def create_file_analysis_session(self, history: Optional[List[types.Content]] = None):
         """
         Create a chat session for file analysis
         SIMPLIFIED system instruction
@@ -130,4 +148,111 @@ Help users understand their Excel/CSV files by:
 
 Be concise and focus on actionable insights."""
 
-        return self.create_chat_session(system_instruction)
\ No newline at end of file
+        return self.create_chat_session(system_instruction, history=history)
+
+class AsyncGeminiClient(GeminiClient, LLMClient):
+    """
+    Gemini client whose chat sessions are asyncio-native.
+    Sessions come from client.aio, so send_message must be awaited
+    and never blocks the event loop.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model_name: Optional[str] = None):
+        """Initialize Gemini client, admission scheduler and the schema context cache"""
+        GeminiClient.__init__(self, api_key, model_name)
+        LLMClient.__init__(self)
+
+        settings = get_settings()
+        cache_mode = settings.GEMINI_CONTEXT_CACHE.lower()
+
+        if cache_mode == "gemini":
+            self.context_cache = ContextCacheManager(
+                self.client.aio.caches, self.model_name, settings.GEMINI_CONTEXT_CACHE_TTL_SECONDS
+            )
+        elif cache_mode == "local":
+            self.context_cache = ContextCacheManager(
+                LocalCachesAPI(), self.model_name, settings.GEMINI_CONTEXT_CACHE_TTL_SECONDS, remote=False
+            )
+        else:
+            self.context_cache = None
+
+        logger.info(f"Schema context caching: {cache_mode}")
+
+    def create_chat_session(
+            self,
+            system_instruction: str,
+            temperature: float = 0.1,
+            history: Optional[List[types.Content]] = None
+    ):
+        """Create a new async chat session with Gemini"""
+        try:
+            chat = self.client.aio.chats.create(
+                model=self.model_name,
+                config=types.GenerateContentConfig(
+                    system_instruction=system_instruction,
+                    temperature=temperature
+                ),
+                history=history
+            )
+
+            return chat
+        except Exception as e:
+            logger.error(f"Error creating async chat session: {str(e)}")
+            raise
+
+    async def create_db_chat_session(
+            self,
+            context: str,
+            database_name: str = "pa",
+            history: Optional[List[types.Content]] = None
+    ):
+        """
+        Create a chat session for database queries
+        References the database's cached schema prompt when one is available,
+        otherwise sends the system instruction inline
+        """
+        system_instruction = self.build_db_system_instruction(context, database_name)
+        handle = await self._get_context_handle(system_instruction, database_name)
+
+        if handle is None or not handle.remote:
+            return self.create_chat_session(system_instruction, history=history)
+
+        try:
+            return self.client.aio.chats.create(
+                model=self.model_name,
+                config=types.GenerateContentConfig(
+                    cached_content=handle.name,
+                    temperature=0.1
+                ),
+                history=history
+            )
+        except Exception as e:
+            logger.error(f"Error creating cached chat session: {str(e)}")
+            raise
+
+    async def get_context_cache_name(self, context: str, database_name: str = "pa") -> Optional[str]:
+        """
+        Name of the live cached-content handle for this database's prompt
+        Sessions created under a different name should be rebuilt
+        """
+        handle = await self._get_context_handle(
+            self.build_db_system_instruction(context, database_name), database_name
+        )
+        return handle.name if handle else None
+
+    async def _get_context_handle(self, system_instruction: str, database_name: str):
+        """Get (creating or refreshing) the cached-content handle, if caching is enabled"""
+        if self.context_cache is None:
+            return None
+        return await self.context_cache.get_handle(database_name, system_instruction)
+
+    async def invalidate_context_cache(self, database_name: str):
+        """Drop the cached schema prompt for a database"""
+        if self.context_cache is not None:
+            await self.context_cache.invalidate(database_name)
+
+    def context_cache_stats(self) -> Dict[str, Any]:
+        """Context cache counters and live handles"""
+        if self.context_cache is None:
+            return {"enabled": False}
+        return {"enabled": True, **self.context_cache.stats()}
@@ -0,0 +1,300 @@
+"""
+Admission control for Gemini calls.
+Caps concurrent requests, paces them against per-minute request/token quotas,
+serves interactive work ahead of background work and retries transient
+failures (429/5xx) with jittered backoff that honours the server's retry hint.
+"""
+import asyncio
+import heapq
+import itertools
+import math
+import random
+import re
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, TypeVar
+
+from app.core.logging import configure_logging
+from app.utils.request_timing import current_timings
+
+# Configure logging
+logger = configure_logging(logger_name="gemini-scheduler")
+
+T = TypeVar("T")
+
+# Lower values are admitted first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFERRED = 5
+PRIORITY_FILE_ANALYSIS = 10
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+class AdmissionTimeout(Exception):
+    """Raised when a call waited longer than the queue timeout for a slot"""
+
+class TokenBucket:
+    """Token bucket refilled continuously up to its capacity"""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount can be taken (0 if available now)"""
+        self._refill()
+        # A single oversized request only needs a full bucket
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount: float):
+        self._refill()
+        self.tokens -= amount
+
+class GeminiScheduler:
+    """
+    Priority admission queue in front of the Gemini API
+
+    Each call waits for a free in-flight slot and enough request/token budget.
+    Waiters are admitted strictly by (priority, arrival order).
+    """
+
+    def __init__(
+            self,
+            max_in_flight: int,
+            requests_per_minute: int,
+            tokens_per_minute: int,
+            max_retries: int = 3,
+            backoff_base_seconds: float = 1.0,
+            backoff_max_seconds: float = 30.0,
+            queue_timeout_seconds: float = 60.0
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.queue_timeout_seconds = queue_timeout_seconds
+
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+        self._queue: list = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._wakeup: Optional[asyncio.TimerHandle] = None
+
+        self._waits = deque(maxlen=1000)
+        self._stats = {
+            "admitted": 0,
+            "retries": 0,
+            "failures": 0,
+            "queue_timeouts": 0,
+            "max_queue_depth": 0
+        }
+
+    async def run(
+            self,
+            call: Callable[[], Awaitable[T]],
+            priority: int = PRIORITY_INTERACTIVE,
+            estimated_tokens: int = 0
+    ) -> T:
+        """
+        Run a Gemini call under admission control, retrying transient failures
+
+        Args:
+            call: Coroutine factory for the API call (called once per attempt)
+            priority: Admission priority (lower first)
+            estimated_tokens: Expected tokens for the request, charged against TPM
+        """
+        attempt = 0
+        while True:
+            await self._acquire(priority, estimated_tokens)
+            try:
+                result = await call()
+                self._charge_usage(result, estimated_tokens)
+                return result
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    self._stats["failures"] += 1
+                    raise
+                delay = self._retry_delay(e, attempt)
+                error = e
+            finally:
+                self._release()
+
+            attempt += 1
+            self._stats["retries"] += 1
+            logger.warning(f"Gemini call failed ({str(error)[:80]}), retry {attempt} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def stream(
+            self,
+            call: Callable[[], Awaitable[AsyncIterator[Any]]],
+            priority: int = PRIORITY_INTERACTIVE,
+            estimated_tokens: int = 0
+    ) -> AsyncIterator[Any]:
+        """
+        Streaming variant of run
+        Holds the slot until the stream ends; retries only before the first chunk
+        """
+        attempt = 0
+        while True:
+            await self._acquire(priority, estimated_tokens)
+            started = False
+            try:
+                async for chunk in await call():
+                    started = True
+                    yield chunk
+                return
+            except Exception as e:
+                if started or not self._should_retry(e, attempt):
+                    self._stats["failures"] += 1
+                    raise
+                delay = self._retry_delay(e, attempt)
+                error = e
+            finally:
+                self._release()
+
+            attempt += 1
+            self._stats["retries"] += 1
+            logger.warning(f"Gemini stream failed ({str(error)[:80]}), retry {attempt} in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def _acquire(self, priority: int, estimated_tokens: int):
+        """Wait in the priority queue until this call is admitted"""
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        entry = [priority, next(self._sequence), estimated_tokens, waiter]
+        heapq.heappush(self._queue, entry)
+        self._stats["max_queue_depth"] = max(self._stats["max_queue_depth"], len(self._queue))
+
+        enqueued = time.monotonic()
+        self._dispatch()
+
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just as we gave up - hand the slot back
+                self._release()
+            else:
+                waiter.cancel()
+                self._queue.remove(entry)
+                heapq.heapify(self._queue)
+                self._dispatch()
+            if isinstance(e, asyncio.TimeoutError):
+                self._stats["queue_timeouts"] += 1
+                raise AdmissionTimeout(f"Gemini queue wait exceeded {self.queue_timeout_seconds}s")
+            raise
+
+        waited = time.monotonic() - enqueued
+        self._waits.append(waited)
+        self._stats["admitted"] += 1
+
+        timings = current_timings()
+        if timings is not None:
+            timings.add_stage("llm_queue", waited * 1000)
+
+    def _release(self):
+        self._in_flight -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Admit queued calls while slots and rate budget allow"""
+        while self._queue and self._in_flight < self.max_in_flight:
+            priority, _, estimated_tokens, waiter = self._queue[0]
+
+            if waiter.done():
+                heapq.heappop(self._queue)
+                continue
+
+            wait = max(
+                self._requests.wait_time(1) if self._requests else 0.0,
+                self._tokens.wait_time(estimated_tokens) if self._tokens else 0.0
+            )
+            if wait > 0:
+                self._schedule_wakeup(wait)
+                return
+
+            heapq.heappop(self._queue)
+            if self._requests:
+                self._requests.take(1)
+            if self._tokens:
+                self._tokens.take(estimated_tokens)
+            self._in_flight += 1
+            waiter.set_result(None)
+
+    def _schedule_wakeup(self, delay: float):
+        if self._wakeup is not None and not self._wakeup.cancelled():
+            self._wakeup.cancel()
+        self._wakeup = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def _charge_usage(self, response: Any, estimated_tokens: int):
+        """Correct the token bucket with the actual usage reported by Gemini"""
+        if self._tokens is None:
+            return
+        usage = getattr(response, "usage_metadata", None)
+        total = getattr(usage, "total_token_count", None) if usage else None
+        if total:
+            self._tokens.take(total - estimated_tokens)
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        if attempt >= self.max_retries:
+            return False
+        if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+            return True
+        return getattr(error, "code", None) in RETRYABLE_STATUS_CODES
+
+    def _retry_delay(self, error: Exception, attempt: int) -> float:
+        """Server retry hint if present, otherwise full-jitter exponential backoff"""
+        hinted = retry_after_seconds(error)
+        if hinted is not None:
+            return min(hinted + random.uniform(0, self.backoff_base_seconds), self.backoff_max_seconds)
+        ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        return random.uniform(0, ceiling)
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, in-flight calls, admission wait times and retry counters"""
+        waits = sorted(self._waits)
+        return {
+            "queue_depth": len(self._queue),
+            "in_flight": self._in_flight,
+            "max_in_flight": self.max_in_flight,
+            "request_budget": round(self._requests.tokens, 1) if self._requests else None,
+            "token_budget": round(self._tokens.tokens) if self._tokens else None,
+            "wait_seconds": {
+                "avg": round(sum(waits) / len(waits), 3) if waits else 0.0,
+                "p95": round(waits[math.ceil(len(waits) * 0.95) - 1], 3) if waits else 0.0,
+                "max": round(waits[-1], 3) if waits else 0.0
+            },
+            **self._stats
+        }
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """
+    Extract the server's retry hint from a Gemini API error
+    Checks the Retry-After header, then RetryInfo.retryDelay in the error details
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if headers:
+        value = headers.get("retry-after")
+        if value:
+            try:
+                return float(value)
+            except ValueError:
+                pass
+
+    match = re.search(r"'retryDelay':\s*'([\d.]+)s'", str(getattr(error, "details", "")))
+    if match:
+        return float(match.group(1))
+
+    return None
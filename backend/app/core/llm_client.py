@@ -0,0 +1,136 @@
+"""
+Chat model backend interface.
+ai_service talks to an LLMClient; the backend (Gemini or the local mock)
+is selected with Settings.LLM_BACKEND.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Dict, Optional
+
+from google.genai import types
+
+from app.core.config import get_settings
+from app.core.gemini_scheduler import GeminiScheduler, PRIORITY_INTERACTIVE
+from app.core.logging import configure_logging
+from app.utils.request_timing import record_llm_usage
+from app.utils.tokens import estimate_tokens
+
+# Configure logging
+logger = configure_logging(logger_name="llm-client")
+
+class LLMClient(ABC):
+    """
+    Chat sessions and admission-controlled message sending
+
+    Chat objects returned by a backend must support send_message,
+    send_message_stream, get_history and record_history like google-genai's AsyncChat.
+    """
+
+    def __init__(self):
+        """Initialize the admission scheduler shared by all calls"""
+        settings = get_settings()
+        self.scheduler = GeminiScheduler(
+            max_in_flight=settings.GEMINI_MAX_IN_FLIGHT,
+            requests_per_minute=settings.GEMINI_REQUESTS_PER_MINUTE,
+            tokens_per_minute=settings.GEMINI_TOKENS_PER_MINUTE,
+            max_retries=settings.GEMINI_MAX_RETRIES,
+            backoff_base_seconds=settings.GEMINI_BACKOFF_BASE_SECONDS,
+            backoff_max_seconds=settings.GEMINI_BACKOFF_MAX_SECONDS,
+            queue_timeout_seconds=settings.GEMINI_QUEUE_TIMEOUT_SECONDS
+        )
+
+    @abstractmethod
+    async def create_db_chat_session(self, context: str, database_name: str = "pa", history: Optional[list] = None):
+        """Create a chat session for database queries"""
+
+    @abstractmethod
+    def create_file_analysis_session(self, history: Optional[list] = None):
+        """Create a chat session for file analysis"""
+
+    def record_exchange(self, chat, user_text: str, model_text: str):
+        """
+        Append a user/model turn to a chat's history without calling the model
+        Used when an answer is served from cache so follow-ups keep their context
+        """
+        chat.record_history(
+            user_input=types.Content(role="user", parts=[types.Part(text=user_text)]),
+            model_output=[types.Content(role="model", parts=[types.Part(text=model_text)])],
+            is_valid=True
+        )
+
+    async def get_context_cache_name(self, context: str, database_name: str = "pa") -> Optional[str]:
+        """Name of the cached schema prompt sessions should use (None if not cached)"""
+        return None
+
+    async def invalidate_context_cache(self, database_name: str):
+        """Drop the cached schema prompt for a database"""
+
+    def context_cache_stats(self) -> Dict[str, Any]:
+        """Context cache counters and live handles"""
+        return {"enabled": False}
+
+    async def send_message(self, chat, message: str, priority: int = PRIORITY_INTERACTIVE):
+        """
+        Send a chat message under admission control
+        Waits for a slot and rate budget, retrying 429/5xx with backoff
+        """
+        response = await self.scheduler.run(
+            lambda: chat.send_message(message),
+            priority=priority,
+            estimated_tokens=self._estimate_request_tokens(chat, message)
+        )
+        record_llm_usage(response)
+        return response
+
+    async def send_message_stream(
+            self,
+            chat,
+            message: str,
+            priority: int = PRIORITY_INTERACTIVE
+    ) -> AsyncIterator[Any]:
+        """Streaming variant of send_message, yielding response chunks"""
+        last_chunk = None
+        async for chunk in self.scheduler.stream(
+                lambda: chat.send_message_stream(message),
+                priority=priority,
+                estimated_tokens=self._estimate_request_tokens(chat, message)
+        ):
+            last_chunk = chunk
+            yield chunk
+
+        # Usage metadata on the final chunk covers the whole reply
+        if last_chunk is not None:
+            record_llm_usage(last_chunk)
+
+    def _estimate_request_tokens(self, chat, message: str) -> int:
+        """Estimate prompt tokens for a turn: the new message plus the history it resends"""
+        history_text = "".join(
+            part.text or ""
+            for content in chat.get_history(curated=True)
+            for part in (content.parts or [])
+        )
+        return estimate_tokens(message) + estimate_tokens(history_text)
+
+    def scheduler_stats(self) -> Dict[str, Any]:
+        """Admission queue depth, wait times and retry counters"""
+        return self.scheduler.stats()
+
+# Singleton client instance
+_llm_client = None
+
+def get_llm_client() -> LLMClient:
+    """Get the configured LLM backend (gemini or mock)"""
+    global _llm_client
+    if _llm_client is None:
+        backend = get_settings().LLM_BACKEND.lower()
+
+        if backend == "mock":
+            from app.core.mock_llm_client import MockLLMClient
+            _llm_client = MockLLMClient()
+        elif backend == "gemini":
+            from app.core.gemini_client import AsyncGeminiClient
+            _llm_client = AsyncGeminiClient()
+        else:
+            raise ValueError(f"Unknown LLM_BACKEND: {backend}")
+
+        logger.info(f"LLM backend: {backend}")
+    return _llm_client
@@ -0,0 +1,133 @@
+"""
+Local mock LLM backend for load testing and benchmarks.
+Answers with canned SQL/text after a sampled latency and fails a configurable
+fraction of calls, so throughput and tail latency can be measured offline.
+"""
+import asyncio
+import math
+import random
+from dataclasses import dataclass
+from typing import AsyncIterator, List, Optional
+
+from google.genai import types
+
+from app.core.config import get_settings
+from app.core.llm_client import LLMClient
+from app.core.logging import configure_logging
+from app.utils.tokens import estimate_tokens
+
+# Configure logging
+logger = configure_logging(logger_name="mock-llm")
+
+# Follow-up prompts ai_service sends about query results or failures get prose, not SQL
+RESULT_PROMPT_MARKERS = ("SQL query returned", "SQL query failed", "SQL results")
+
+class MockLLMError(Exception):
+    """Simulated API failure; carries a status code like google-genai's APIError"""
+
+    def __init__(self, code: int = 503, message: str = "Mock LLM unavailable"):
+        super().__init__(f"{code} {message}")
+        self.code = code
+        self.details = None
+        self.response = None
+
+@dataclass
+class MockUsage:
+    prompt_token_count: int
+    candidates_token_count: int
+    total_token_count: int
+
+@dataclass
+class MockResponse:
+    text: str
+    usage_metadata: MockUsage
+
+class MockChat:
+    """Chat session with the same surface as google-genai's AsyncChat"""
+
+    def __init__(self, backend: "MockLLMClient", kind: str, history: Optional[List[types.Content]] = None):
+        self.backend = backend
+        self.kind = kind
+        self._history: List[types.Content] = list(history or [])
+
+    async def send_message(self, message: str) -> MockResponse:
+        await self.backend.simulate_call()
+        text = self.backend.reply_for(self.kind, message)
+        self.record_history(
+            user_input=types.Content(role="user", parts=[types.Part(text=message)]),
+            model_output=[types.Content(role="model", parts=[types.Part(text=text)])],
+            is_valid=True
+        )
+        prompt_tokens = estimate_tokens(message)
+        reply_tokens = estimate_tokens(text)
+        return MockResponse(text, MockUsage(prompt_tokens, reply_tokens, prompt_tokens + reply_tokens))
+
+    async def send_message_stream(self, message: str) -> AsyncIterator[MockResponse]:
+        response = await self.send_message(message)
+        return self._chunks(response)
+
+    async def _chunks(self, response: MockResponse) -> AsyncIterator[MockResponse]:
+        words = response.text.split(" ")
+        for index, word in enumerate(words):
+            await asyncio.sleep(0)
+            chunk = word if index == len(words) - 1 else word + " "
+            yield MockResponse(chunk, response.usage_metadata)
+
+    def get_history(self, curated: bool = False) -> List[types.Content]:
+        return list(self._history)
+
+    def record_history(self, user_input: types.Content, model_output: List[types.Content], is_valid: bool):
+        self._history.append(user_input)
+        self._history.extend(model_output)
+
+class MockLLMClient(LLMClient):
+    """
+    LLMClient backed by canned replies
+    Goes through the same admission scheduler as Gemini, so queueing and retries are exercised too.
+    """
+
+    def __init__(self):
+        super().__init__()
+        settings = get_settings()
+        self.distribution = settings.MOCK_LLM_LATENCY_DISTRIBUTION.lower()
+        self.median_seconds = settings.MOCK_LLM_LATENCY_MEDIAN_MS / 1000.0
+        self.sigma = settings.MOCK_LLM_LATENCY_SIGMA
+        self.failure_rate = settings.MOCK_LLM_FAILURE_RATE
+        self.sql = settings.MOCK_LLM_SQL
+        self._random = random.Random(settings.MOCK_LLM_SEED)
+
+        logger.info(
+            f"Mock LLM: {self.distribution} latency, median {settings.MOCK_LLM_LATENCY_MEDIAN_MS}ms, "
+            f"failure rate {self.failure_rate}"
+        )
+
+    async def create_db_chat_session(self, context: str, database_name: str = "pa", history: Optional[list] = None):
+        """Create a mock chat session for database queries"""
+        return MockChat(self, "db", history)
+
+    def create_file_analysis_session(self, history: Optional[list] = None):
+        """Create a mock chat session for file analysis"""
+        return MockChat(self, "file", history)
+
+    def sample_latency(self) -> float:
+        """Draw a call latency in seconds from the configured distribution"""
+        if self.distribution == "fixed":
+            return self.median_seconds
+        if self.distribution == "uniform":
+            return self._random.uniform(0, 2 * self.median_seconds)
+        return self._random.lognormvariate(math.log(max(self.median_seconds, 1e-6)), self.sigma)
+
+    async def simulate_call(self):
+        """Wait one sampled latency, then fail with the configured probability"""
+        await asyncio.sleep(self.sample_latency())
+        if self._random.random() < self.failure_rate:
+            raise MockLLMError()
+
+    def reply_for(self, kind: str, message: str) -> str:
+        """Canned reply: SQL for database questions, prose for everything else"""
+        if kind == "db" and not any(marker in message for marker in RESULT_PROMPT_MARKERS):
+            return f"<p>Here is a query for that:</p>\n```sql\n{self.sql}\n```"
+        return (
+            "<p><b>Mock analysis:</b> the results look consistent. "
+            "<ul><li>No anomalies detected</li><li>Values fall in the expected range</li></ul></p>"
+        )
@@ -1,12 +1,13 @@
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import time
 
 from app.core.config import get_settings
 from app.core.logging import configure_logging
 from app.api.endpoints import register_routes
 from app.services.file_service import load_context_files
-from app.services.db_service import set_connection_string
+from app.services.db_service import start_pool_reaper, stop_pool_reaper
 
 # Configure logging 
 logger = configure_logging(logger_name="gemini-ai-service", log_file="api.log")
@@ -45,16 +46,20 @@ async def log_requests(request: Request, call_next):
 async def startup_event():
     """Auto-discover database schema and initialize services on startup"""
     from app.services.schema_discovery import discover_database_schema
+    from app.services.ai_service import start_session_sweeper
+    from app.services.database_registry import register_database
+    from app.services.health_monitor import start_health_prober
+
+    # Evict idle chat sessions and close idle DB connections in the background
+    start_session_sweeper()
+    start_pool_reaper()
 
     # Initialize app state with default database (PA)
     app.state.current_database = "pa"  # Default database
     app.state.current_connection_string = settings.DB_CONNECTION_STRING
 
-    # Set the connection string in db_service
-    set_connection_string(settings.DB_CONNECTION_STRING)
-
     # Try to auto-discover schema first
-    schema_context, error = discover_database_schema()
+    schema_context, error = discover_database_schema(app.state.current_database)
 
     if error:
         logger.warning(f"Schema auto-discovery failed: {error}")
@@ -67,6 +72,21 @@ async def startup_event():
         app.state.db_context = schema_context
         logger.info(f"Server started - Auto-discovered schema for database: {app.state.current_database}")
 
+    # Sessions on the default database use this schema; others are discovered on first use
+    register_database(app.state.current_database, app.state.db_context, app.state.current_connection_string)
+
+    # Keep /db/status answered from memory; registered databases are probed in the background
+    start_health_prober()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks"""
+    from app.services.ai_service import stop_session_sweeper
+    from app.services.health_monitor import stop_health_prober
+    await stop_health_prober()
+    await stop_session_sweeper()
+    await stop_pool_reaper()
+
 # Register API routes 
 register_routes(app)
 
@@ -96,6 +116,7 @@ async def debug_config():
         "connection_string_length": len(settings.DB_CONNECTION_STRING) if settings.DB_CONNECTION_STRING else 0,
         "connection_string_preview": settings.DB_CONNECTION_STRING[:50] + "..." if settings.DB_CONNECTION_STRING else None,
         "gemini_key_exists": bool(settings.GEMINI_API_KEY),
+        "llm_backend": settings.LLM_BACKEND,
         "context_folder": settings.CONTEXT_FOLDER,
         "upload_folder": settings.UPLOAD_FOLDER,
         "current_database": getattr(app.state, 'current_database', 'unknown')
@@ -113,10 +134,83 @@ async def debug_schema():
 
 @app.get("/debug/sessions")
 async def debug_sessions():
-    """Debug endpoint to view current sessions"""
+    """Debug endpoint to view current sessions, estimated memory and evictions"""
     from app.services.ai_service import get_session_count
     return get_session_count()
 
+@app.get("/debug/artifacts/{artifact_id}")
+async def debug_artifact(artifact_id: str):
+    """Debug endpoint to view a large output moved out of a compacted chat history"""
+    from fastapi import HTTPException
+    from app.services.artifact_store import get_artifact_store
+    artifact = get_artifact_store().get(artifact_id)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Artifact not found or evicted")
+    return {"artifact_id": artifact_id, **artifact}
+
+@app.get("/debug/context-cache")
+async def debug_context_cache():
+    """Debug endpoint to view Gemini schema context cache handles"""
+    from app.services.ai_service import llm_client
+    return llm_client.context_cache_stats()
+
+@app.get("/debug/coalescing")
+async def debug_coalescing():
+    """Debug endpoint to view how many generations and executions were coalesced"""
+    from app.services.ai_service import get_coalescing_stats
+    return get_coalescing_stats()
+
+@app.get("/debug/gemini-queue")
+async def debug_gemini_queue():
+    """Debug endpoint to view Gemini admission queue depth, wait times and retries"""
+    from app.services.ai_service import llm_client
+    return llm_client.scheduler_stats()
+
+@app.get("/debug/timings")
+async def debug_timings():
+    """Debug endpoint to view per-stage latency distributions and token usage of recent requests"""
+    from app.utils.request_timing import get_timing_aggregator
+    return get_timing_aggregator().stats()
+
+@app.get("/debug/db-pools")
+async def debug_db_pools():
+    """Debug endpoint to view connection pool sizes and reuse counters per connection string"""
+    from app.services.db_service import get_pool_stats
+    return get_pool_stats()
+
+@app.get("/debug/result-cursors")
+async def debug_result_cursors():
+    """Debug endpoint to view server-side result cursor counts and memory"""
+    from app.services.result_cursor_store import get_result_cursor_store
+    return get_result_cursor_store().stats()
+
+@app.get("/debug/sql-result-cache")
+async def debug_sql_result_cache():
+    """Debug endpoint to view SQL result cache hit rate and bytes held"""
+    from app.services.db_service import get_result_cache_stats
+    return get_result_cache_stats()
+
+@app.get("/debug/db-endpoints")
+async def debug_db_endpoints():
+    """Debug endpoint to view read-replica routing load and health per database"""
+    from app.services.db_service import get_endpoint_stats
+    return get_endpoint_stats()
+
+@app.get("/debug/db-circuits")
+async def debug_db_circuits():
+    """Debug endpoint to view every database's circuit breaker state"""
+    from app.services.db_service import get_circuit_stats
+    return get_circuit_stats()
+
+@app.get("/debug/query-cache")
+async def debug_query_cache():
+    """Debug endpoint to view NL->SQL cache hit/miss counters"""
+    from app.services.query_cache import get_query_cache
+    query_cache = get_query_cache()
+    if query_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **(await asyncio.to_thread(query_cache.stats))}
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host=settings.API_HOST, port=settings.API_PORT, reload=True)
\ No newline at end of file
@@ -3,7 +3,7 @@ API request and response models.
 Uses Pydantic for validation.
 UPDATED: Added structured table data support
 """
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List, Dict, Any, Union
 
 # Table data structure
@@ -11,7 +11,12 @@ class TableData(BaseModel):
     """Structured table data for SQL results"""
     headers: List[str]
     rows: List[List[Any]]
-    row_count: int
+    row_count: int  # Rows in the result (rows may hold only the first page, see ChatResponse.cursor_id)
+    truncated: bool = False  # The row or byte cap stopped the fetch early
+    total_rows_estimate: Optional[int] = None  # Rows the query produced (a lower bound when counting stopped)
+    total_is_exact: bool = True  # False when total_rows_estimate is only a lower bound
+    # Rough in-memory size of rows, measured while fetching (server-side only, never serialized)
+    estimated_bytes: Optional[int] = Field(default=None, exclude=True)
 
 # Common models
 class SessionRequest(BaseModel):
@@ -21,11 +26,25 @@ class SessionRequest(BaseModel):
 class ChatMessage(SessionRequest):
     """Chat message request"""
     message: str
+    defer_interpretation: bool = False  # Return SQL results without waiting for the AI interpretation
+    database: Optional[str] = None  # Bind the session to this database (default: the session's own, or the current one)
+
+class BatchChatRequest(BaseModel):
+    """Batch of independent questions for one database"""
+    questions: List[str]
+    defer_interpretation: bool = False
+    database: Optional[str] = None  # Defaults to the current database
 
 class ClearRequest(SessionRequest):
     """Clear chat session request"""
     pass
 
+class InterpretationResponse(BaseModel):
+    """Deferred interpretation of SQL results"""
+    interpretation_id: str
+    status: str
+    interpretation: str
+
 # Response models
 class ChatResponse(BaseModel):
     """Base chat response model - UPDATED with structured table data"""
@@ -36,8 +55,31 @@ class ChatResponse(BaseModel):
     sql_result: Optional[str] = None  # Keep for backward compatibility
     sql_table: Optional[TableData] = None  # NEW: Structured table data
     sql_error: Optional[str] = None
+    sql_error_type: Optional[str] = None  # "timeout", "cancelled", "unavailable" or "error"
     user_question: Optional[str] = None
     interpretation: Optional[str] = None
+    interpretation_id: Optional[str] = None  # Fetch from /db/interpretation/{id} when deferred
+    timings: Optional[Dict[str, Any]] = None  # Per-stage milliseconds and Gemini token counts
+    cursor_id: Optional[str] = None  # Fetch more rows from /db/results/{cursor_id} when set
+
+class ResultPage(BaseModel):
+    """One page of a server-side result cursor"""
+    cursor_id: str
+    headers: List[str]
+    rows: List[List[Any]]
+    offset: int
+    limit: int
+    row_count: int  # Rows after filtering
+    has_more: bool
+    truncated: bool = False  # The underlying query result was cut off by the fetch caps
+    total_rows_estimate: Optional[int] = None
+    total_is_exact: bool = True
+
+class BatchItemResponse(BaseModel):
+    """One NDJSON line of a batch response - indices lists every position the question appeared at"""
+    indices: List[int]
+    question: str
+    result: ChatResponse
 
 class FileInfo(BaseModel):
     """Information about a file"""
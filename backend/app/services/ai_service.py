@@ -1,53 +1,202 @@
 """
 AI service for handling both database queries and file analysis.
 UPDATED: Added database-specific session creation
+UPDATED: Message processing is async end-to-end (Gemini aio sessions + DB executor)
+UPDATED: Added streaming variants that yield per-stage progress events
+UPDATED: Generated SQL is cached per (question, database, schema) and reused
+UPDATED: Large schemas are pruned - each question carries only its relevant tables
+UPDATED: SQL result interpretation can be deferred and fetched separately
+UPDATED: Gemini interprets a token-bounded digest of results, not the full dump
+UPDATED: Sessions live in a bounded SessionStore (LRU/TTL eviction, size accounting)
+UPDATED: Long histories are compacted into a summary before the next turn
+UPDATED: Identical concurrent questions share one SQL generation call
+UPDATED: Gemini calls are admitted by priority (DB chat first, file analysis last)
+UPDATED: Talks to a pluggable LLMClient backend (Gemini or mock) selected in Settings
+UPDATED: Added batch answering - deduped questions run concurrently, results streamed as they finish
+UPDATED: DB answers carry per-stage timings and token counts, aggregated for /debug/timings
+UPDATED: Results larger than a page are kept server-side behind a cursor; responses carry the first page
+UPDATED: SQL stops when the client disconnects; timed-out and cancelled queries report sql_error_type
+UPDATED: Result text is rendered only for what a response carries (the first page when paged)
+UPDATED: The database's connection string is passed explicitly from the route down to db_service
+UPDATED: Sessions are bound to a database; resolve_session_database picks each request's target
+UPDATED: An unavailable database (open circuit breaker) skips the LLM error reply and keeps cached SQL
+UPDATED: Cached NL->SQL is only read and written on a session's first (context-free) question
+UPDATED: NL->SQL cache SQLite reads and writes run in worker threads, not on the event loop
+UPDATED: Concurrent identical questions are only coalesced on sessions without prior turns
+UPDATED: Deferred interpretations build the result digest in the deferred task, off the response path
+UPDATED: Deferred interpretations run on a throwaway chat from a history snapshot, never the session's chat
+UPDATED: Pruned schema tables count as sent only once the message carrying them was sent
 """
+import asyncio
 import re
 import uuid
-from typing import Dict, Optional, Any
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Any, Tuple
 
-from app.core.gemini_client import GeminiClient
+from app.core.config import get_settings
+from app.core.gemini_scheduler import PRIORITY_DEFERRED, PRIORITY_FILE_ANALYSIS, PRIORITY_INTERACTIVE
+from app.core.llm_client import get_llm_client
 from app.core.logging import configure_logging
-from app.models.api import ChatResponse
-from app.services.db_service import execute_sql_query
+from app.models.api import BatchItemResponse, ChatResponse, TableData
+from app.services.database_registry import ensure_database
+from app.services.db_service import (
+    SQL_ERROR_CANCELLED,
+    SQL_ERROR_UNAVAILABLE,
+    execute_sql_query_async,
+    get_query_coalescing_stats,
+    sql_error_type
+)
+from app.services.history_compactor import compact_history, history_tokens
+from app.services.interpretation_service import register_interpretation
+from app.services.query_cache import get_query_cache, normalize_question
+from app.services.result_cursor_store import get_result_cursor_store
+from app.services.schema_index import get_pruning_index
+from app.services.session_store import SessionStore
+from app.utils.hashing import schema_fingerprint
+from app.utils.query_result import QueryResult
+from app.utils.request_timing import RequestTimings, get_timing_aggregator, request_timings, timed_stage
+from app.utils.result_summarizer import summarize_table
+from app.utils.single_flight import SingleFlight
 
 # Configure logging
 logger = configure_logging(logger_name="ai-service")
 
-# Create a sessions cache
-_chat_sessions = {}
+# Create a bounded sessions cache
+_settings = get_settings()
+_chat_sessions = SessionStore(
+    max_sessions=_settings.SESSION_MAX_SESSIONS,
+    max_bytes=_settings.SESSION_MAX_BYTES,
+    idle_ttl_seconds=_settings.SESSION_IDLE_TTL_SECONDS,
+    sweep_interval_seconds=_settings.SESSION_SWEEP_INTERVAL_SECONDS
+)
 
-# Initialize Gemini client
-gemini_client = GeminiClient()
+# Initialize the LLM backend (Gemini, or the local mock for load testing)
+llm_client = get_llm_client()
+
+# Coalesces identical concurrent questions into one Gemini generation
+_generation_flight = SingleFlight("sql-generation")
+
+# Query errors that don't mean the SQL is wrong: no LLM error reply, cached SQL is kept
+SQL_ERRORS_NOT_CAUSED_BY_SQL = {SQL_ERROR_CANCELLED, SQL_ERROR_UNAVAILABLE}
 
 # Session management functions
-def get_or_create_db_session(session_id: Optional[str], context: str, database_name: str = "pa") -> tuple:
+async def _new_db_session(context: str, database_name: str) -> Dict[str, Any]:
+    """Build a database session entry, referencing the shared schema cache when available"""
+    schema_context = _session_schema_context(context, database_name)
+    return {
+        "type": "db_query",
+        "database": database_name,
+        "schema_context": schema_context,
+        "chat": await llm_client.create_db_chat_session(schema_context, database_name),
+        "cache_name": await llm_client.get_context_cache_name(schema_context, database_name),
+        "schema_tables": set()
+    }
+
+async def get_or_create_db_session(session_id: Optional[str], context: str, database_name: str = "pa") -> tuple:
     """
     Get existing or create new database chat session
     UPDATED: Now accepts database_name parameter
+    UPDATED: Rebuilds the chat (keeping history) when its schema cache handle was replaced
     """
     if not session_id or session_id not in _chat_sessions:
         session_id = str(uuid.uuid4())
 
-        _chat_sessions[session_id] = {
-            "type": "db_query",
-            "database": database_name,
-            "chat": gemini_client.create_db_chat_session(context, database_name)
-        }
+        _chat_sessions[session_id] = await _new_db_session(context, database_name)
         logger.info(f"Created new database chat session: {session_id[:8]}... for database: {database_name}")
     else:
         # Check if database has changed and recreate session if needed
         existing_session = _chat_sessions[session_id]
         if existing_session.get("database") != database_name:
             logger.info(f"Database changed from {existing_session.get('database')} to {database_name}, recreating session")
-            _chat_sessions[session_id] = {
-                "type": "db_query",
-                "database": database_name,
-                "chat": gemini_client.create_db_chat_session(context, database_name)
-            }
+            _chat_sessions[session_id] = await _new_db_session(context, database_name)
+        else:
+            # Rebuild when the cached schema prompt expired or was invalidated,
+            # or when the history has grown past the compaction threshold
+            schema_context = _session_schema_context(context, database_name)
+            cache_name = await llm_client.get_context_cache_name(schema_context, database_name)
+            history = existing_session["chat"].get_history(curated=True)
+            compacted = _compact_if_needed(session_id, history)
+
+            if compacted is not None or cache_name != existing_session.get("cache_name"):
+                existing_session["chat"] = await llm_client.create_db_chat_session(
+                    schema_context,
+                    database_name,
+                    history=compacted if compacted is not None else history
+                )
+                existing_session["cache_name"] = cache_name
+                existing_session["schema_context"] = schema_context
+                if compacted is not None:
+                    # Pruned schema blocks sent earlier were folded into the summary
+                    existing_session["schema_tables"] = set()
+                logger.info(f"Rebuilt session {session_id[:8]}... on schema cache: {cache_name}")
 
     return session_id, _chat_sessions[session_id]["chat"]
 
+async def resolve_session_database(
+        session_id: Optional[str],
+        requested_database: Optional[str],
+        default_database: str
+) -> Tuple[str, Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Pick the database a DB chat request runs against
+
+    An explicitly requested database wins (rebinding an existing session), then
+    the database the session was created on, then the default for new sessions.
+
+    Returns:
+        Tuple of (database_name, registry_entry, error_message)
+    """
+    if requested_database:
+        database_name = requested_database.strip().lower()
+    else:
+        session = _chat_sessions.get(session_id) if session_id else None
+        if session and session["type"] == "db_query":
+            database_name = session["database"]
+        else:
+            database_name = default_database
+
+    entry, error = await ensure_database(database_name)
+    if error:
+        return database_name, None, f"Database '{database_name}' is not available: {error}"
+    return database_name, entry, None
+
+def _session_schema_context(context: str, database_name: str) -> str:
+    """
+    Schema text for a new session's system instruction
+    With pruning active only the table catalog goes in; columns travel with each question
+    """
+    index = get_pruning_index(database_name)
+    return index.catalog() if index else context
+
+def _with_relevant_schema(session_id: str, message: str, database_name: str) -> Tuple[str, List[str]]:
+    """
+    Prefix a question with the schema of its most relevant tables
+    Tables already sent earlier in the session are not repeated
+
+    Returns:
+        Tuple of (message, selected_tables) - pass the tables to _mark_schema_sent once the message was sent
+    """
+    index = get_pruning_index(database_name)
+    if index is None:
+        return message, []
+
+    session = _chat_sessions.get(session_id) or {}
+    sent_tables = session.get("schema_tables", set())
+    top_k, max_tokens = get_settings().get_schema_budget(database_name)
+
+    tables = index.select_tables(message, top_k, max_tokens, exclude=sent_tables)
+    if not tables:
+        return message, []
+
+    logger.info(f"Schema pruning for {database_name}: sending {len(tables)} tables ({len(sent_tables)} sent in session)")
+
+    return f"Relevant schema for this question:\n{index.render(tables)}\n\nQuestion: {message}", tables
+
+def _mark_schema_sent(session_id: str, tables: List[str]):
+    """Record tables whose schema is now in the session's history"""
+    session = _chat_sessions.get(session_id)
+    if session is not None and tables:
+        session.setdefault("schema_tables", set()).update(tables)
+
 def get_or_create_file_session(session_id: Optional[str]) -> tuple:
     """Get existing or create new file analysis chat session"""
     if not session_id or session_id not in _chat_sessions:
@@ -55,26 +204,46 @@ def get_or_create_file_session(session_id: Optional[str]) -> tuple:
 
         _chat_sessions[session_id] = {
             "type": "file_analysis",
-            "chat": gemini_client.create_file_analysis_session()
+            "chat": llm_client.create_file_analysis_session()
         }
         logger.info(f"Created new file analysis session: {session_id[:8]}...")
+    else:
+        existing_session = _chat_sessions[session_id]
+        compacted = _compact_if_needed(session_id, existing_session["chat"].get_history(curated=True))
+        if compacted is not None:
+            existing_session["chat"] = llm_client.create_file_analysis_session(history=compacted)
 
     return session_id, _chat_sessions[session_id]["chat"]
 
-def clear_session(session_id: str, database_name: str = "pa") -> bool:
+def _compact_if_needed(session_id: str, history: list) -> Optional[list]:
+    """Compacted history if this session is over the token threshold, else None"""
+    settings = get_settings()
+    if history_tokens(history) < settings.SESSION_COMPACTION_TOKEN_THRESHOLD:
+        return None
+
+    return compact_history(
+        history,
+        keep_turns=settings.SESSION_COMPACTION_KEEP_TURNS,
+        artifact_min_chars=settings.SESSION_ARTIFACT_MIN_CHARS,
+        session_id=session_id
+    )
+
+async def clear_session(session_id: str, database_name: str = "pa", context: Optional[str] = None) -> bool:
     """
     Clear a chat session
     UPDATED: Now accepts database_name parameter for proper recreation
+    UPDATED: Accepts the schema context so the reset session keeps its schema (and shared cache)
     """
     if session_id in _chat_sessions:
         session_type = _chat_sessions[session_id]["type"]
 
         if session_type == "db_query":
-            # Reset with clean context and current database
-            _chat_sessions[session_id]["chat"] = gemini_client.create_db_chat_session("[Context has been reset]", database_name)
-            _chat_sessions[session_id]["database"] = database_name
+            # Reset with clean history and current database
+            _chat_sessions[session_id] = await _new_db_session(context or "[Context has been reset]", database_name)
         else:
-            _chat_sessions[session_id]["chat"] = gemini_client.create_file_analysis_session()
+            _chat_sessions[session_id]["chat"] = llm_client.create_file_analysis_session()
+
+        _chat_sessions.touch(session_id)
 
         logger.info(f"Cleared chat session: {session_id[:8]}... for database: {database_name}")
         return True
@@ -82,36 +251,85 @@ def clear_session(session_id: str, database_name: str = "pa") -> bool:
     logger.warning(f"Session not found for clearing: {session_id[:8]}...")
     return False
 
-def process_db_message(message: str, session_id: Optional[str], context: str, database_name: str = "pa") -> ChatResponse:
+async def process_db_message(message: str, session_id: Optional[str], context: str, database_name: str = "pa",
+                             defer_interpretation: bool = False,
+                             is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                             connection_string: Optional[str] = None) -> ChatResponse:
     """
     Process a chat message for database queries
     UPDATED: Now accepts database_name parameter
+    UPDATED: Async - awaits Gemini and runs SQL on the DB executor
+    UPDATED: Reuses cached SQL for repeated questions, skipping generation
+    UPDATED: defer_interpretation returns results at once with an interpretation_id
+    UPDATED: Responses carry per-stage timings and token counts
+    UPDATED: is_disconnected (e.g. request.is_disconnected) lets SQL be cancelled when the client leaves
+    UPDATED: SQL runs against connection_string (the default database if None)
     """
-    # Get or create session with database-specific instructions
-    session_id, chat = get_or_create_db_session(session_id, context, database_name)
-
+    with request_timings() as timings:
+        # Get or create session with database-specific instructions
+        with timed_stage("session"):
+            session_id, chat = await get_or_create_db_session(session_id, context, database_name)
+
+        try:
+            response = await _answer_db_message(
+                message, session_id, chat, context, database_name, defer_interpretation, is_disconnected,
+                connection_string
+            )
+        finally:
+            # Re-account the session's size now that its history has grown
+            _chat_sessions.touch(session_id)
+
+        return _with_timings(response, "db_chat", timings)
+
+def _with_timings(response: ChatResponse, endpoint: str, timings: RequestTimings) -> ChatResponse:
+    """Record a request's timings for /debug/timings and attach them to the response if enabled"""
+    summary = timings.as_dict()
+    get_timing_aggregator().record(endpoint, summary)
+
+    if _settings.REQUEST_TIMINGS_IN_RESPONSE:
+        response.timings = summary
+    return response
+
+async def _answer_db_message(message: str, session_id: str, chat, context: str, database_name: str,
+                             defer_interpretation: bool,
+                             is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                             connection_string: Optional[str] = None) -> ChatResponse:
+    """Answer a database message within an existing session"""
     # Handle direct SQL queries
     if message.strip().lower().startswith("select "):
-        return _execute_direct_sql(message, session_id, chat, message)
+        return await _execute_direct_sql(
+            message, session_id, chat, message, defer_interpretation, is_disconnected, connection_string
+        )
 
     # Regular chat message - let Gemini decide if SQL is needed
     try:
-        response = chat.send_message(message)
-        response_text = response.text
-
-        # Check if Gemini generated SQL
-        sql_matches = re.findall(r"```sql\s*(.*?)\s*```", response_text, re.DOTALL)
-
-        if sql_matches:
-            sql_query = sql_matches[0].strip()
-            return _execute_generated_sql(sql_query, session_id, chat, message)
-        else:
-            # No SQL needed - just return the response
-            return ChatResponse(
-                response=response_text,
-                session_id=session_id,
-                user_question=message
-            )
+        # Only a session's first question means the same thing in every session
+        context_free = _is_context_free(chat)
+        with timed_stage("cache_lookup"):
+            sql_query = await _get_cached_sql(chat, message, context, database_name) if context_free else None
+        from_cache = sql_query is not None
+
+        if not from_cache:
+            with timed_stage("generation"):
+                response_text = await _generate_reply(session_id, chat, message, context, database_name)
+
+            # Check if Gemini generated SQL
+            sql_query = _extract_sql(response_text)
+
+            if not sql_query:
+                # No SQL needed - just return the response
+                return ChatResponse(
+                    response=response_text,
+                    session_id=session_id,
+                    user_question=message
+                )
+
+        chat_response = await _execute_generated_sql(
+            sql_query, session_id, chat, message, defer_interpretation, is_disconnected, connection_string
+        )
+        if context_free:
+            await _update_sql_cache(message, context, database_name, sql_query, chat_response.sql_error, from_cache)
+        return chat_response
 
     except Exception as e:
         logger.error(f"Error processing chat message: {str(e)}")
@@ -121,10 +339,124 @@ def process_db_message(message: str, session_id: Optional[str], context: str, da
             user_question=message
         )
 
-def _execute_direct_sql(sql_query: str, session_id: str, chat, user_question: str) -> ChatResponse:
+async def _generate_reply(session_id: str, chat, message: str, context: str, database_name: str) -> str:
+    """
+    Ask Gemini to answer a question, coalescing identical concurrent questions
+    Sessions that joined another session's call get the exchange recorded in their own history
+    Only context-free turns are coalesced: with prior turns the answer depends on the conversation
+    """
+    key = (database_name, schema_fingerprint(context), normalize_question(message))
+    ran_here = False
+
+    async def generate() -> str:
+        nonlocal ran_here
+        ran_here = True
+        prompt, tables = _with_relevant_schema(session_id, message, database_name)
+        response = await llm_client.send_message(chat, prompt)
+        # A failed send left no schema in the history, so the tables stay eligible
+        _mark_schema_sent(session_id, tables)
+        return response.text
+
+    if not _is_context_free(chat):
+        return await generate()
+
+    response_text = await _generation_flight.do(key, generate)
+
+    if not ran_here:
+        logger.info(f"Coalesced generation for session {session_id[:8]}... on database: {database_name}")
+        llm_client.record_exchange(chat, message, response_text)
+
+    return response_text
+
+def get_coalescing_stats() -> Dict[str, Any]:
+    """Counters for coalesced SQL generations and executions"""
+    return {
+        "generation": _generation_flight.stats(),
+        "execution": get_query_coalescing_stats()
+    }
+
+def _is_context_free(chat) -> bool:
+    """
+    Whether a chat has no prior turns, so a question's answer doesn't depend on the conversation
+    Follow-ups ("only the ones hired this year") must not share cached or coalesced SQL
+    """
+    return not chat.get_history(curated=True)
+
+async def _get_cached_sql(chat, message: str, context: str, database_name: str) -> Optional[str]:
+    """
+    Look up previously generated SQL for this question (callers only ask on context-free turns)
+    On a hit the exchange is recorded in the chat history as if Gemini had answered
+    The SQLite lookup runs in a worker thread, off the event loop
+    """
+    query_cache = get_query_cache()
+    if query_cache is None:
+        return None
+
+    sql_query = await asyncio.to_thread(query_cache.get, message, database_name, context)
+    if sql_query:
+        logger.info(f"Query cache hit for database {database_name}: {sql_query[:50]}...")
+        llm_client.record_exchange(chat, message, f"```sql\n{sql_query}\n```")
+    return sql_query
+
+async def _update_sql_cache(message: str, context: str, database_name: str, sql_query: str,
+                            sql_error: Optional[str], from_cache: bool):
+    """Store SQL that executed successfully; drop cached SQL that no longer works (off the event loop)"""
+    query_cache = get_query_cache()
+    if query_cache is None:
+        return
+
+    if sql_error:
+        # A cancelled query or an unreachable database says nothing about whether the SQL works
+        if from_cache and sql_error_type(sql_error) not in SQL_ERRORS_NOT_CAUSED_BY_SQL:
+            await asyncio.to_thread(query_cache.discard, message, database_name, context)
+    elif not from_cache:
+        await asyncio.to_thread(query_cache.put, message, database_name, context, sql_query)
+
+def _extract_sql(response_text: str) -> Optional[str]:
+    """Return the first ```sql block from a Gemini reply, if any"""
+    sql_matches = re.findall(r"```sql\s*(.*?)\s*```", response_text or "", re.DOTALL)
+    return sql_matches[0].strip() if sql_matches else None
+
+def _direct_interpretation_prompt(text_result: str) -> str:
+    """Prompt asking Gemini to summarize results of a user-typed query"""
+    return (
+        f"Analyze these SQL results and provide a concise summary:\n\n{text_result}\n\n"
+        "Use HTML formatting with <b> tags for key points."
+    )
+
+def _generated_interpretation_prompt(text_result: str) -> str:
+    """Prompt asking Gemini to interpret results of its own query"""
+    return (
+        f"The SQL query returned:\n\n{text_result}\n\n"
+        "Analyze these results and provide insights. Use HTML formatting."
+    )
+
+async def _result_digest(query_result: QueryResult) -> str:
+    """
+    Token-bounded digest of a query result for the interpretation prompt
+    Built off the event loop since large results take real CPU to summarize
+    """
+    max_tokens = get_settings().RESULT_DIGEST_MAX_TOKENS
+
+    def digest() -> str:
+        # Only small results are rendered in full; summarize_table uses the text when it fits
+        return summarize_table(query_result.table, max_tokens, query_result.text_within(max_tokens * 4))
+
+    with timed_stage("digest"):
+        return await asyncio.to_thread(digest)
+
+def _sql_error_prompt(error: str) -> str:
+    """Prompt asking Gemini for an alternative after a failed query"""
+    return f"The SQL query failed with: {error}\n\nSuggest an alternative approach."
+
+async def _execute_direct_sql(sql_query: str, session_id: str, chat, user_question: str,
+                              defer_interpretation: bool = False,
+                              is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                              connection_string: Optional[str] = None) -> ChatResponse:
     """Execute direct SQL query"""
     logger.info(f"Direct SQL query detected: {sql_query[:50]}...")
-    query_result, error = execute_sql_query(sql_query)
+    with timed_stage("sql"):
+        query_result, error = await execute_sql_query_async(sql_query, connection_string, is_disconnected)
 
     if error:
         return ChatResponse(
@@ -133,105 +465,377 @@ def _execute_direct_sql(sql_query: str, session_id: str, chat, user_question: st
             has_sql=True,
             sql_query=sql_query,
             sql_error=error,
+            sql_error_type=sql_error_type(error),
             user_question=user_question
         )
     else:
-        # Use text result for AI interpretation
-        text_result = query_result["text"]
-        table_data = query_result["table"]
-
         # Simple interpretation request
-        interpretation_response = chat.send_message(
-            f"Analyze these SQL results and provide a concise summary:\n\n{text_result}\n\n"
-            "Use HTML formatting with <b> tags for key points."
-        )
-
-        return ChatResponse(
-            response=interpretation_response.text,
-            session_id=session_id,
-            has_sql=True,
-            sql_query=sql_query,
-            sql_result=text_result,  # Keep for backward compatibility
-            sql_table=table_data,    # NEW: Structured table data
-            user_question=user_question,
-            interpretation=interpretation_response.text
+        return await _interpreted_response(
+            chat,
+            _direct_interpretation_prompt,
+            query_result,
+            sql_query,
+            session_id,
+            user_question,
+            defer_interpretation
         )
 
-def _execute_generated_sql(sql_query: str, session_id: str, chat, user_question: str) -> ChatResponse:
+async def _execute_generated_sql(sql_query: str, session_id: str, chat, user_question: str,
+                                 defer_interpretation: bool = False,
+                                 is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+                                 connection_string: Optional[str] = None) -> ChatResponse:
     """Execute SQL query generated by Gemini"""
     logger.info(f"AI generated SQL query: {sql_query[:50]}...")
-    query_result, error = execute_sql_query(sql_query)
+    with timed_stage("sql"):
+        query_result, error = await execute_sql_query_async(sql_query, connection_string, is_disconnected)
 
     if error:
-        # Ask for alternative approach
-        error_response = chat.send_message(
-            f"The SQL query failed with: {error}\n\nSuggest an alternative approach."
-        )
+        error_type = sql_error_type(error)
+        if error_type in SQL_ERRORS_NOT_CAUSED_BY_SQL:
+            # Nobody is waiting for an alternative, or no alternative would run either
+            response_text = f"<p><b>SQL Error:</b> {error}</p>"
+        else:
+            # Ask for alternative approach
+            with timed_stage("error_reply"):
+                response_text = (await llm_client.send_message(chat, _sql_error_prompt(error))).text
 
         return ChatResponse(
-            response=error_response.text,
+            response=response_text,
             session_id=session_id,
             has_sql=True,
             sql_query=sql_query,
             sql_error=error,
+            sql_error_type=error_type,
             user_question=user_question
         )
     else:
-        # Use text result for AI interpretation
-        text_result = query_result["text"]
-        table_data = query_result["table"]
-
         # Ask for analysis of results
-        interpretation_response = chat.send_message(
-            f"The SQL query returned:\n\n{text_result}\n\n"
-            "Analyze these results and provide insights. Use HTML formatting."
+        return await _interpreted_response(
+            chat,
+            _generated_interpretation_prompt,
+            query_result,
+            sql_query,
+            session_id,
+            user_question,
+            defer_interpretation
+        )
+
+async def _interpreted_response(chat, build_prompt: Callable[[str], str], query_result: QueryResult,
+                                sql_query: str, session_id: str, user_question: str,
+                                defer_interpretation: bool) -> ChatResponse:
+    """
+    Build the response for successful SQL results
+    Interprets them now, or registers a deferred interpretation and returns the table straight away
+    build_prompt turns the result digest into the prompt; a deferred digest is built in the deferred task
+    """
+    table_data, cursor_id = _first_page(query_result.table, session_id)
+    text_result = _response_text(query_result, table_data, cursor_id)
+
+    if defer_interpretation:
+        interpretation_id = register_interpretation(
+            _deferred_interpretation(session_id, chat, build_prompt, query_result), session_id
         )
+        row_count = table_data.row_count if table_data else 0
+        if table_data and table_data.truncated:
+            at_least = "" if table_data.total_is_exact else "at least "
+            summary = f"<p>Showing the first <b>{row_count}</b> of {at_least}{table_data.total_rows_estimate} rows.</p>"
+        else:
+            summary = f"<p>Query returned <b>{row_count}</b> rows.</p>"
 
         return ChatResponse(
-            response=interpretation_response.text,
+            response=summary,
             session_id=session_id,
             has_sql=True,
             sql_query=sql_query,
-            sql_result=text_result,  # Keep for backward compatibility
-            sql_table=table_data,    # NEW: Structured table data
+            sql_result=text_result,
+            sql_table=table_data,
             user_question=user_question,
-            interpretation=interpretation_response.text
+            interpretation_id=interpretation_id,
+            cursor_id=cursor_id
         )
 
+    interpretation = await _interpret_result(chat, build_prompt, query_result)
+
+    return ChatResponse(
+        response=interpretation,
+        session_id=session_id,
+        has_sql=True,
+        sql_query=sql_query,
+        sql_result=text_result,  # Keep for backward compatibility
+        sql_table=table_data,    # NEW: Structured table data
+        user_question=user_question,
+        interpretation=interpretation,
+        cursor_id=cursor_id
+    )
+
+def _deferred_interpretation(session_id: str, chat, build_prompt: Callable[[str], str],
+                             query_result: QueryResult) -> Callable[[], Awaitable[str]]:
+    """
+    Coroutine factory interpreting a result on a throwaway chat built from the history as of now
+    The job may run after later turns, or alongside one, so it never touches the session's chat
+    """
+    session = _chat_sessions.get(session_id) or {}
+    database_name = session.get("database", "pa")
+    schema_context = session.get("schema_context", "")
+    history = list(chat.get_history(curated=True))
+
+    async def interpret() -> str:
+        scratch_chat = await llm_client.create_db_chat_session(schema_context, database_name, history=history)
+        return await _interpret_result(scratch_chat, build_prompt, query_result, PRIORITY_DEFERRED)
+
+    return interpret
+
+def _first_page(table_data: Optional[TableData], session_id: str) -> Tuple[Optional[TableData], Optional[str]]:
+    """
+    Keep results larger than one page behind a server-side cursor
+    Returns the table to embed in the response (first page only when paged) and the cursor id
+    """
+    page_size = _settings.RESULT_PAGE_SIZE
+    if table_data is None or len(table_data.rows) <= page_size:
+        return table_data, None
+
+    cursor_id = get_result_cursor_store().put(table_data, session_id)
+    first_page = table_data.model_copy(update={"rows": table_data.rows[:page_size]})
+    return first_page, cursor_id
+
+def _response_text(query_result: QueryResult, table_data: Optional[TableData], cursor_id: Optional[str]) -> str:
+    """Text form of the rows a response carries - only the first page is rendered for paged results"""
+    if cursor_id:
+        return query_result.text_for_rows(table_data.rows)
+    return query_result.text
+
+async def _interpret(chat, prompt: str, priority: int = PRIORITY_INTERACTIVE) -> str:
+    """Ask Gemini to interpret SQL results"""
+    with timed_stage("interpretation"):
+        interpretation_response = await llm_client.send_message(chat, prompt, priority)
+    return interpretation_response.text
+
+async def _interpret_result(chat, build_prompt: Callable[[str], str], query_result: QueryResult,
+                            priority: int = PRIORITY_INTERACTIVE) -> str:
+    """Digest a query result and ask Gemini to interpret it"""
+    return await _interpret(chat, build_prompt(await _result_digest(query_result)), priority)
+
+async def _stream_reply(chat, prompt: str, priority: int = PRIORITY_INTERACTIVE) -> AsyncIterator[str]:
+    """Yield the text of a Gemini reply chunk by chunk"""
+    async for chunk in llm_client.send_message_stream(chat, prompt, priority):
+        if chunk.text:
+            yield chunk.text
+
+async def stream_db_message(
+        message: str,
+        session_id: Optional[str],
+        context: str,
+        database_name: str = "pa",
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None,
+        connection_string: Optional[str] = None
+) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of process_db_message
+
+    Yields (event, data) pairs as each stage completes:
+        session        - session id in use
+        sql_generated  - SQL extracted from the ```sql block (or the direct query)
+        sql_result     - TableData as soon as the query returns
+        sql_error      - query failure message and sql_error_type ("timeout", "cancelled", "unavailable" or "error")
+        token          - interpretation text, chunk by chunk
+        error          - model failure
+        done           - the complete ChatResponse
+    """
+    session_id, chat = await get_or_create_db_session(session_id, context, database_name)
+    yield "session", {"session_id": session_id, "database": database_name}
+
+    is_direct_sql = message.strip().lower().startswith("select ")
+
+    try:
+        context_free = _is_context_free(chat)
+        if is_direct_sql:
+            logger.info(f"Direct SQL query detected: {message[:50]}...")
+            sql_query = message
+        elif context_free:
+            sql_query = await _get_cached_sql(chat, message, context, database_name)
+        else:
+            sql_query = None
+
+        from_cache = not is_direct_sql and sql_query is not None
+
+        if not sql_query:
+            response_text = await _generate_reply(session_id, chat, message, context, database_name)
+            sql_query = _extract_sql(response_text)
+
+            if not sql_query:
+                # No SQL needed - the reply is the answer
+                yield "token", {"text": response_text}
+                yield "done", ChatResponse(
+                    response=response_text,
+                    session_id=session_id,
+                    user_question=message
+                )
+                return
+
+            logger.info(f"AI generated SQL query: {sql_query[:50]}...")
+
+        yield "sql_generated", {"sql_query": sql_query, "cached": from_cache}
+
+        query_result, error = await execute_sql_query_async(sql_query, connection_string, is_disconnected)
+
+        if not is_direct_sql and context_free:
+            await _update_sql_cache(message, context, database_name, sql_query, error, from_cache)
+
+        if error:
+            yield "sql_error", {"sql_error": error, "sql_error_type": sql_error_type(error)}
+
+            if is_direct_sql or sql_error_type(error) in SQL_ERRORS_NOT_CAUSED_BY_SQL:
+                response_text = f"<p><b>SQL Error:</b> {error}</p>"
+                yield "token", {"text": response_text}
+            else:
+                parts = []
+                async for text in _stream_reply(chat, _sql_error_prompt(error)):
+                    parts.append(text)
+                    yield "token", {"text": text}
+                response_text = "".join(parts)
+
+            yield "done", ChatResponse(
+                response=response_text,
+                session_id=session_id,
+                has_sql=True,
+                sql_query=sql_query,
+                sql_error=error,
+                sql_error_type=sql_error_type(error),
+                user_question=message
+            )
+            return
+
+        table_data, cursor_id = _first_page(query_result.table, session_id)
+        text_result = _response_text(query_result, table_data, cursor_id)
+        yield "sql_result", table_data
+        if cursor_id:
+            yield "result_cursor", {"cursor_id": cursor_id}
+
+        digest = await _result_digest(query_result)
+        prompt = (_direct_interpretation_prompt(digest) if is_direct_sql
+                  else _generated_interpretation_prompt(digest))
+        parts = []
+        async for text in _stream_reply(chat, prompt):
+            parts.append(text)
+            yield "token", {"text": text}
+        interpretation = "".join(parts)
+
+        yield "done", ChatResponse(
+            response=interpretation,
+            session_id=session_id,
+            has_sql=True,
+            sql_query=sql_query,
+            sql_result=text_result,
+            sql_table=table_data,
+            user_question=message,
+            interpretation=interpretation,
+            cursor_id=cursor_id
+        )
+
+    except Exception as e:
+        logger.error(f"Error streaming chat message: {str(e)}")
+        yield "error", {"message": "The Model is currently at its capacity limit. Please try again."}
+    finally:
+        _chat_sessions.touch(session_id)
+
+async def stream_db_batch(
+        questions: List[str],
+        context: str,
+        database_name: str = "pa",
+        defer_interpretation: bool = False,
+        connection_string: Optional[str] = None
+) -> AsyncIterator[BatchItemResponse]:
+    """
+    Answer a batch of independent questions concurrently, yielding each result as it finishes
+    Identical questions are answered once; each gets a throwaway chat so answers
+    don't depend on batch order. Gemini and DB concurrency limits still apply.
+    """
+    positions: Dict[str, List[int]] = {}
+    for index, question in enumerate(questions):
+        positions.setdefault(normalize_question(question), []).append(index)
+
+    logger.info(f"Batch of {len(questions)} questions ({len(positions)} unique) on database: {database_name}")
+
+    semaphore = asyncio.Semaphore(_settings.BATCH_MAX_CONCURRENCY)
+    schema_context = _session_schema_context(context, database_name)
+
+    async def answer(indices: List[int]) -> BatchItemResponse:
+        question = questions[indices[0]]
+        session_id = str(uuid.uuid4())
+
+        async with semaphore:
+            with request_timings() as timings:
+                try:
+                    chat = await llm_client.create_db_chat_session(schema_context, database_name)
+                    result = await _answer_db_message(
+                        question, session_id, chat, context, database_name, defer_interpretation,
+                        connection_string=connection_string
+                    )
+                except Exception as e:
+                    logger.error(f"Error answering batch question: {str(e)}")
+                    result = ChatResponse(
+                        response=f"<p><b>Error:</b> There was a problem answering this question: {str(e)}</p>",
+                        session_id=session_id,
+                        user_question=question
+                    )
+                result = _with_timings(result, "db_batch", timings)
+
+        return BatchItemResponse(indices=indices, question=question, result=result)
+
+    tasks = [asyncio.ensure_future(answer(indices)) for indices in positions.values()]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        # Client went away (or the batch finished) - drop anything still running
+        for task in tasks:
+            task.cancel()
+
 # Add this function anywhere in the file
 def clear_all_sessions() -> int:
     """
     Clear all chat sessions (both db and file analysis)
     Returns number of sessions cleared
     """
-    global _chat_sessions
-
     session_count = len(_chat_sessions)
     _chat_sessions.clear()
 
     logger.info(f"Cleared all chat sessions: {session_count} sessions removed")
     return session_count
 
-def get_session_count() -> Dict[str, int]:
-    """Get count of current sessions by type"""
-    global _chat_sessions
-
+def get_session_count() -> Dict[str, Any]:
+    """Get count of current sessions by type, plus memory and eviction stats"""
     db_sessions = sum(1 for session in _chat_sessions.values() if session["type"] == "db_query")
     file_sessions = sum(1 for session in _chat_sessions.values() if session["type"] == "file_analysis")
 
+    by_database: Dict[str, int] = {}
+    for session in _chat_sessions.values():
+        if session["type"] == "db_query":
+            by_database[session["database"]] = by_database.get(session["database"], 0) + 1
+
     return {
         "total": len(_chat_sessions),
         "database": db_sessions,
-        "file_analysis": file_sessions
+        "file_analysis": file_sessions,
+        "by_database": by_database,
+        **_chat_sessions.stats()
     }
 
-# File processing functions remain unchanged
-def process_file_message(message: str, session_id: Optional[str]) -> ChatResponse:
-    """Process a chat message for file analysis - UNCHANGED"""
+def start_session_sweeper():
+    """Start evicting idle sessions in the background"""
+    _chat_sessions.start_sweeper()
+
+async def stop_session_sweeper():
+    """Stop the idle session sweeper"""
+    await _chat_sessions.stop_sweeper()
+
+# File processing functions
+async def process_file_message(message: str, session_id: Optional[str]) -> ChatResponse:
+    """Process a chat message for file analysis"""
     session_id, chat = get_or_create_file_session(session_id)
 
     try:
-        response = chat.send_message(message)
+        response = await llm_client.send_message(chat, message, PRIORITY_FILE_ANALYSIS)
         return ChatResponse(
             response=response.text,
             session_id=session_id
@@ -242,9 +846,11 @@ def process_file_message(message: str, session_id: Optional[str]) -> ChatRespons
             response=f"<p><b>Error:</b> The Model is currently at its capacity limit. Please try again.</p>",
             session_id=session_id
         )
+    finally:
+        _chat_sessions.touch(session_id)
 
-def process_file_upload(file_info: str, session_id: Optional[str]) -> ChatResponse:
-    """Process uploaded file information - UNCHANGED"""
+async def process_file_upload(file_info: str, session_id: Optional[str]) -> ChatResponse:
+    """Process uploaded file information"""
     session_id, chat = get_or_create_file_session(session_id)
 
     try:
@@ -253,7 +859,7 @@ def process_file_upload(file_info: str, session_id: Optional[str]) -> ChatRespon
             f"Analyze this data and provide insights about patterns and statistics."
         )
 
-        response = chat.send_message(file_message)
+        response = await llm_client.send_message(chat, file_message, PRIORITY_FILE_ANALYSIS)
 
         return ChatResponse(
             response=response.text,
@@ -264,4 +870,30 @@ def process_file_upload(file_info: str, session_id: Optional[str]) -> ChatRespon
         return ChatResponse(
             response=f"<p><b>Error:</b> There was a problem analyzing the file. Please try again.</p>",
             session_id=session_id
-        )
\ No newline at end of file
+        )
+    finally:
+        _chat_sessions.touch(session_id)
+
+async def stream_file_message(message: str, session_id: Optional[str]) -> AsyncIterator[Tuple[str, Any]]:
+    """
+    Streaming variant of process_file_message
+    Yields session, token and done events (or error)
+    """
+    session_id, chat = get_or_create_file_session(session_id)
+    yield "session", {"session_id": session_id}
+
+    try:
+        parts = []
+        async for text in _stream_reply(chat, message, PRIORITY_FILE_ANALYSIS):
+            parts.append(text)
+            yield "token", {"text": text}
+
+        yield "done", ChatResponse(
+            response="".join(parts),
+            session_id=session_id
+        )
+    except Exception as e:
+        logger.error(f"Error streaming file analysis message: {str(e)}")
+        yield "error", {"message": "The Model is currently at its capacity limit. Please try again."}
+    finally:
+        _chat_sessions.touch(session_id)
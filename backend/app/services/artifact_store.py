@@ -0,0 +1,68 @@
+"""
+Server-side store for large tool outputs (SQL result dumps, file samples).
+Compacted chat histories reference these by id instead of keeping them inline.
+"""
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.config import get_settings
+from app.core.logging import configure_logging
+
+# Configure logging
+logger = configure_logging(logger_name="artifact-store")
+
+class ArtifactStore:
+    """Bounded LRU store of text artifacts"""
+
+    def __init__(self, max_bytes: int = 128 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._artifacts: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._evictions = 0
+
+    def put(self, kind: str, content: str, session_id: Optional[str] = None) -> str:
+        """Store an artifact and return its id"""
+        artifact_id = uuid.uuid4().hex[:12]
+        size = len(content.encode("utf-8"))
+
+        self._artifacts[artifact_id] = {
+            "kind": kind,
+            "content": content,
+            "session_id": session_id,
+            "bytes": size,
+            "created": time.time()
+        }
+        self._total_bytes += size
+
+        while len(self._artifacts) > 1 and self._total_bytes > self.max_bytes:
+            _, evicted = self._artifacts.popitem(last=False)
+            self._total_bytes -= evicted["bytes"]
+            self._evictions += 1
+
+        return artifact_id
+
+    def get(self, artifact_id: str) -> Optional[Dict[str, Any]]:
+        """Get an artifact by id, or None if unknown or evicted"""
+        artifact = self._artifacts.get(artifact_id)
+        if artifact is not None:
+            self._artifacts.move_to_end(artifact_id)
+        return artifact
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "artifacts": len(self._artifacts),
+            "bytes": self._total_bytes,
+            "evictions": self._evictions
+        }
+
+# Create a global store instance
+_artifact_store = None
+
+def get_artifact_store() -> ArtifactStore:
+    """Get the artifact store (singleton pattern)"""
+    global _artifact_store
+    if _artifact_store is None:
+        _artifact_store = ArtifactStore(get_settings().ARTIFACT_STORE_MAX_BYTES)
+    return _artifact_store
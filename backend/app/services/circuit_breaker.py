@@ -0,0 +1,123 @@
+"""
+Circuit breakers for database servers.
+After repeated connection failures a database's breaker opens and queries fail
+fast instead of waiting on a dead server. Once the reset timeout passes, a
+single probe query is let through (half-open): success closes the breaker,
+failure opens it again.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict
+
+from app.core.config import get_settings
+from app.core.logging import configure_logging
+
+# Configure logging
+logger = configure_logging(logger_name="circuit-breaker")
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """
+    Breaker for one database
+
+    Thread-safe: allow/record_* are called from DB executor threads.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = STATE_CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._stats = {"opened": 0, "rejected": 0, "probes": 0}
+
+    def allow(self) -> bool:
+        """Whether a query may run now; in half-open state only one probe runs at a time"""
+        with self._lock:
+            if self._state == STATE_OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = STATE_HALF_OPEN
+
+            if self._state == STATE_CLOSED:
+                return True
+            if self._state == STATE_HALF_OPEN and not self._probing:
+                self._probing = True
+                self._stats["probes"] += 1
+                return True
+
+            self._stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._state != STATE_CLOSED:
+                logger.info("Circuit closed: probe query succeeded")
+            self._state = STATE_CLOSED
+            self._consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self):
+        """Count a connection-level failure, opening the breaker at the threshold or on a failed probe"""
+        with self._lock:
+            self._consecutive_failures += 1
+            if self._state == STATE_HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != STATE_OPEN:
+                    self._stats["opened"] += 1
+                    logger.warning(f"Circuit opened after {self._consecutive_failures} connection failures")
+                self._state = STATE_OPEN
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def record_other(self):
+        """Finish a query that failed for a reason unrelated to server health"""
+        with self._lock:
+            # The server answered, so a probe still proves it is up
+            if self._state == STATE_HALF_OPEN:
+                self._state = STATE_CLOSED
+                self._consecutive_failures = 0
+            self._probing = False
+
+    def retry_in(self) -> float:
+        """Seconds until an open breaker lets a probe through"""
+        with self._lock:
+            if self._state != STATE_OPEN:
+                return 0.0
+            return max(0.0, self.reset_timeout - (time.monotonic() - self._opened_at))
+
+    def stats(self) -> Dict[str, Any]:
+        """State, failure count and counters"""
+        retry_in = self.retry_in()
+        with self._lock:
+            return {
+                "state": self._state,
+                "consecutive_failures": self._consecutive_failures,
+                "retry_in_seconds": round(retry_in, 1),
+                **self._stats
+            }
+
+# Breakers by the database's (primary) connection string
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def get_circuit_breaker(connection_string: str) -> CircuitBreaker:
+    """Get (creating on first use) the breaker for a database"""
+    with _breakers_lock:
+        breaker = _breakers.get(connection_string)
+        if breaker is None:
+            settings = get_settings()
+            breaker = CircuitBreaker(
+                failure_threshold=settings.DB_BREAKER_FAILURE_THRESHOLD,
+                reset_timeout=settings.DB_BREAKER_RESET_SECONDS
+            )
+            _breakers[connection_string] = breaker
+        return breaker
+
+def get_breaker_stats(mask: Callable[[str], str] = str) -> Dict[str, Any]:
+    """Stats of every breaker, keyed by connection string passed through mask"""
+    with _breakers_lock:
+        breakers = dict(_breakers)
+    return {mask(key): breaker.stats() for key, breaker in breakers.items()}
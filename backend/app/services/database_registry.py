@@ -0,0 +1,121 @@
+"""
+Registry of the databases chat sessions can be bound to.
+Each database's schema context and connection string are held side by side,
+so sessions on different databases coexist. Schemas are discovered on first
+use and can be refreshed without touching sessions on other databases.
+UPDATED: Client-supplied names are checked against an identifier pattern and the
+         allow-list before discovery; failed discoveries back off before retrying
+"""
+import asyncio
+import re
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.logging import configure_logging
+from app.services.schema_discovery import discover_database_schema_with_connection
+from app.utils.single_flight import SingleFlight
+
+# Configure logging
+logger = configure_logging(logger_name="database-registry")
+
+# database name -> {"context", "connection_string", "registered_at"}
+_databases: Dict[str, Dict[str, Any]] = {}
+
+# Concurrent first requests for a database share one schema discovery
+_discovery_flight = SingleFlight("schema-discovery")
+
+# Names are spliced into the connection string, so anything but a plain identifier could inject attributes
+DATABASE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_]+$")
+
+# Time of the last failed discovery by database name
+_failed_discoveries: Dict[str, float] = {}
+
+def validate_database_name(database_name: str) -> Optional[str]:
+    """Why a client-supplied database name can't be used, or None if it can"""
+    if not DATABASE_NAME_PATTERN.match(database_name):
+        return "Database names may only contain letters, digits and underscores"
+
+    allowed = get_settings().DB_ALLOWED_DATABASES
+    if allowed and database_name.lower() not in {name.lower() for name in allowed}:
+        return f"Database '{database_name}' is not allowed"
+    return None
+
+def register_database(database_name: str, schema_context: str, connection_string: str) -> Dict[str, Any]:
+    """Register (or replace) a database's schema context and connection string"""
+    entry = {
+        "context": schema_context,
+        "connection_string": connection_string,
+        "registered_at": time.time()
+    }
+    _databases[database_name] = entry
+    logger.info(f"Registered database {database_name}: {len(schema_context)} chars of schema")
+    return entry
+
+def get_database(database_name: str) -> Optional[Dict[str, Any]]:
+    """Registered entry for a database, if its schema is known"""
+    return _databases.get(database_name)
+
+async def ensure_database(database_name: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    Get a database's entry, discovering its schema on first use
+
+    Returns:
+        Tuple of (entry, error_message)
+    """
+    entry = _databases.get(database_name)
+    if entry is not None:
+        return entry, None
+
+    error = validate_database_name(database_name)
+    if error:
+        return None, error
+
+    failed_at = _failed_discoveries.get(database_name)
+    if failed_at is not None and time.time() - failed_at < get_settings().DB_DISCOVERY_RETRY_SECONDS:
+        return None, "Schema discovery failed recently, try again later"
+
+    return await _discovery_flight.do(database_name, lambda: discover_database(database_name))
+
+async def discover_database(database_name: str) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """
+    (Re)discover a database's schema and register it
+    Discovery runs off the event loop; on failure any existing entry is kept
+    Names failing validate_database_name are rejected without connecting
+
+    Returns:
+        Tuple of (entry, error_message)
+    """
+    error = validate_database_name(database_name)
+    if error:
+        return None, error
+
+    connection_string = get_settings().build_connection_string(database_name)
+    if not connection_string:
+        return None, "Could not build connection string"
+
+    schema_context, error = await asyncio.to_thread(
+        discover_database_schema_with_connection, connection_string, database_name
+    )
+    if error:
+        logger.error(f"Schema discovery failed for {database_name}: {error}")
+        _failed_discoveries[database_name] = time.time()
+        return None, error
+
+    _failed_discoveries.pop(database_name, None)
+    return register_database(database_name, schema_context, connection_string), None
+
+def database_connection_strings() -> Dict[str, str]:
+    """Connection string of every registered database, by name"""
+    return {database_name: entry["connection_string"] for database_name, entry in _databases.items()}
+
+def list_databases() -> Dict[str, Dict[str, Any]]:
+    """Registered databases with their schema size and age"""
+    now = time.time()
+    return {
+        database_name: {
+            "schema_chars": len(entry["context"]),
+            "registered_seconds_ago": round(now - entry["registered_at"])
+        }
+        for database_name, entry in _databases.items()
+    }
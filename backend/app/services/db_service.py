@@ -1,132 +1,605 @@
 """
 Database service for executing SQL queries.
 UPDATED: Uses dynamic connection string from app state
+UPDATED: Added async wrappers that run pyodbc on a bounded executor
+UPDATED: Identical concurrent SELECTs are coalesced into one execution
+UPDATED: Records connect/execute/fetch/format stage timings for the current request
+UPDATED: Connections come from a thread-safe pool per connection string
+UPDATED: Results are fetched in batches and capped by rows/bytes, with truncation metadata
+UPDATED: Chat SELECT results are served from a short-TTL result cache
+UPDATED: Queries have per-database timeouts and are cancelled when every waiting client disconnects
+UPDATED: Results are QueryResults - rows built once, text rendered on demand (no pandas)
+UPDATED: The target connection string is an explicit argument - no shared current-database global
+UPDATED: SELECTs can be routed to read replicas, failing over on connection errors
+UPDATED: Only transient errors are retried (jittered backoff); a per-database circuit breaker fails fast
+UPDATED: probe_database reports why a connection test failed, for the background health prober
 """
+import asyncio
+import contextvars
+import random
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
 import pyodbc
-import pandas as pd
-from tenacity import retry, stop_after_attempt, wait_exponential
-from typing import Tuple, Optional, Dict, List, Any
+from typing import Tuple, Optional, Dict, List, Any, Awaitable, Callable, Hashable
 
 from app.core.config import get_settings
 from app.core.logging import configure_logging
 from app.models.api import TableData
+from app.services.circuit_breaker import get_breaker_stats, get_circuit_breaker
+from app.services.endpoint_router import get_endpoint_router, get_router_stats
+from app.services.sql_result_cache import get_sql_result_cache
+from app.utils.query_result import QueryResult
+from app.utils.request_timing import current_timings, timed_stage
+from app.utils.single_flight import SingleFlight
 
 # Configure logging
 logger = configure_logging(logger_name="db-service")
 
-# Global variable to store current connection string
-_current_connection_string = None
+# Bounded executor for blocking pyodbc work, so queries never run on the event loop
+_db_executor = ThreadPoolExecutor(
+    max_workers=get_settings().DB_MAX_WORKERS,
+    thread_name_prefix="db-query"
+)
+
+# Coalesces identical concurrent SELECTs against the same database
+_query_flight = SingleFlight("sql-execution")
+
+# Callers of an in-flight execution, as their disconnect checks (None = can't tell, keep running)
+_query_clients: Dict[Hashable, List[Optional[Callable[[], Awaitable[bool]]]]] = {}
+
+# Single-quoted SQL literal ('' escapes a quote); split() keeps literals at odd indexes
+SQL_STRING_LITERAL = re.compile(r"('(?:[^']|'')*')")
+DATABASE_NAME = re.compile(r"Database=([^;]+)", re.IGNORECASE)
+# SELECT ... INTO creates a table, so it must run on the primary
+SELECT_INTO = re.compile(r"\bINTO\b", re.IGNORECASE)
+
+# Error types for interrupted queries and open circuit breakers, see sql_error_type
+SQL_ERROR_TIMEOUT = "timeout"
+SQL_ERROR_CANCELLED = "cancelled"
+SQL_ERROR_UNAVAILABLE = "unavailable"
+QUERY_TIMEOUT_MESSAGE = "Query timed out"
+QUERY_CANCELLED_MESSAGE = "Query cancelled"
+DATABASE_UNAVAILABLE_MESSAGE = "Database unavailable"
+
+# ODBC SQLSTATEs for an expired query timeout, an unreachable server and a deadlock victim
+SQLSTATE_QUERY_TIMEOUT = "HYT00"
+SQLSTATE_CONNECTION_TIMEOUT = "HYT01"
+SQLSTATE_SERIALIZATION_FAILURE = "40001"
+
+# SQL Server error numbers worth retrying: deadlock victim, lock timeout resources and
+# Azure SQL's transient "service busy / database unavailable" errors
+TRANSIENT_NATIVE_ERRORS = {1205, 40197, 40501, 40613, 49918, 49919, 49920}
+# pyodbc messages carry the native error number as "... (1205) (SQLExecDirectW)"
+NATIVE_ERROR_NUMBER = re.compile(r"\((\d+)\) \(SQL\w+\)")
+
+# Error classes, see classify_db_error
+DB_ERROR_CONNECTION = "connection"  # Server unreachable: retried, counts against the circuit breaker
+DB_ERROR_TRANSIENT = "transient"  # Server up but the statement lost a race (deadlock, busy): retried
+DB_ERROR_PERMANENT = "permanent"  # Syntax, permissions, timeouts...: retrying can't help
+
+class PoolTimeout(Exception):
+    """Raised when no pooled connection became available within the acquire timeout"""
+
+class ConnectError(Exception):
+    """
+    Raised when opening a connection fails; wraps the driver error (same args and message)
+    Lets classify_db_error tell a login timeout (HYT00 from SQLDriverConnect) from a query timeout
+    """
+
+    def __init__(self, error: Exception):
+        super().__init__(*error.args)
+        self.error = error
 
-def set_connection_string(connection_string: str):
-    """Set the current connection string for database operations"""
-    global _current_connection_string
-    _current_connection_string = connection_string
-    logger.info("Updated database connection string")
+class QueryCancellation:
+    """
+    Cancels the statement a worker thread is running from another thread
 
-def get_connection_string() -> str:
-    """Get current connection string, fallback to settings if not set"""
-    global _current_connection_string
+    The worker attaches its cursor while the statement runs; cancel() records why
+    and calls cursor.cancel(), or stops the query from starting if it is still queued.
+    """
 
-    if _current_connection_string:
-        return _current_connection_string
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cursor = None
+        self.reason: Optional[str] = None
+
+    def attach(self, cursor):
+        with self._lock:
+            self._cursor = cursor
+
+    def detach(self):
+        with self._lock:
+            self._cursor = None
+
+    def cancel(self, reason: str):
+        with self._lock:
+            if self.reason is not None:
+                return
+            self.reason = reason
+            if self._cursor is not None:
+                try:
+                    self._cursor.cancel()
+                except Exception as e:
+                    logger.warning(f"Failed to cancel running query: {str(e)}")
+        logger.warning(f"Cancelling query ({reason})")
+
+class ConnectionPool:
+    """
+    Thread-safe pool of pyodbc connections for one connection string
 
-    # Fallback to settings
-    settings = get_settings()
-    return settings.DB_CONNECTION_STRING
+    Connections are opened on demand up to max_size and reused most-recently-used
+    first. Idle connections beyond min_size are closed after idle_timeout, and a
+    connection idle longer than validate_after is liveness-checked on checkout.
+    """
+
+    def __init__(self, connection_string: str, min_size: int = 1, max_size: int = 8,
+                 idle_timeout: float = 300, validate_after: float = 30, acquire_timeout: float = 30,
+                 reuse: bool = True, connect_timeout: int = 0):
+        self.connection_string = connection_string
+        self.connect_timeout = connect_timeout  # pyodbc login timeout in seconds (0 = driver default)
+        self.reuse = reuse  # False closes connections on release (pooling disabled, size cap kept)
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.validate_after = validate_after
+        self.acquire_timeout = acquire_timeout
+
+        self._idle = deque()  # (connection, returned_at), most recent on the right
+        self._size = 0
+        self._condition = threading.Condition()
+        self._stats = {
+            "opened": 0,
+            "reused": 0,
+            "closed_idle": 0,
+            "discarded": 0,
+            "validation_failures": 0,
+            "waits": 0,
+            "timeouts": 0
+        }
+
+    def acquire(self):
+        """Check out a connection, opening one if the pool has room"""
+        deadline = time.monotonic() + self.acquire_timeout
+
+        while True:
+            conn, idle_for = self._checkout(deadline)
+
+            if conn is None:
+                # Reserved a slot - open outside the lock
+                try:
+                    conn = pyodbc.connect(self.connection_string, timeout=self.connect_timeout)
+                except Exception:
+                    self._forget()
+                    raise
+                with self._condition:
+                    self._stats["opened"] += 1
+                return conn
+
+            if idle_for < self.validate_after or self._is_alive(conn):
+                with self._condition:
+                    self._stats["reused"] += 1
+                return conn
+
+            with self._condition:
+                self._stats["validation_failures"] += 1
+            self._discard(conn)
+
+    def _checkout(self, deadline: float):
+        """Pop a usable idle connection, or reserve a slot for a new one (returns None, 0)"""
+        with self._condition:
+            while True:
+                self._prune_locked()
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    return conn, time.monotonic() - returned_at
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None, 0.0
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    raise PoolTimeout(f"No database connection available within {self.acquire_timeout}s")
+
+                self._stats["waits"] += 1
+                self._condition.wait(remaining)
+
+    def release(self, conn, rollback: bool = False):
+        """
+        Return a connection to the pool
+        With rollback the open transaction is rolled back first; connections that fail that are discarded
+        """
+        if not self.reuse:
+            _close_quietly(conn)
+            self._forget()
+            return
+
+        if rollback:
+            try:
+                conn.rollback()
+            except Exception:
+                self._discard(conn)
+                return
+
+        with self._condition:
+            self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+
+    def prune(self):
+        """Close connections idle longer than the idle timeout, keeping min_size"""
+        with self._condition:
+            self._prune_locked()
+
+    def _prune_locked(self):
+        now = time.monotonic()
+        # Oldest idle connections sit on the left
+        while self._idle and self._size > self.min_size and now - self._idle[0][1] > self.idle_timeout:
+            conn, _ = self._idle.popleft()
+            self._size -= 1
+            self._stats["closed_idle"] += 1
+            _close_quietly(conn)
+
+    def _is_alive(self, conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        _close_quietly(conn)
+        with self._condition:
+            self._stats["discarded"] += 1
+        self._forget()
+
+    def _forget(self):
+        """Give back the slot of a connection that was never opened or has been closed"""
+        with self._condition:
+            self._size -= 1
+            self._condition.notify()
+
+    def close(self):
+        """Close all idle connections (on shutdown)"""
+        with self._condition:
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._size -= 1
+                _close_quietly(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """Open, idle and in-use connection counts plus lifetime counters"""
+        with self._condition:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                **self._stats
+            }
+
+def _close_quietly(conn):
+    try:
+        conn.close()
+    except Exception:
+        pass
+
+# One pool per connection string; switching databases never tears down other pools
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+_pool_reaper: Optional[asyncio.Task] = None
+
+def get_connection_pool(connection_string: str) -> ConnectionPool:
+    """Get (creating on first use) the pool for a connection string"""
+    with _pools_lock:
+        pool = _pools.get(connection_string)
+        if pool is None:
+            settings = get_settings()
+            pool = ConnectionPool(
+                connection_string,
+                min_size=settings.DB_POOL_MIN_SIZE,
+                max_size=settings.DB_POOL_MAX_SIZE,
+                idle_timeout=settings.DB_POOL_IDLE_TIMEOUT_SECONDS,
+                validate_after=settings.DB_POOL_VALIDATE_AFTER_SECONDS,
+                acquire_timeout=settings.DB_POOL_ACQUIRE_TIMEOUT_SECONDS,
+                reuse=settings.DB_POOL_ENABLED,
+                connect_timeout=settings.DB_CONNECT_TIMEOUT_SECONDS
+            )
+            _pools[connection_string] = pool
+            logger.info(f"Created connection pool for: {_mask_connection_string(connection_string)}")
+        return pool
+
+def get_pool_stats() -> Dict[str, Any]:
+    """Statistics for every connection pool, keyed by masked connection string"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {_mask_connection_string(pool.connection_string): pool.stats() for pool in pools}
+
+def start_pool_reaper():
+    """Periodically close idle pooled connections on the running event loop"""
+    global _pool_reaper
+    if _pool_reaper is None or _pool_reaper.done():
+        _pool_reaper = asyncio.create_task(_run_pool_reaper())
+
+async def stop_pool_reaper():
+    """Stop the idle connection reaper and close idle connections"""
+    global _pool_reaper
+    if _pool_reaper is not None:
+        _pool_reaper.cancel()
+        try:
+            await _pool_reaper
+        except asyncio.CancelledError:
+            pass
+        _pool_reaper = None
+
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.close()
+
+async def _run_pool_reaper():
+    interval = max(get_settings().DB_POOL_IDLE_TIMEOUT_SECONDS / 2, 1)
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(interval)
+        with _pools_lock:
+            pools = list(_pools.values())
+        for pool in pools:
+            try:
+                await loop.run_in_executor(_db_executor, pool.prune)
+            except Exception as e:
+                logger.error(f"Connection pool prune failed: {str(e)}")
+
+def _mask_connection_string(connection_string: str) -> str:
+    """Connection string with any password replaced, safe for logs"""
+    parts = []
+    for part in connection_string.split(';'):
+        if 'password=' in part.lower() or 'pwd=' in part.lower():
+            parts.append('PWD=***MASKED***')
+        else:
+            parts.append(part)
+    return ';'.join(parts)
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=2, max=10))
-def execute_sql_query(query: str) -> Tuple[Optional[Dict], Optional[str]]:
+def get_connection_string(connection_string: Optional[str] = None) -> str:
+    """The given connection string, or the configured default database's"""
+    return connection_string or get_settings().DB_CONNECTION_STRING
+
+def _database_name(connection_string: Optional[str]) -> Optional[str]:
+    """Database= value of a connection string, if it has one"""
+    match = DATABASE_NAME.search(connection_string or "")
+    return match.group(1).strip() if match else None
+
+def get_query_timeout(connection_string: Optional[str]) -> int:
+    """Query timeout in seconds for the database a connection string points at"""
+    return get_settings().get_query_timeout(_database_name(connection_string))
+
+def _is_read_only(query: str) -> bool:
+    """Whether a statement can be served by a read replica (a SELECT that doesn't write INTO a table)"""
+    if not query.strip().upper().startswith("SELECT"):
+        return False
+    return not SELECT_INTO.search(SQL_STRING_LITERAL.sub("''", query))
+
+def classify_db_error(e: Exception) -> str:
+    """
+    Classify a query failure by its SQLSTATE and SQL Server error number
+
+    Returns DB_ERROR_CONNECTION (08xxx, HYT01), DB_ERROR_TRANSIENT (40001 and
+    TRANSIENT_NATIVE_ERRORS) or DB_ERROR_PERMANENT (everything else).
+    HYT00 is a connection error when it expired opening the connection (login
+    timeout) and a permanent query timeout when it came from executing or fetching.
+    """
+    connecting = isinstance(e, ConnectError)
+    if connecting:
+        e = e.error
+    if not isinstance(e, pyodbc.Error) or not e.args:
+        return DB_ERROR_PERMANENT
+
+    sqlstate = str(e.args[0])
+    if sqlstate.startswith("08") or sqlstate == SQLSTATE_CONNECTION_TIMEOUT:
+        return DB_ERROR_CONNECTION
+    if sqlstate == SQLSTATE_QUERY_TIMEOUT and (connecting or "SQLDriverConnect" in str(e)):
+        return DB_ERROR_CONNECTION
+    if sqlstate == SQLSTATE_SERIALIZATION_FAILURE:
+        return DB_ERROR_TRANSIENT
+
+    native_numbers = NATIVE_ERROR_NUMBER.findall(str(e))
+    if any(int(number) in TRANSIENT_NATIVE_ERRORS for number in native_numbers):
+        return DB_ERROR_TRANSIENT
+    return DB_ERROR_PERMANENT
+
+def _is_connection_error(e: Exception) -> bool:
+    """Whether a pyodbc error means the endpoint couldn't be reached (SQLSTATE 08xxx or HYT01)"""
+    return classify_db_error(e) == DB_ERROR_CONNECTION
+
+def _execute_on(
+        connection_string: str,
+        query: str,
+        cancellation: Optional[QueryCancellation],
+        timeout_seconds: int,
+        capped: bool = True
+) -> QueryResult:
+    """Run a query on one endpoint through its connection pool"""
+    # Fix any backslash issues in connection string
+    original_conn = connection_string
+    connection_string = connection_string.replace('\\\\', '\\')
+
+    if original_conn != connection_string:
+        logger.info("Applied backslash fix to connection string")
+
+    # Check out a pooled connection (opened on demand, validated if it sat idle)
+    pool = get_connection_pool(connection_string)
+    with timed_stage("db_connect"):
+        try:
+            conn = pool.acquire()
+        except pyodbc.Error as e:
+            raise ConnectError(e) from e
+
+    succeeded = False
+    try:
+        result = _run_query(conn, query, cancellation, timeout_seconds, capped)
+        succeeded = True
+    finally:
+        # Failed queries roll back before the connection goes back; broken ones are discarded
+        pool.release(conn, rollback=not succeeded)
+    return result
+
+def _execute_routed(
+        connection_string: str,
+        query: str,
+        cancellation: Optional[QueryCancellation],
+        timeout_seconds: int,
+        capped: bool = True,
+        primary_only: bool = False
+) -> QueryResult:
+    """
+    Run a query on the endpoint its database's router picks
+    Reads that hit a connection error fail over to the next endpoint; writes never do
+    primary_only routes a read like a write (e.g. health probes, which must test the primary)
+    """
+    router = get_endpoint_router(connection_string, _database_name(connection_string))
+    if router is None:
+        return _execute_on(connection_string, query, cancellation, timeout_seconds, capped)
+
+    read_only = _is_read_only(query) and not primary_only
+    tried = []
+    last_error: Optional[Exception] = None
+    while True:
+        endpoint = router.acquire(read_only, exclude=tried)
+        if endpoint is None:
+            raise last_error
+
+        failed = False
+        try:
+            return _execute_on(endpoint.connection_string, query, cancellation, timeout_seconds, capped)
+        except Exception as e:
+            failed = _is_connection_error(e)
+            interrupted = cancellation is not None and cancellation.reason
+            if not failed or not read_only or interrupted:
+                raise
+            logger.warning(f"{endpoint.role} endpoint unreachable, failing over: {e}")
+            tried.append(endpoint)
+            last_error = e
+        finally:
+            router.release(endpoint, failed)
+
+def _should_retry(e: Exception, query: str, attempt: int, max_attempts: int,
+                  cancellation: Optional[QueryCancellation]) -> bool:
+    """
+    Whether a failed attempt is worth repeating
+    Deadlock victims were rolled back so any statement can rerun; after a lost
+    connection only reads are repeated, since a write may already have committed,
+    unless the connection never opened
+    """
+    if attempt >= max_attempts or (cancellation is not None and cancellation.reason):
+        return False
+    error_class = classify_db_error(e)
+    if error_class == DB_ERROR_TRANSIENT:
+        return True
+    return error_class == DB_ERROR_CONNECTION and (_is_read_only(query) or isinstance(e, ConnectError))
+
+def _retry_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before the given retry"""
+    settings = get_settings()
+    ceiling = min(settings.DB_RETRY_BACKOFF_MAX_SECONDS, settings.DB_RETRY_BACKOFF_BASE_SECONDS * (2 ** attempt))
+    return random.uniform(0, ceiling)
+
+def _execute_with_retry(
+        connection_string: str,
+        query: str,
+        cancellation: Optional[QueryCancellation],
+        timeout_seconds: int,
+        max_attempts: int,
+        capped: bool = True,
+        primary_only: bool = False
+) -> QueryResult:
+    """Run a query, repeating transient failures up to max_attempts times in all"""
+    attempt = 1
+    while True:
+        try:
+            return _execute_routed(connection_string, query, cancellation, timeout_seconds, capped, primary_only)
+        except Exception as e:
+            if not _should_retry(e, query, attempt, max_attempts, cancellation):
+                raise
+            delay = _retry_delay(attempt)
+            logger.warning(f"Transient database error ({str(e)[:80]}), retry {attempt} in {delay:.1f}s")
+            time.sleep(delay)
+            if cancellation is not None and cancellation.reason:
+                raise
+            attempt += 1
+
+def get_circuit_state(connection_string: Optional[str] = None) -> Dict[str, Any]:
+    """Circuit breaker state of a database (default database if None)"""
+    return get_circuit_breaker(get_connection_string(connection_string)).stats()
+
+def get_circuit_stats() -> Dict[str, Any]:
+    """Circuit breaker state of every database, connection strings masked"""
+    return get_breaker_stats(_mask_connection_string)
+
+def get_endpoint_stats() -> Dict[str, Any]:
+    """Load and health of replica-routed databases' endpoints, connection strings masked"""
+    return get_router_stats(_mask_connection_string)
+
+def execute_sql_query(
+        query: str,
+        connection_string: Optional[str] = None,
+        cancellation: Optional[QueryCancellation] = None,
+        timeout_seconds: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        capped: bool = True,
+        primary_only: bool = False
+) -> Tuple[Optional[QueryResult], Optional[str]]:
     """
     Execute SQL query against the database with retry logic
     UPDATED: Uses dynamic connection string
-    
+    UPDATED: Applies the database's query timeout; cancellation can interrupt the statement
+    UPDATED: Runs against the given connection string (default database if None)
+    UPDATED: SELECTs go to a read replica when the database has replicas configured
+    UPDATED: Retries only transient errors (max_attempts tries, default DB_RETRY_MAX_ATTEMPTS);
+             fails fast while the database's circuit breaker is open
+    UPDATED: capped=False reads the whole result past DB_MAX_RESULT_ROWS/BYTES (internal queries
+             like schema discovery, which must not be cut off)
+    UPDATED: primary_only=True never routes the query to a read replica
+
     Returns:
         Tuple of (result_data, error_message)
-        result_data contains both 'text' and 'table' formats
+        result_data is a QueryResult with both 'text' and 'table' formats
     """
-    # Get current connection string
-    connection_string = get_connection_string()
+    connection_string = get_connection_string(connection_string)
 
     # DEBUG: Log connection string (masked for security)
     if connection_string:
         # Mask password for logging
-        masked_conn = connection_string
-        if "password=" in masked_conn.lower() or "pwd=" in masked_conn.lower():
-            parts = masked_conn.split(';')
-            masked_parts = []
-            for part in parts:
-                if 'password=' in part.lower() or 'pwd=' in part.lower():
-                    masked_parts.append('PWD=***MASKED***')
-                else:
-                    masked_parts.append(part)
-            masked_conn = ';'.join(masked_parts)
-        logger.info(f"Connection string: {masked_conn}")
+        logger.info(f"Connection string: {_mask_connection_string(connection_string)}")
     else:
         logger.error("Connection string is None or empty!")
         return None, "Database connection string not configured. Please check your environment variables."
 
+    if timeout_seconds is None:
+        timeout_seconds = get_query_timeout(connection_string)
+    if max_attempts is None:
+        max_attempts = get_settings().DB_RETRY_MAX_ATTEMPTS
+
+    breaker = get_circuit_breaker(connection_string)
+    if not breaker.allow():
+        return None, (f"{DATABASE_UNAVAILABLE_MESSAGE}: recent connections failed, "
+                      f"retrying in {breaker.retry_in():.0f}s.")
+
     try:
         # DEBUG: Log the original connection string processing
         logger.info(f"Original connection string length: {len(connection_string)}")
 
-        # Fix any backslash issues in connection string
-        original_conn = connection_string
-        connection_string = connection_string.replace('\\\\', '\\')
-
-        if original_conn != connection_string:
-            logger.info("Applied backslash fix to connection string")
-
-        logger.info("Attempting to connect to database...")
-
-        # Connect to database
-        conn = pyodbc.connect(connection_string)
-        logger.info("Database connection successful!")
-
-        cursor = conn.cursor()
-
-        # Execute query
-        logger.info(f"Executing query: {query}")
-        cursor.execute(query)
-
-        # Fetch results if it's a SELECT query
-        if query.strip().upper().startswith("SELECT"):
-            # Get column names
-            column_names = [column[0] for column in cursor.description]
-
-            # Fetch all rows
-            rows = cursor.fetchall()
-
-            # Convert to pandas DataFrame for text formatting (backward compatibility)
-            df = pd.DataFrame.from_records(rows, columns=column_names)
-
-            # Create text result (backward compatibility)
-            text_result = df.to_string(index=False)
-            text_result += f"\n\n({len(df)} rows returned)"
-
-            # Create structured table data (NEW)
-            table_data = TableData(
-                headers=column_names,
-                rows=[list(row) for row in rows],
-                row_count=len(rows)
-            )
-
-            # Return both formats
-            result = {
-                "text": text_result,
-                "table": table_data
-            }
-        else:
-            # Non-SELECT query, return affected row count
-            text_result = f"Query executed successfully. Rows affected: {cursor.rowcount}"
-            result = {
-                "text": text_result,
-                "table": None
-            }
-
-        # Commit and close
-        conn.commit()
-        cursor.close()
-        conn.close()
+        # Reads may go to a replica when the database has any configured
+        result = _execute_with_retry(connection_string, query, cancellation, timeout_seconds, max_attempts,
+                                     capped, primary_only)
+        breaker.record_success()
 
         logger.info(f"Query executed successfully, returning structured results")
         return result, None
@@ -140,6 +613,19 @@ def execute_sql_query(query: str) -> Tuple[Optional[Dict], Optional[str]]:
         if hasattr(e, 'args'):
             logger.error(f"Error args: {e.args}")
 
+        if _is_connection_error(e) and not (cancellation is not None and cancellation.reason):
+            breaker.record_failure()
+        else:
+            breaker.record_other()
+
+        # Interrupted queries get their own error type
+        if cancellation is not None and cancellation.reason:
+            return None, _interrupted_error(cancellation.reason, timeout_seconds)
+        # Only an expired statement is a query timeout; a login timeout is a connection failure
+        if (isinstance(e, pyodbc.Error) and e.args and e.args[0] == SQLSTATE_QUERY_TIMEOUT
+                and classify_db_error(e) != DB_ERROR_CONNECTION):
+            return None, _interrupted_error(SQL_ERROR_TIMEOUT, timeout_seconds)
+
         # Provide more specific error messages
         if "Login failed" in error_message:
             return None, f"Database authentication failed: {error_message}"
@@ -154,43 +640,335 @@ def execute_sql_query(query: str) -> Tuple[Optional[Dict], Optional[str]]:
         else:
             return None, f"Database error: {error_message}"
 
-def check_database_connection():
+def _interrupted_error(reason: str, timeout_seconds: int) -> str:
+    """Error message for a timed-out or cancelled query"""
+    if reason == SQL_ERROR_TIMEOUT:
+        return (f"{QUERY_TIMEOUT_MESSAGE} after {timeout_seconds}s. "
+                f"Try a narrower query (more filters, fewer rows or joins).")
+    return f"{QUERY_CANCELLED_MESSAGE}: the client disconnected before it finished."
+
+def sql_error_type(error: Optional[str]) -> Optional[str]:
+    """Classify a query error message: "timeout", "cancelled", "unavailable" or "error" (None if no error)"""
+    if not error:
+        return None
+    if error.startswith(QUERY_TIMEOUT_MESSAGE):
+        return SQL_ERROR_TIMEOUT
+    if error.startswith(QUERY_CANCELLED_MESSAGE):
+        return SQL_ERROR_CANCELLED
+    if error.startswith(DATABASE_UNAVAILABLE_MESSAGE):
+        return SQL_ERROR_UNAVAILABLE
+    return "error"
+
+def _run_query(conn, query: str, cancellation: Optional[QueryCancellation] = None,
+               timeout_seconds: int = 0, capped: bool = True) -> QueryResult:
+    """Execute a query on an open connection and build the text/table result"""
+    # pyodbc applies the connection's timeout to cursors created after it is set
+    conn.timeout = timeout_seconds
+    cursor = conn.cursor()
+
+    if cancellation is not None:
+        cancellation.attach(cursor)
+    try:
+        if cancellation is not None and cancellation.reason:
+            raise RuntimeError(f"Query cancelled before execution ({cancellation.reason})")
+        return _execute_and_fetch(cursor, conn, query, capped)
+    finally:
+        if cancellation is not None:
+            cancellation.detach()
+
+def _execute_and_fetch(cursor, conn, query: str, capped: bool = True) -> QueryResult:
+    """Run a query on a cursor and build the text/table result"""
+    # Execute query
+    logger.info(f"Executing query: {query}")
+    with timed_stage("db_execute"):
+        cursor.execute(query)
+
+    # Fetch results if it's a SELECT query
+    if query.strip().upper().startswith("SELECT"):
+        # Get column names
+        column_names = [column[0] for column in cursor.description]
+
+        # Fetch rows in batches up to the row/byte caps
+        with timed_stage("db_fetch"):
+            rows, total_rows, total_is_exact, result_bytes = _fetch_bounded(cursor, capped)
+        truncated = total_rows > len(rows)
+
+        with timed_stage("db_format"):
+            # Rows are already lists of plain values, so skip re-validating every cell
+            table_data = TableData.model_construct(
+                headers=column_names,
+                rows=rows,
+                row_count=len(rows),
+                truncated=truncated,
+                total_rows_estimate=total_rows,
+                total_is_exact=total_is_exact,
+                estimated_bytes=result_bytes
+            )
+
+        # Text form (backward compatibility) is rendered only if someone reads it
+        result = QueryResult(table_data, total_rows=total_rows, total_is_exact=total_is_exact)
+    else:
+        # Non-SELECT query, return affected row count
+        result = QueryResult(None, text=f"Query executed successfully. Rows affected: {cursor.rowcount}")
+
+    conn.commit()
+    cursor.close()
+    return result
+
+def _fetch_bounded(cursor, capped: bool = True) -> Tuple[List[List[Any]], int, bool, int]:
+    """
+    Fetch rows with fetchmany until the result ends or a row/byte cap is hit
+
+    Past the cap the query is cancelled and the total is a lower bound, unless
+    DB_COUNT_TRUNCATED_ROWS_LIMIT opts into counting (and dropping) the remaining
+    rows batch by batch. capped=False fetches everything.
+
+    Returns:
+        (rows, total_rows, total_is_exact, result_bytes) - the result was truncated if total_rows > len(rows);
+        result_bytes is the estimated size of the kept rows, reused by the result caches
+    """
+    settings = get_settings()
+    batch_size = settings.DB_FETCH_BATCH_SIZE
+    max_rows = settings.DB_MAX_RESULT_ROWS if capped else float("inf")
+    max_bytes = settings.DB_MAX_RESULT_BYTES if capped else float("inf")
+
+    rows: List[List[Any]] = []
+    result_bytes = 0
+
+    while True:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return rows, len(rows), True, result_bytes
+
+        for position, row in enumerate(batch):
+            if len(rows) >= max_rows or result_bytes >= max_bytes:
+                counted = len(rows) + len(batch) - position
+                total_rows, exact = _count_remaining_rows(cursor, counted, batch_size)
+                logger.warning(f"Result truncated at {len(rows)} rows (~{result_bytes} bytes) of "
+                               f"{'' if exact else 'at least '}{total_rows} rows")
+                return rows, total_rows, exact, result_bytes
+
+            rows.append(list(row))
+            result_bytes += _estimate_row_bytes(row)
+
+def _count_remaining_rows(cursor, counted: int, batch_size: int) -> Tuple[int, bool]:
+    """Count (without keeping) the rest of a result, cancelling past the counting limit (0 = count nothing)"""
+    count_limit = counted + get_settings().DB_COUNT_TRUNCATED_ROWS_LIMIT
+
+    while counted < count_limit:
+        batch = cursor.fetchmany(batch_size)
+        if not batch:
+            return counted, True
+        counted += len(batch)
+
+    # Stop the server streaming the rest
+    try:
+        cursor.cancel()
+    except Exception:
+        pass
+    return counted, False
+
+def _estimate_row_bytes(row) -> int:
+    """Rough in-memory size of a row: string/bytes lengths plus a fixed cost per value"""
+    return sum(len(value) if isinstance(value, (str, bytes)) else 16 for value in row) + 8 * len(row)
+
+async def execute_sql_query_async(
+        query: str,
+        connection_string: Optional[str] = None,
+        is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None
+) -> Tuple[Optional[QueryResult], Optional[str]]:
+    """
+    Execute SQL query on the bounded DB executor without blocking the event loop
+    Concurrent identical SELECTs share a single execution; repeated ones may be served from the result cache
+    Queries for different connection strings run in parallel, each on its own pool
+
+    The query is cancelled once it exceeds the database's timeout, or once every
+    caller waiting on it has disconnected (checked with is_disconnected, e.g.
+    request.is_disconnected) or gone away; sql_error_type tells these errors apart.
+
+    Returns:
+        Tuple of (result_data, error_message), same as execute_sql_query
+    """
+    loop = asyncio.get_running_loop()
+    connection_string = get_connection_string(connection_string)
+    timeout_seconds = get_query_timeout(connection_string)
+    is_select = query.strip().upper().startswith("SELECT")
+    normalized = normalize_sql(query)
+    # Only SELECTs are coalesced, so anything else gets a key of its own
+    key = (connection_string, normalized) if is_select else object()
+
+    def run():
+        # Carry the request's timing context into the worker thread
+        context = contextvars.copy_context()
+        cancellation = QueryCancellation()
+        future = loop.run_in_executor(
+            _db_executor, context.run, _execute_queued, query, connection_string,
+            time.perf_counter(), cancellation, timeout_seconds
+        )
+        return _supervise_query(future, cancellation, timeout_seconds, key)
+
+    if not is_select:
+        return await _await_as_client(key, is_disconnected, run)
+
+    result_cache = get_sql_result_cache()
+    ttl_seconds = result_cache.ttl_for(query) if result_cache else 0
+
+    if ttl_seconds <= 0:
+        if result_cache:
+            result_cache.note_bypass()
+        return await _await_as_client(key, is_disconnected, lambda: _query_flight.do(key, run))
+
+    cached = result_cache.get(connection_string, normalized)
+    if cached is not None:
+        logger.info(f"SQL result cache hit: {normalized[:50]}...")
+        return cached, None
+
+    generation = result_cache.generation(connection_string)
+    result, error = await _await_as_client(key, is_disconnected, lambda: _query_flight.do(key, run))
+    if not error:
+        result_cache.put(connection_string, normalized, result, ttl_seconds, generation)
+    return result, error
+
+async def _await_as_client(key: Hashable, is_disconnected: Optional[Callable[[], Awaitable[bool]]],
+                           fn: Callable[[], Awaitable[Any]]) -> Any:
+    """Await an execution with the caller registered as one of its clients"""
+    clients = _query_clients.setdefault(key, [])
+    clients.append(is_disconnected)
+    try:
+        return await fn()
+    finally:
+        clients.remove(is_disconnected)
+        if not clients and _query_clients.get(key) is clients:
+            del _query_clients[key]
+
+async def _supervise_query(future: asyncio.Future, cancellation: QueryCancellation, timeout_seconds: int,
+                           key: Hashable) -> Tuple[Optional[QueryResult], Optional[str]]:
+    """
+    Wait for a query running on the executor, cancelling it on timeout or when no client is left
+
+    The timeout counts from submission, so time queued for a worker is included.
+    After cancelling, keeps waiting for the worker to return its error.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout_seconds if timeout_seconds > 0 else None
+    poll_seconds = get_settings().DB_CANCEL_POLL_SECONDS
+
+    while not future.done():
+        await asyncio.wait({future}, timeout=poll_seconds)
+        if future.done() or cancellation.reason:
+            continue
+
+        if deadline is not None and loop.time() >= deadline:
+            cancellation.cancel(SQL_ERROR_TIMEOUT)
+        elif await _all_clients_disconnected(_query_clients.get(key, [])):
+            cancellation.cancel(SQL_ERROR_CANCELLED)
+
+    return future.result()
+
+async def _all_clients_disconnected(clients: List[Optional[Callable[[], Awaitable[bool]]]]) -> bool:
+    """True once no caller is waiting, or every waiting caller's client has disconnected"""
+    if any(is_disconnected is None for is_disconnected in clients):
+        return False
+    for is_disconnected in list(clients):
+        try:
+            if not await is_disconnected():
+                return False
+        except Exception:
+            return False
+    return True
+
+def _execute_queued(query: str, connection_string: str, submitted: float, cancellation: QueryCancellation,
+                    timeout_seconds: int) -> Tuple[Optional[QueryResult], Optional[str]]:
+    """Executor entry point: records time spent waiting for a worker, then runs the query"""
+    timings = current_timings()
+    if timings is not None:
+        timings.add_stage("db_queue", (time.perf_counter() - submitted) * 1000)
+
+    # Cancelled while queued - don't start it
+    if cancellation.reason:
+        return None, _interrupted_error(cancellation.reason, timeout_seconds)
+    return execute_sql_query(query, connection_string, cancellation, timeout_seconds)
+
+def normalize_sql(query: str) -> str:
+    """
+    Normalize SQL text for use as a coalescing/cache key
+    Whitespace is collapsed outside quoted literals only, so 'a  b' and 'a b' stay distinct
+    """
+    parts = SQL_STRING_LITERAL.split(query.strip())
+    normalized = "".join(
+        part if index % 2 else _collapse_whitespace(part)
+        for index, part in enumerate(parts)
+    )
+    return normalized.strip().rstrip(";").strip()
+
+def _collapse_whitespace(text: str) -> str:
+    """Collapse whitespace runs to single spaces, keeping one at either edge if present"""
+    core = " ".join(text.split())
+    leading = " " if text[:1].isspace() else ""
+    trailing = " " if core and text[-1:].isspace() else ""
+    return leading + core + trailing
+
+def invalidate_result_cache(connection_string: Optional[str] = None) -> int:
+    """Drop cached SQL results for a connection string (or all); returns how many were dropped"""
+    result_cache = get_sql_result_cache()
+    return result_cache.invalidate(connection_string) if result_cache else 0
+
+def get_result_cache_stats() -> Dict[str, Any]:
+    """Hit rate, entries and bytes held by the SQL result cache"""
+    result_cache = get_sql_result_cache()
+    if result_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **result_cache.stats()}
+
+def get_query_coalescing_stats() -> Dict[str, Any]:
+    """Counters for coalesced SQL executions"""
+    return _query_flight.stats()
+
+def check_database_connection(connection_string: Optional[str] = None):
     """
     Test database connection
     UPDATED: Works with dynamic connection string
+    UPDATED: Tests the given connection string (default database if None)
+    UPDATED: Single attempt; reports disconnected at once while the circuit breaker is open
+    """
+    return probe_database(connection_string) is None
+
+def probe_database(connection_string: Optional[str] = None) -> Optional[str]:
+    """
+    Run the connection test query once on the primary (default database if None)
+    Replicas are bypassed: a healthy replica must not hide a primary that is down
+
+    Returns:
+        The error message, or None if the database answered
     """
     try:
         logger.info("Testing database connection...")
 
         # Try a simple query
-        result, error = execute_sql_query("SELECT 1 AS ConnectionTest")
+        # One attempt: a status check should answer quickly, not retry a dead server
+        result, error = execute_sql_query("SELECT 1 AS ConnectionTest", connection_string,
+                                          max_attempts=1, primary_only=True)
 
         if error:
             logger.error(f"Database connection test failed with error: {error}")
-            return False
+            return error
         else:
             logger.info(f"Database connection test successful")
-            return True
+            return None
     except Exception as e:
         logger.error(f"Database connection test failed with exception: {str(e)}")
-        return False
+        return str(e)
 
-def execute_sql_query_with_connection(query: str, connection_string: str) -> Tuple[Optional[Dict], Optional[str]]:
+async def probe_database_async(connection_string: Optional[str] = None) -> Optional[str]:
+    """probe_database on the DB executor, off the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, probe_database, connection_string)
+
+def execute_sql_query_with_connection(query: str, connection_string: str,
+                                      capped: bool = True) -> Tuple[Optional[QueryResult], Optional[str]]:
     """
     Execute SQL query with specific connection string (for testing connections)
+    UPDATED: Passes the connection string through instead of swapping a shared global
+    UPDATED: capped=False skips the result row/byte caps (see execute_sql_query)
     """
-    # Temporarily store old connection string
-    old_connection = get_connection_string()
-
-    try:
-        # Set new connection string
-        set_connection_string(connection_string)
-
-        # Execute query
-        result, error = execute_sql_query(query)
-
-        return result, error
-
-    finally:
-        # Restore old connection string
-        set_connection_string(old_connection)
\ No newline at end of file
+    return execute_sql_query(query, connection_string, capped=capped)
\ No newline at end of file
@@ -0,0 +1,152 @@
+"""
+Routing of queries across a database's SQL Server endpoints.
+Reads go to the healthy replica with the fewest outstanding queries; writes,
+and reads when no replica is healthy, go to the primary. Replicas failing with
+connection errors are ejected for a while, then tried again.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from app.core.config import get_settings
+from app.core.logging import configure_logging
+
+# Configure logging
+logger = configure_logging(logger_name="endpoint-router")
+
+ROLE_PRIMARY = "primary"
+ROLE_REPLICA = "replica"
+
+class Endpoint:
+    """One SQL Server endpoint and its load/health counters"""
+
+    def __init__(self, connection_string: str, role: str):
+        self.connection_string = connection_string
+        self.role = role
+        self.outstanding = 0
+        self.routed = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.ejections = 0
+        self.ejected_until = 0.0
+
+class EndpointRouter:
+    """
+    Picks an endpoint per query for one database
+
+    Thread-safe: acquire/release are called from DB executor threads.
+    """
+
+    def __init__(self, primary: str, replicas: List[str], eject_after_failures: int = 3,
+                 eject_seconds: float = 30):
+        self.primary = Endpoint(primary, ROLE_PRIMARY)
+        self.replicas = [Endpoint(connection_string, ROLE_REPLICA) for connection_string in replicas]
+        self.eject_after_failures = eject_after_failures
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+        self._failovers = 0
+
+    def acquire(self, read_only: bool, exclude: Iterable[Endpoint] = ()) -> Optional[Endpoint]:
+        """
+        Pick an endpoint and count the query as outstanding on it
+
+        Reads take the healthy replica with the fewest outstanding queries (ties go
+        to the least used), falling back to the primary. Returns None once every
+        candidate is in exclude.
+        """
+        excluded = set(map(id, exclude))
+        now = time.monotonic()
+
+        with self._lock:
+            candidates = []
+            if read_only:
+                candidates = [
+                    endpoint for endpoint in self.replicas
+                    if id(endpoint) not in excluded and endpoint.ejected_until <= now
+                ]
+
+            if candidates:
+                endpoint = min(candidates, key=lambda candidate: (candidate.outstanding, candidate.routed))
+            elif id(self.primary) not in excluded:
+                endpoint = self.primary
+            else:
+                return None
+
+            if excluded:
+                self._failovers += 1
+            endpoint.outstanding += 1
+            endpoint.routed += 1
+            return endpoint
+
+    def release(self, endpoint: Endpoint, failed: bool):
+        """Finish a query on an endpoint; failed means a connection-level failure"""
+        with self._lock:
+            endpoint.outstanding -= 1
+            if not failed:
+                endpoint.consecutive_failures = 0
+                return
+
+            endpoint.failures += 1
+            endpoint.consecutive_failures += 1
+            if endpoint.role == ROLE_REPLICA and endpoint.consecutive_failures >= self.eject_after_failures:
+                endpoint.ejected_until = time.monotonic() + self.eject_seconds
+                endpoint.consecutive_failures = 0
+                endpoint.ejections += 1
+                logger.warning(f"Ejected replica for {self.eject_seconds}s after "
+                               f"{self.eject_after_failures} connection failures")
+
+    def stats(self, mask: Callable[[str], str] = str) -> Dict[str, Any]:
+        """Per-endpoint load and health, with connection strings passed through mask"""
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "failovers": self._failovers,
+                "endpoints": [
+                    {
+                        "role": endpoint.role,
+                        "connection_string": mask(endpoint.connection_string),
+                        "healthy": endpoint.ejected_until <= now,
+                        "outstanding": endpoint.outstanding,
+                        "routed": endpoint.routed,
+                        "failures": endpoint.failures,
+                        "ejections": endpoint.ejections
+                    }
+                    for endpoint in [self.primary, *self.replicas]
+                ]
+            }
+
+# Routers by the database's own (primary) connection string
+_routers: Dict[str, Optional[EndpointRouter]] = {}
+_routers_lock = threading.Lock()
+
+def get_endpoint_router(connection_string: str, database_name: Optional[str]) -> Optional[EndpointRouter]:
+    """Router for a database, or None when no replicas are configured for it"""
+    with _routers_lock:
+        if connection_string not in _routers:
+            _routers[connection_string] = _build_router(connection_string, database_name)
+        return _routers[connection_string]
+
+def _build_router(connection_string: str, database_name: Optional[str]) -> Optional[EndpointRouter]:
+    """Build a router from Settings.DB_ENDPOINTS; a "primary" entry overrides the database's own string"""
+    settings = get_settings()
+    endpoints = settings.DB_ENDPOINTS.get((database_name or "").lower(), [])
+
+    replicas = [endpoint["connection_string"] for endpoint in endpoints if endpoint.get("role") == ROLE_REPLICA]
+    if not replicas:
+        return None
+
+    primaries = [endpoint["connection_string"] for endpoint in endpoints if endpoint.get("role") == ROLE_PRIMARY]
+    logger.info(f"Routing reads for {database_name} across {len(replicas)} replicas")
+
+    return EndpointRouter(
+        primaries[0] if primaries else connection_string,
+        replicas,
+        eject_after_failures=settings.DB_ENDPOINT_EJECT_AFTER_FAILURES,
+        eject_seconds=settings.DB_ENDPOINT_EJECT_SECONDS
+    )
+
+def get_router_stats(mask: Callable[[str], str] = str) -> Dict[str, Any]:
+    """Stats of every database that routes across replicas"""
+    with _routers_lock:
+        routers = dict(_routers)
+    return {mask(key): router.stats(mask) for key, router in routers.items() if router is not None}
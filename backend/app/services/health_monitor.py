@@ -0,0 +1,84 @@
+"""
+Database health status for /db/status.
+A background prober checks every registered database on an interval and keeps
+the last observed state in memory, so status requests are answered without
+touching the database. A live probe can still be forced.
+"""
+import asyncio
+import time
+from typing import Any, Dict, Optional
+
+from app.core.config import get_settings
+from app.core.logging import configure_logging
+from app.services.database_registry import database_connection_strings
+from app.services.db_service import get_connection_string, probe_database_async
+from app.utils.single_flight import SingleFlight
+
+# Configure logging
+logger = configure_logging(logger_name="health-monitor")
+
+# Last probe result by connection string
+_health: Dict[str, Dict[str, Any]] = {}
+
+# Concurrent live probes of one database share a single SELECT 1
+_probe_flight = SingleFlight("health-probe")
+
+_prober: Optional[asyncio.Task] = None
+
+async def probe_health(connection_string: Optional[str] = None) -> Dict[str, Any]:
+    """Probe a database now (default database if None) and record the result"""
+    connection_string = get_connection_string(connection_string)
+    return await _probe_flight.do(connection_string, lambda: _probe(connection_string))
+
+async def _probe(connection_string: str) -> Dict[str, Any]:
+    started = time.perf_counter()
+    error = await probe_database_async(connection_string)
+    health = {
+        "status": "disconnected" if error else "connected",
+        "latency_ms": round((time.perf_counter() - started) * 1000, 1),
+        "checked_at": time.time(),
+        "error": error
+    }
+
+    previous = _health.get(connection_string)
+    if previous is not None and previous["status"] != health["status"]:
+        logger.warning(f"Database is now {health['status']}{f': {error}' if error else ''}")
+    _health[connection_string] = health
+    return health
+
+def get_health(connection_string: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """Last observed health of a database (default database if None), None if never probed"""
+    return _health.get(get_connection_string(connection_string))
+
+def start_health_prober():
+    """Probe every registered database on an interval on the running event loop"""
+    global _prober
+    if get_settings().DB_HEALTH_PROBE_INTERVAL_SECONDS <= 0:
+        return
+    if _prober is None or _prober.done():
+        _prober = asyncio.create_task(_run_health_prober())
+
+async def stop_health_prober():
+    """Stop the background prober"""
+    global _prober
+    if _prober is not None:
+        _prober.cancel()
+        try:
+            await _prober
+        except asyncio.CancelledError:
+            pass
+        _prober = None
+
+async def _run_health_prober():
+    interval = get_settings().DB_HEALTH_PROBE_INTERVAL_SECONDS
+    while True:
+        connection_strings = set(database_connection_strings().values())
+        connection_strings.add(get_connection_string())
+        results = await asyncio.gather(
+            *(probe_health(connection_string) for connection_string in connection_strings),
+            return_exceptions=True
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                logger.error(f"Health probe failed: {str(result)}")
+        await asyncio.sleep(interval)
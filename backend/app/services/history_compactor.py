@@ -0,0 +1,112 @@
+"""
+Conversation history compaction for long-running chat sessions.
+Older turns are folded into a compact summary, and large tool outputs
+(result tables, file samples) are moved to the artifact store.
+"""
+import re
+from typing import List, Optional
+
+from google.genai import types
+
+from app.core.logging import configure_logging
+from app.services.artifact_store import get_artifact_store
+from app.utils.tokens import estimate_tokens
+
+# Configure logging
+logger = configure_logging(logger_name="history-compactor")
+
+# Characters of model answers kept per turn in the summary
+ANSWER_PREVIEW_CHARS = 300
+
+# Characters of a large output kept next to its artifact reference
+ARTIFACT_PREVIEW_CHARS = 500
+
+def history_tokens(history: List[types.Content]) -> int:
+    """Estimated prompt tokens of a chat history"""
+    return sum(estimate_tokens(part.text) for content in history for part in content.parts or [] if part.text)
+
+def compact_history(
+        history: List[types.Content],
+        keep_turns: int,
+        artifact_min_chars: int,
+        session_id: Optional[str] = None
+) -> Optional[List[types.Content]]:
+    """
+    Replace all but the last keep_turns exchanges with a summary
+
+    Args:
+        history: Curated chat history (alternating user/model)
+        keep_turns: Number of recent user/model exchanges kept verbatim
+        artifact_min_chars: Text parts at least this long are moved to the artifact store
+        session_id: Owning session, recorded on stored artifacts
+
+    Returns:
+        Compacted history, or None if there is nothing to compact
+    """
+    keep = keep_turns * 2
+    if len(history) <= keep:
+        return None
+
+    older, recent = history[:-keep], history[-keep:]
+
+    summary_lines = ["Summary of the earlier conversation (large outputs are stored server-side):"]
+    for content in older:
+        text = "".join(part.text for part in content.parts or [] if part.text)
+        if not text:
+            continue
+        if content.role == "user":
+            summary_lines.append(f"- User: {_summarize_user_text(text, artifact_min_chars, session_id)}")
+        else:
+            summary_lines.append(f"- Assistant: {_summarize_model_text(text)}")
+
+    compacted = [
+        types.Content(role="user", parts=[types.Part(text="\n".join(summary_lines))]),
+        types.Content(role="model", parts=[types.Part(text="Understood, I will use this summary as context.")])
+    ]
+
+    for content in recent:
+        parts = []
+        for part in content.parts or []:
+            if part.text and len(part.text) >= artifact_min_chars:
+                parts.append(types.Part(text=_artifact_reference(part.text, session_id)))
+            else:
+                parts.append(part)
+        compacted.append(types.Content(role=content.role, parts=parts))
+
+    logger.info(
+        f"Compacted history for {session_id[:8] if session_id else 'session'}: "
+        f"{len(history)} -> {len(compacted)} messages, "
+        f"~{history_tokens(history)} -> ~{history_tokens(compacted)} tokens"
+    )
+    return compacted
+
+def _summarize_user_text(text: str, artifact_min_chars: int, session_id: Optional[str]) -> str:
+    """One summary line for a user turn"""
+    # Pruned-schema questions carry their schema ahead of the question itself
+    if "\n\nQuestion: " in text:
+        text = text.rsplit("\n\nQuestion: ", 1)[1]
+
+    if len(text) >= artifact_min_chars:
+        return _artifact_reference(text, session_id, preview_chars=ANSWER_PREVIEW_CHARS // 2)
+
+    return " ".join(text.split())[:ANSWER_PREVIEW_CHARS]
+
+def _summarize_model_text(text: str) -> str:
+    """One summary line for a model turn: its SQL if any, else a short preview"""
+    sql_matches = re.findall(r"```sql\s*(.*?)\s*```", text, re.DOTALL)
+    if sql_matches:
+        return "ran SQL: " + " ".join(sql_matches[0].split())
+
+    plain = re.sub(r"<[^>]+>", " ", text)
+    plain = " ".join(plain.split())
+    if len(plain) > ANSWER_PREVIEW_CHARS:
+        plain = plain[:ANSWER_PREVIEW_CHARS] + "..."
+    return plain
+
+def _artifact_reference(text: str, session_id: Optional[str], preview_chars: int = ARTIFACT_PREVIEW_CHARS) -> str:
+    """Store a large output and return the inline reference that replaces it"""
+    artifact_id = get_artifact_store().put("chat_output", text, session_id)
+    return (
+        f"[Large output stored server-side as artifact {artifact_id} ({len(text)} chars). Preview:\n"
+        f"{text[:preview_chars]}]"
+    )
@@ -0,0 +1,91 @@
+"""
+Deferred AI interpretation of SQL results.
+Lets /db/chat return the table immediately while the interpretation is
+computed in the background, or never computed if nobody asks for it.
+"""
+import asyncio
+import time
+import uuid
+from typing import Awaitable, Callable, Dict, Optional
+
+from app.core.config import get_settings
+from app.core.logging import configure_logging
+
+# Configure logging
+logger = configure_logging(logger_name="interpretation-service")
+
+# Pending interpretations by id
+_interpretations: Dict[str, Dict] = {}
+
+def register_interpretation(compute: Callable[[], Awaitable[str]], session_id: str) -> str:
+    """
+    Register an interpretation to be computed later
+
+    Args:
+        compute: Coroutine factory producing the interpretation text
+        session_id: Session the interpretation belongs to
+
+    Returns:
+        Interpretation id for /db/interpretation/{id}
+    """
+    settings = get_settings()
+    _purge_expired(settings.INTERPRETATION_TTL_SECONDS)
+
+    interpretation_id = str(uuid.uuid4())
+    _interpretations[interpretation_id] = {
+        "compute": compute,
+        "task": None,
+        "session_id": session_id,
+        "created": time.time()
+    }
+
+    if settings.INTERPRETATION_PREFETCH:
+        # Start right away so the result is usually ready by the time it is fetched
+        _start(interpretation_id)
+
+    return interpretation_id
+
+def _start(interpretation_id: str) -> asyncio.Task:
+    """Start computing an interpretation if it isn't running yet"""
+    entry = _interpretations[interpretation_id]
+    if entry["task"] is None:
+        entry["task"] = asyncio.create_task(entry["compute"]())
+        logger.info(f"Computing interpretation {interpretation_id[:8]}...")
+    return entry["task"]
+
+async def get_interpretation(interpretation_id: str) -> Optional[Dict[str, str]]:
+    """
+    Get an interpretation, computing it on first request
+
+    Returns:
+        Dict with status and interpretation, or None if the id is unknown or expired
+    """
+    if interpretation_id not in _interpretations:
+        return None
+
+    task = _start(interpretation_id)
+
+    try:
+        interpretation = await asyncio.shield(task)
+        return {"status": "ready", "interpretation": interpretation}
+    except Exception as e:
+        logger.error(f"Error computing interpretation {interpretation_id[:8]}: {str(e)}")
+        # Allow a later request to retry
+        _interpretations[interpretation_id]["task"] = None
+        return {
+            "status": "error",
+            "interpretation": "<p><b>Error:</b> The Model is currently at its capacity limit. Please try again.</p>"
+        }
+
+def _purge_expired(ttl_seconds: int):
+    """Drop interpretations older than the TTL"""
+    cutoff = time.time() - ttl_seconds
+    expired = [key for key, entry in _interpretations.items() if entry["created"] < cutoff]
+
+    for key in expired:
+        task = _interpretations.pop(key)["task"]
+        if task is not None and not task.done():
+            task.cancel()
+
+    if expired:
+        logger.info(f"Purged {len(expired)} expired interpretations")
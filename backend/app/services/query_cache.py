@@ -0,0 +1,203 @@
+"""
+Persistent cache of natural-language questions to generated SQL.
+Backed by SQLite so answers survive restarts.
+"""
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from app.core.config import get_settings
+from app.core.logging import configure_logging
+from app.utils.hashing import schema_fingerprint
+
+# Configure logging
+logger = configure_logging(logger_name="query-cache")
+
+def normalize_question(question: str) -> str:
+    """Normalize a question so trivially different phrasings share a cache entry"""
+    text = question.strip().lower()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" \"'?!.;")
+
+class QueryCache:
+    """
+    SQLite-backed NL->SQL cache keyed by (normalized question, database, schema fingerprint)
+
+    Entries expire after ttl_seconds, the least recently used entries are evicted
+    beyond max_entries, and entries for a database are dropped as soon as a
+    different schema fingerprint is seen for it.
+    """
+
+    def __init__(self, path: str, max_entries: int = 5000, ttl_seconds: int = 604800):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS sql_cache (
+                database_name TEXT NOT NULL,
+                schema_hash TEXT NOT NULL,
+                question TEXT NOT NULL,
+                sql_query TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL,
+                hit_count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (database_name, schema_hash, question)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sql_cache_last_used ON sql_cache (last_used)")
+        self._conn.commit()
+
+        # Last fingerprint seen per database, so invalidation only runs on change
+        self._fingerprints: Dict[str, str] = {}
+
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+        logger.info(f"Query cache opened at {path}")
+
+    def _check_fingerprint(self, database_name: str, schema_hash: str):
+        """Drop entries built against an older schema of this database"""
+        if self._fingerprints.get(database_name) == schema_hash:
+            return
+
+        cursor = self._conn.execute(
+            "DELETE FROM sql_cache WHERE database_name = ? AND schema_hash != ?",
+            (database_name, schema_hash)
+        )
+        self._conn.commit()
+        self._fingerprints[database_name] = schema_hash
+
+        if cursor.rowcount:
+            self._stats["invalidations"] += cursor.rowcount
+            logger.info(f"Schema changed for {database_name}: invalidated {cursor.rowcount} cached queries")
+
+    def get(self, question: str, database_name: str, schema_context: str) -> Optional[str]:
+        """Return cached SQL for the question, or None on a miss"""
+        key = (database_name, schema_fingerprint(schema_context), normalize_question(question))
+        now = time.time()
+
+        with self._lock:
+            self._check_fingerprint(database_name, key[1])
+
+            row = self._conn.execute(
+                "SELECT sql_query, created_at FROM sql_cache "
+                "WHERE database_name = ? AND schema_hash = ? AND question = ?",
+                key
+            ).fetchone()
+
+            if row is None:
+                self._stats["misses"] += 1
+                return None
+
+            sql_query, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute(
+                    "DELETE FROM sql_cache WHERE database_name = ? AND schema_hash = ? AND question = ?",
+                    key
+                )
+                self._conn.commit()
+                self._stats["expirations"] += 1
+                self._stats["misses"] += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE sql_cache SET last_used = ?, hit_count = hit_count + 1 "
+                "WHERE database_name = ? AND schema_hash = ? AND question = ?",
+                (now, *key)
+            )
+            self._conn.commit()
+            self._stats["hits"] += 1
+            return sql_query
+
+    def put(self, question: str, database_name: str, schema_context: str, sql_query: str):
+        """Store generated SQL for the question, evicting LRU entries beyond max_entries"""
+        key = (database_name, schema_fingerprint(schema_context), normalize_question(question))
+        now = time.time()
+
+        with self._lock:
+            self._check_fingerprint(database_name, key[1])
+
+            self._conn.execute(
+                "INSERT OR REPLACE INTO sql_cache "
+                "(database_name, schema_hash, question, sql_query, created_at, last_used, hit_count) "
+                "VALUES (?, ?, ?, ?, ?, ?, 0)",
+                (*key, sql_query, now, now)
+            )
+            self._stats["stores"] += 1
+
+            # Purge expired entries, then trim to max_entries by least recent use
+            cursor = self._conn.execute(
+                "DELETE FROM sql_cache WHERE created_at < ?",
+                (now - self.ttl_seconds,)
+            )
+            self._stats["expirations"] += max(cursor.rowcount, 0)
+
+            cursor = self._conn.execute(
+                "DELETE FROM sql_cache WHERE rowid IN ("
+                "SELECT rowid FROM sql_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,)
+            )
+            self._stats["evictions"] += max(cursor.rowcount, 0)
+            self._conn.commit()
+
+    def discard(self, question: str, database_name: str, schema_context: str):
+        """Remove a cached entry (e.g. when its SQL no longer executes)"""
+        key = (database_name, schema_fingerprint(schema_context), normalize_question(question))
+
+        with self._lock:
+            self._conn.execute(
+                "DELETE FROM sql_cache WHERE database_name = ? AND schema_hash = ? AND question = ?",
+                key
+            )
+            self._conn.commit()
+
+    def clear(self) -> int:
+        """Remove every cached entry, returning how many were removed"""
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM sql_cache")
+            self._conn.commit()
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Hit/miss counters since startup plus current entry count"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0]
+
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            **self._stats,
+            "entries": entries,
+            "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0
+        }
+
+# Create a global cache instance
+_query_cache = None
+
+def get_query_cache() -> Optional[QueryCache]:
+    """Get the NL->SQL cache (singleton pattern), or None when disabled"""
+    global _query_cache
+    settings = get_settings()
+
+    if not settings.QUERY_CACHE_ENABLED:
+        return None
+
+    if _query_cache is None:
+        _query_cache = QueryCache(
+            settings.QUERY_CACHE_PATH,
+            max_entries=settings.QUERY_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.QUERY_CACHE_TTL_SECONDS
+        )
+    return _query_cache
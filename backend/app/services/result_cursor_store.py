@@ -0,0 +1,167 @@
+"""
+Server-side result cursors.
+Large SQL results stay on the server behind a cursor id; /db/chat returns the
+first page and /db/results/{cursor_id} serves later pages, optionally sorted
+and filtered over the stored rows.
+UPDATED: Cursor sizes reuse the byte estimate made while fetching
+"""
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.logging import configure_logging
+from app.models.api import ResultPage, TableData
+from app.utils.query_result import table_bytes
+
+# Configure logging
+logger = configure_logging(logger_name="result-cursors")
+
+class ResultCursorStore:
+    """LRU store of query results with idle TTL and a total size budget"""
+
+    def __init__(self, ttl_seconds: int = 900, max_bytes: int = 256 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._cursors: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        self._stats = {"created": 0, "pages_served": 0, "expired": 0, "evicted": 0}
+
+    def put(self, table_data: TableData, session_id: Optional[str] = None) -> str:
+        """Store a full result and return its cursor id"""
+        self._purge_expired()
+
+        cursor_id = uuid.uuid4().hex
+        size = table_bytes(table_data)
+        self._cursors[cursor_id] = {
+            "table": table_data,
+            "session_id": session_id,
+            "bytes": size,
+            "last_access": time.time(),
+            "view_key": None,  # (sort, filter, filter_column) of the cached view
+            "view_rows": None
+        }
+        self._total_bytes += size
+        self._stats["created"] += 1
+
+        while len(self._cursors) > 1 and self._total_bytes > self.max_bytes:
+            _, evicted = self._cursors.popitem(last=False)
+            self._total_bytes -= evicted["bytes"]
+            self._stats["evicted"] += 1
+
+        return cursor_id
+
+    def page(
+            self,
+            cursor_id: str,
+            offset: int = 0,
+            limit: int = 100,
+            sort: Optional[str] = None,
+            filter_text: Optional[str] = None,
+            filter_column: Optional[str] = None
+    ) -> Tuple[Optional[ResultPage], Optional[str]]:
+        """
+        Get one page of a stored result
+
+        Args:
+            cursor_id: Cursor returned with the first page
+            offset: Index of the first row (after sort/filter)
+            limit: Maximum rows to return
+            sort: Column to sort by; prefix with "-" for descending
+            filter_text: Keep rows where a cell contains this text (case-insensitive)
+            filter_column: Only match filter_text against this column
+
+        Returns:
+            Tuple of (page, error_message); (None, None) if the cursor is unknown or expired
+        """
+        self._purge_expired()
+
+        entry = self._cursors.get(cursor_id)
+        if entry is None:
+            return None, None
+
+        self._cursors.move_to_end(cursor_id)
+        entry["last_access"] = time.time()
+        table: TableData = entry["table"]
+
+        view_key = (sort, filter_text, filter_column)
+        if entry["view_key"] != view_key:
+            rows, error = _build_view(table, sort, filter_text, filter_column)
+            if error:
+                return None, error
+            # Keep the last view so paging through it doesn't re-sort every time
+            entry["view_key"], entry["view_rows"] = view_key, rows
+
+        rows = entry["view_rows"]
+        self._stats["pages_served"] += 1
+
+        return ResultPage(
+            cursor_id=cursor_id,
+            headers=table.headers,
+            rows=rows[offset:offset + limit],
+            offset=offset,
+            limit=limit,
+            row_count=len(rows),
+            has_more=offset + limit < len(rows),
+            truncated=table.truncated,
+            total_rows_estimate=table.total_rows_estimate,
+            total_is_exact=table.total_is_exact
+        ), None
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.ttl_seconds
+        expired = [cursor_id for cursor_id, entry in self._cursors.items() if entry["last_access"] < cutoff]
+        for cursor_id in expired:
+            self._total_bytes -= self._cursors.pop(cursor_id)["bytes"]
+            self._stats["expired"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"cursors": len(self._cursors), "bytes": self._total_bytes, **self._stats}
+
+def _build_view(table: TableData, sort: Optional[str], filter_text: Optional[str],
+                filter_column: Optional[str]) -> Tuple[Optional[List[List[Any]]], Optional[str]]:
+    """Filter then sort a table's rows"""
+    rows = table.rows
+
+    if filter_text:
+        needle = filter_text.lower()
+        if filter_column:
+            if filter_column not in table.headers:
+                return None, f"Unknown filter column: {filter_column}"
+            columns = [table.headers.index(filter_column)]
+        else:
+            columns = range(len(table.headers))
+        rows = [row for row in rows if any(needle in str(row[i]).lower() for i in columns if row[i] is not None)]
+
+    if sort:
+        descending = sort.startswith("-")
+        column = sort.lstrip("-")
+        if column not in table.headers:
+            return None, f"Unknown sort column: {column}"
+        index = table.headers.index(column)
+
+        # NULLs last; fall back to text ordering when a column mixes types
+        present = [row for row in rows if row[index] is not None]
+        missing = [row for row in rows if row[index] is None]
+        try:
+            present.sort(key=lambda row: row[index], reverse=descending)
+        except TypeError:
+            present.sort(key=lambda row: str(row[index]), reverse=descending)
+        rows = present + missing
+
+    return list(rows), None
+
+# Create a global store instance
+_result_cursor_store = None
+
+def get_result_cursor_store() -> ResultCursorStore:
+    """Get the result cursor store (singleton pattern)"""
+    global _result_cursor_store
+    if _result_cursor_store is None:
+        settings = get_settings()
+        _result_cursor_store = ResultCursorStore(
+            settings.RESULT_CURSOR_TTL_SECONDS,
+            settings.RESULT_CURSOR_MAX_BYTES
+        )
+    return _result_cursor_store
@@ -1,19 +1,36 @@
 """
 Schema discovery service for auto-discovering database schema.
 UPDATED: Added function to work with custom connection string
+UPDATED: Builds a relevance index (with foreign keys) for schema pruning
+UPDATED: Discovery queries bypass the result row/byte caps so large schemas are read in full
 """
-from typing import Optional, Tuple
+from typing import Callable, Dict, List, Optional, Tuple
 from app.services.db_service import execute_sql_query, execute_sql_query_with_connection
+from app.services.schema_index import SchemaIndex, register_schema_index
+from app.core.config import get_settings
 from app.core.logging import configure_logging
 
 # Configure logging
 logger = configure_logging(logger_name="schema-discovery")
 
-def discover_database_schema() -> Tuple[Optional[str], Optional[str]]:
+# Foreign key relationships between base tables - SQL SERVER specific
+FOREIGN_KEY_QUERY = """
+SELECT
+    OBJECT_SCHEMA_NAME(fk.parent_object_id) AS TABLE_SCHEMA,
+    OBJECT_NAME(fk.parent_object_id) AS TABLE_NAME,
+    OBJECT_SCHEMA_NAME(fk.referenced_object_id) AS REFERENCED_SCHEMA,
+    OBJECT_NAME(fk.referenced_object_id) AS REFERENCED_TABLE
+FROM sys.foreign_keys fk
+"""
+
+def discover_database_schema(database_name: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
     """
     Auto-discover database schema by querying system tables
-    Uses current connection string from db_service
+    Uses the default connection string (DB_CONNECTION_STRING)
     
+    Args:
+        database_name: If given, a schema index is registered for this database
+
     Returns:
         Tuple of (schema_context, error_message)
     """
@@ -42,7 +59,8 @@ def discover_database_schema() -> Tuple[Optional[str], Optional[str]]:
         logger.info("Starting database schema discovery...")
 
         # Execute the discovery query
-        result, error = execute_sql_query(discovery_query)
+        # Uncapped: a schema cut off at DB_MAX_RESULT_ROWS would silently hide tables
+        result, error = execute_sql_query(discovery_query, capped=False)
 
         if error:
             logger.error(f"Schema discovery failed: {error}")
@@ -55,6 +73,9 @@ def discover_database_schema() -> Tuple[Optional[str], Optional[str]]:
         # Format the results into a readable context
         schema_context = format_schema_context(result["table"])
 
+        if database_name:
+            _register_index(database_name, result["table"], lambda query: execute_sql_query(query, capped=False))
+
         logger.info(f"Schema discovery completed successfully - Found {len(result['table'].rows)} columns")
         return schema_context, None
 
@@ -63,12 +84,13 @@ def discover_database_schema() -> Tuple[Optional[str], Optional[str]]:
         logger.error(error_msg)
         return None, error_msg
 
-def discover_database_schema_with_connection(connection_string: str) -> Tuple[Optional[str], Optional[str]]:
+def discover_database_schema_with_connection(connection_string: str, database_name: Optional[str] = None) -> Tuple[Optional[str], Optional[str]]:
     """
     Auto-discover database schema with specific connection string
     
     Args:
         connection_string: Database connection string to use
+        database_name: If given, a schema index is registered for this database
         
     Returns:
         Tuple of (schema_context, error_message)
@@ -98,7 +120,8 @@ def discover_database_schema_with_connection(connection_string: str) -> Tuple[Op
         logger.info("Starting database schema discovery with custom connection...")
 
         # Execute the discovery query with specific connection
-        result, error = execute_sql_query_with_connection(discovery_query, connection_string)
+        # Uncapped: a schema cut off at DB_MAX_RESULT_ROWS would silently hide tables
+        result, error = execute_sql_query_with_connection(discovery_query, connection_string, capped=False)
 
         if error:
             logger.error(f"Schema discovery failed: {error}")
@@ -111,6 +134,13 @@ def discover_database_schema_with_connection(connection_string: str) -> Tuple[Op
         # Format the results into a readable context
         schema_context = format_schema_context(result["table"])
 
+        if database_name:
+            _register_index(
+                database_name,
+                result["table"],
+                lambda query: execute_sql_query_with_connection(query, connection_string, capped=False)
+            )
+
         logger.info(f"Schema discovery completed successfully - Found {len(result['table'].rows)} columns")
         return schema_context, None
 
@@ -119,19 +149,56 @@ def discover_database_schema_with_connection(connection_string: str) -> Tuple[Op
         logger.error(error_msg)
         return None, error_msg
 
-def format_schema_context(table_data) -> str:
+def _register_index(database_name: str, table_data, run_query: Callable):
+    """Discover foreign keys and register a schema index for the database"""
+    foreign_keys = []
+    result, error = run_query(FOREIGN_KEY_QUERY)
+
+    if error:
+        # Ranking still works without relationships, just no FK neighbours
+        logger.warning(f"Foreign key discovery failed for {database_name}: {error}")
+    elif result and result["table"]:
+        foreign_keys = [
+            (f"{row[0]}.{row[1]}", f"{row[2]}.{row[3]}")
+            for row in result["table"].rows
+        ]
+
+    register_schema_index(database_name, build_schema_index(table_data, foreign_keys))
+
+def build_schema_index(table_data, foreign_keys: List[Tuple[str, str]]) -> SchemaIndex:
     """
-    Format the raw schema data into a readable context string for Gemini
-    
+    Build a relevance index from the raw schema data
+
     Args:
         table_data: TableData object with schema information
-        
+        foreign_keys: (referencing table, referenced table) pairs
+
     Returns:
-        Formatted schema context string
+        SchemaIndex over the base tables
     """
+    tables, column_names = _group_schema_columns(table_data)
 
-    # Group columns by table
+    table_blocks = {
+        table_name: "\n".join([f"Table: {table_name}", "-" * (len(table_name) + 7)] + columns)
+        for table_name, columns in tables.items()
+    }
+
+    return SchemaIndex(
+        table_blocks,
+        column_names,
+        foreign_keys,
+        synonyms=get_settings().SCHEMA_SYNONYMS
+    )
+
+def _group_schema_columns(table_data) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+    """
+    Group raw schema rows by table
+
+    Returns:
+        Tuple of (table name -> formatted column lines, table name -> column names)
+    """
     tables = {}
+    column_names = {}
 
     for row in table_data.rows:
         schema_name = row[0]
@@ -149,6 +216,7 @@ def format_schema_context(table_data) -> str:
 
         if full_table_name not in tables:
             tables[full_table_name] = []
+            column_names[full_table_name] = []
 
         # Format column info
         column_info = f"  {column_name} {data_type}"
@@ -173,6 +241,23 @@ def format_schema_context(table_data) -> str:
             column_info += f" DEFAULT {default_value}"
 
         tables[full_table_name].append(column_info)
+        column_names[full_table_name].append(column_name)
+
+    return tables, column_names
+
+def format_schema_context(table_data) -> str:
+    """
+    Format the raw schema data into a readable context string for Gemini
+    
+    Args:
+        table_data: TableData object with schema information
+        
+    Returns:
+        Formatted schema context string
+    """
+
+    # Group columns by table
+    tables, _ = _group_schema_columns(table_data)
 
     # Build the formatted context
     context_lines = [
@@ -0,0 +1,249 @@
+"""
+Lexical relevance index over a discovered database schema.
+Ranks tables for a question with BM25 so only the relevant part
+of the schema has to be sent to Gemini.
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from app.core.config import get_settings
+from app.core.logging import configure_logging
+from app.utils.tokens import estimate_tokens
+
+# Configure logging
+logger = configure_logging(logger_name="schema-index")
+
+# Business vocabulary -> schema vocabulary
+DEFAULT_SYNONYMS: Dict[str, List[str]] = {
+    "staff": ["employee"],
+    "people": ["employee"],
+    "worker": ["employee"],
+    "headcount": ["employee", "department"],
+    "emp": ["employee"],
+    "absent": ["attendance", "work", "hour"],
+    "present": ["attendance", "work", "hour"],
+    "absence": ["attendance", "leave"],
+    "dept": ["department"],
+    "division": ["department"],
+    "salary": ["payroll", "salary", "pay"],
+    "wage": ["payroll", "salary"],
+    "client": ["customer"],
+    "supplier": ["vendor"],
+    "bill": ["invoice"],
+    "sale": ["sale", "order", "invoice"],
+    "revenue": ["sale", "invoice", "amount"],
+    "manager": ["employee", "manager"],
+    "boss": ["manager"],
+    "holiday": ["leave", "vacation"],
+    "vacation": ["leave"],
+    "site": ["project"],
+    "job": ["project", "position"],
+    "role": ["position", "title"],
+}
+
+# Words that never help ranking
+STOP_WORDS = {
+    "a", "an", "the", "of", "in", "on", "for", "to", "by", "with", "and", "or",
+    "me", "show", "list", "give", "get", "find", "what", "which", "who", "how",
+    "many", "much", "is", "are", "was", "were", "all", "from", "last", "this",
+    "that", "per", "each", "every", "their", "there", "do", "does", "did", "have", "has",
+}
+
+def _stem(token: str) -> str:
+    """Very light plural stemming so 'employees' matches 'Employee'"""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith("ses"):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> List[str]:
+    """Split identifiers and prose into lowercase stemmed tokens (CamelCase and snake_case aware)"""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text or "")
+    text = re.sub(r"([A-Z]+)([A-Z][a-z])", r"\1 \2", text)
+    words = re.findall(r"[A-Za-z]+|\d+", text)
+    return [_stem(word.lower()) for word in words if word.lower() not in STOP_WORDS]
+
+class SchemaIndex:
+    """
+    BM25 index over tables, built from the schema discovery result
+
+    Each table document is made of its name (weighted up) and its column
+    names. Questions are expanded through a synonym map before scoring.
+    """
+
+    def __init__(
+            self,
+            table_blocks: Dict[str, str],
+            table_columns: Dict[str, List[str]],
+            foreign_keys: Iterable[Tuple[str, str]] = (),
+            synonyms: Optional[Dict[str, List[str]]] = None,
+            k1: float = 1.5,
+            b: float = 0.75,
+            name_weight: int = 3
+    ):
+        """
+        Args:
+            table_blocks: Full table name -> formatted schema block for that table
+            table_columns: Full table name -> column names
+            foreign_keys: (referencing table, referenced table) pairs
+            synonyms: Extra synonyms merged over DEFAULT_SYNONYMS
+        """
+        self.table_blocks = table_blocks
+        self.k1 = k1
+        self.b = b
+
+        self.synonyms = {key: [_stem(v) for v in values] for key, values in DEFAULT_SYNONYMS.items()}
+        for key, values in (synonyms or {}).items():
+            self.synonyms[_stem(key.lower())] = [_stem(v.lower()) for v in values]
+
+        # FK graph (undirected - either side of a join is useful)
+        self.neighbours: Dict[str, Set[str]] = {name: set() for name in table_blocks}
+        for child, parent in foreign_keys:
+            if child in self.neighbours and parent in self.neighbours and child != parent:
+                self.neighbours[child].add(parent)
+                self.neighbours[parent].add(child)
+
+        # Build BM25 term statistics
+        self.term_freqs: Dict[str, Counter] = {}
+        self.doc_lengths: Dict[str, int] = {}
+        document_freq: Counter = Counter()
+
+        for name in table_blocks:
+            table_name = name.split(".", 1)[-1]
+            tokens = tokenize(table_name) * name_weight
+            for column in table_columns.get(name, []):
+                tokens.extend(tokenize(column))
+
+            counts = Counter(tokens)
+            self.term_freqs[name] = counts
+            self.doc_lengths[name] = len(tokens)
+            document_freq.update(counts.keys())
+
+        doc_count = len(table_blocks) or 1
+        self.avg_doc_length = (sum(self.doc_lengths.values()) / doc_count) if self.doc_lengths else 0.0
+        self.idf = {
+            term: math.log(1 + (doc_count - freq + 0.5) / (freq + 0.5))
+            for term, freq in document_freq.items()
+        }
+
+        self.full_tokens = estimate_tokens("\n\n".join(table_blocks.values()))
+
+    def _expand_query(self, question: str) -> List[str]:
+        """Tokenize the question and add synonym expansions"""
+        terms = []
+        for token in tokenize(question):
+            terms.append(token)
+            terms.extend(self.synonyms.get(token, []))
+        return terms
+
+    def rank(self, question: str) -> List[Tuple[str, float]]:
+        """Score every table against the question, best first (zero scores dropped)"""
+        terms = self._expand_query(question)
+        scores = []
+
+        for name, counts in self.term_freqs.items():
+            doc_length = self.doc_lengths[name] or 1
+            norm = self.k1 * (1 - self.b + self.b * doc_length / (self.avg_doc_length or 1))
+            score = 0.0
+            for term in terms:
+                freq = counts.get(term)
+                if not freq:
+                    continue
+                score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                scores.append((name, score))
+
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores
+
+    def select_tables(self, question: str, top_k: int, max_tokens: int,
+                      exclude: Optional[Set[str]] = None) -> List[str]:
+        """
+        Pick the top-k tables for a question plus their FK neighbours,
+        stopping once the token budget is spent
+
+        Args:
+            question: User question
+            top_k: Number of directly relevant tables to take
+            max_tokens: Budget for the selected schema blocks
+            exclude: Tables already sent (not counted, not returned)
+        """
+        exclude = exclude or set()
+        ranked = [name for name, _ in self.rank(question) if name not in exclude][:top_k]
+
+        # Direct hits first, then their FK neighbours
+        candidates = list(ranked)
+        for name in ranked:
+            for neighbour in sorted(self.neighbours.get(name, ())):
+                if neighbour not in exclude and neighbour not in candidates:
+                    candidates.append(neighbour)
+
+        selected = []
+        used_tokens = 0
+        for name in candidates:
+            block_tokens = estimate_tokens(self.table_blocks[name])
+            if selected and used_tokens + block_tokens > max_tokens:
+                continue
+            selected.append(name)
+            used_tokens += block_tokens
+
+        return selected
+
+    def render(self, tables: List[str]) -> str:
+        """Render schema blocks for the given tables, with their FK relationships"""
+        blocks = []
+        for name in tables:
+            block = self.table_blocks[name]
+            related = sorted(self.neighbours.get(name, ()))
+            if related:
+                block += f"\n  -- Related tables: {', '.join(related)}"
+            blocks.append(block)
+        return "\n\n".join(blocks)
+
+    def catalog(self) -> str:
+        """Compact list of every table name, for the system instruction"""
+        lines = [
+            "DATABASE TABLES (columns for the tables relevant to each question are provided with the question):",
+            ", ".join(sorted(self.table_blocks))
+        ]
+        return "\n".join(lines)
+
+# Indexes per database name
+_schema_indexes: Dict[str, SchemaIndex] = {}
+
+def register_schema_index(database_name: str, index: Optional[SchemaIndex]):
+    """Register (or with None, remove) the schema index for a database"""
+    if index is None:
+        _schema_indexes.pop(database_name, None)
+        return
+
+    _schema_indexes[database_name] = index
+    logger.info(f"Registered schema index for {database_name}: {len(index.table_blocks)} tables, ~{index.full_tokens} tokens")
+
+def get_schema_index(database_name: str) -> Optional[SchemaIndex]:
+    """Get the schema index for a database, if discovery built one"""
+    return _schema_indexes.get(database_name)
+
+def get_pruning_index(database_name: str) -> Optional[SchemaIndex]:
+    """
+    Get the schema index if pruning should apply to this database
+    Pruning is skipped when disabled or when the full schema already fits the budget
+    """
+    settings = get_settings()
+    if not settings.SCHEMA_PRUNING_ENABLED:
+        return None
+
+    index = get_schema_index(database_name)
+    if index is None:
+        return None
+
+    _, max_tokens = settings.get_schema_budget(database_name)
+    if index.full_tokens <= max_tokens:
+        return None
+
+    return index
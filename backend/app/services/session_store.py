@@ -0,0 +1,180 @@
+"""
+Bounded in-memory store for chat sessions.
+Replaces the unbounded module-level dict with LRU and idle-TTL eviction,
+per-session size estimates and a background sweeper.
+"""
+import asyncio
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional
+
+from app.core.logging import configure_logging
+
+# Configure logging
+logger = configure_logging(logger_name="session-store")
+
+# Rough fixed cost of a session (chat object, config, dict entry)
+SESSION_OVERHEAD_BYTES = 4096
+
+def estimate_session_bytes(session: Dict[str, Any]) -> int:
+    """
+    Estimate the memory held by a session
+    Dominated by the chat history text (pasted results, file dumps)
+    """
+    size = SESSION_OVERHEAD_BYTES
+    chat = session.get("chat")
+
+    history = chat.get_history() if chat is not None and hasattr(chat, "get_history") else []
+    for content in history:
+        for part in content.parts or []:
+            text = getattr(part, "text", None)
+            if text:
+                size += sys.getsizeof(text)
+
+    return size
+
+class SessionStore:
+    """
+    Dict-like session store with max-session and max-bytes limits
+
+    Sessions are kept in least-recently-used order. Inserting or touching a
+    session may evict the least recently used ones; the background sweeper
+    removes sessions idle longer than idle_ttl_seconds.
+    """
+
+    def __init__(self, max_sessions: int = 500, max_bytes: int = 256 * 1024 * 1024,
+                 idle_ttl_seconds: int = 3600, sweep_interval_seconds: int = 60):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.sweep_interval_seconds = sweep_interval_seconds
+
+        self._sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+
+        self._evictions = {"lru_count": 0, "lru_bytes": 0, "idle": 0}
+        self._sweeper: Optional[asyncio.Task] = None
+
+    # Dict interface
+    def __contains__(self, session_id: object) -> bool:
+        return session_id in self._sessions
+
+    def __getitem__(self, session_id: str) -> Dict[str, Any]:
+        session = self._sessions[session_id]
+        self._sessions.move_to_end(session_id)
+        self._last_used[session_id] = time.time()
+        return session
+
+    def __setitem__(self, session_id: str, session: Dict[str, Any]):
+        if session_id in self._sessions:
+            self._remove(session_id)
+
+        self._sessions[session_id] = session
+        self._last_used[session_id] = time.time()
+        self._set_size(session_id, estimate_session_bytes(session))
+        self._enforce_limits()
+
+    def __delitem__(self, session_id: str):
+        self._remove(session_id)
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._sessions))
+
+    def get(self, session_id: str, default=None):
+        return self[session_id] if session_id in self._sessions else default
+
+    def values(self):
+        return list(self._sessions.values())
+
+    def items(self):
+        return list(self._sessions.items())
+
+    def clear(self):
+        self._sessions.clear()
+        self._last_used.clear()
+        self._sizes.clear()
+        self._total_bytes = 0
+
+    # Accounting
+    def touch(self, session_id: str):
+        """Mark a session used and re-estimate its size (call after each exchange)"""
+        if session_id not in self._sessions:
+            return
+
+        self._sessions.move_to_end(session_id)
+        self._last_used[session_id] = time.time()
+        self._set_size(session_id, estimate_session_bytes(self._sessions[session_id]))
+        self._enforce_limits()
+
+    def _set_size(self, session_id: str, size: int):
+        self._total_bytes += size - self._sizes.get(session_id, 0)
+        self._sizes[session_id] = size
+
+    def _remove(self, session_id: str):
+        self._sessions.pop(session_id, None)
+        self._last_used.pop(session_id, None)
+        self._total_bytes -= self._sizes.pop(session_id, 0)
+
+    def _enforce_limits(self):
+        """Evict least recently used sessions, never the most recent one"""
+        while len(self._sessions) > 1 and (
+                len(self._sessions) > self.max_sessions or self._total_bytes > self.max_bytes):
+            over_count = len(self._sessions) > self.max_sessions
+            session_id = next(iter(self._sessions))
+            self._remove(session_id)
+            self._evictions["lru_count" if over_count else "lru_bytes"] += 1
+            logger.info(f"Evicted session {session_id[:8]}... ({'session limit' if over_count else 'memory limit'})")
+
+    def sweep(self) -> int:
+        """Remove sessions idle longer than the TTL, returning how many were removed"""
+        cutoff = time.time() - self.idle_ttl_seconds
+        expired = [session_id for session_id, last_used in self._last_used.items() if last_used < cutoff]
+
+        for session_id in expired:
+            self._remove(session_id)
+
+        if expired:
+            self._evictions["idle"] += len(expired)
+            logger.info(f"Swept {len(expired)} idle sessions")
+        return len(expired)
+
+    # Background sweeper
+    def start_sweeper(self):
+        """Start the periodic idle sweep on the running event loop"""
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = asyncio.create_task(self._run_sweeper())
+
+    async def stop_sweeper(self):
+        """Stop the periodic idle sweep"""
+        if self._sweeper is not None:
+            self._sweeper.cancel()
+            try:
+                await self._sweeper
+            except asyncio.CancelledError:
+                pass
+            self._sweeper = None
+
+    async def _run_sweeper(self):
+        while True:
+            await asyncio.sleep(self.sweep_interval_seconds)
+            try:
+                self.sweep()
+            except Exception as e:
+                logger.error(f"Session sweep failed: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Live sessions, estimated bytes and eviction counts"""
+        return {
+            "live_sessions": len(self._sessions),
+            "estimated_bytes": self._total_bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "idle_ttl_seconds": self.idle_ttl_seconds,
+            "evictions": dict(self._evictions)
+        }
@@ -0,0 +1,176 @@
+"""
+In-memory cache of SQL SELECT results.
+Keyed by (connection string, normalized SQL) with a global or per-table TTL and
+an LRU byte budget. Only plain reads are cached; anything that may write or is
+nondeterministic bypasses it.
+UPDATED: Entry sizes reuse the byte estimate made while fetching
+UPDATED: Queries calling current date/time functions are not cached
+"""
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.logging import configure_logging
+from app.utils.query_result import table_bytes
+
+# Configure logging
+logger = configure_logging(logger_name="sql-result-cache")
+
+TABLE_REFERENCE = re.compile(r"\b(?:FROM|JOIN)\s+((?:\[[^\]]+\]|[\w#]+)(?:\s*\.\s*(?:\[[^\]]+\]|\w+))*)", re.IGNORECASE)
+# SELECT ... INTO writes a table; NEWID/RAND differ on every run; date/time functions make "today" queries go stale
+UNCACHEABLE = re.compile(
+    r"\b(?:INTO|NEWID|RAND|CRYPT_GEN_RANDOM|GETDATE|GETUTCDATE|SYSDATETIME|SYSUTCDATETIME|SYSDATETIMEOFFSET"
+    r"|CURRENT_TIMESTAMP)\b",
+    re.IGNORECASE
+)
+
+def referenced_tables(query: str) -> List[str]:
+    """Lower-cased, unqualified names of the tables a query reads from"""
+    tables = []
+    for reference in TABLE_REFERENCE.findall(query):
+        name = reference.split(".")[-1].strip().strip("[]").lower()
+        if name and name not in tables:
+            tables.append(name)
+    return tables
+
+class SqlResultCache:
+    """
+    LRU cache of query results with TTLs
+
+    Each entry's TTL is the shortest TTL configured for any table it reads,
+    or the global TTL when none of its tables has one. A TTL of 0 disables caching.
+    """
+
+    def __init__(self, ttl_seconds: int = 60, table_ttls: Optional[Dict[str, int]] = None,
+                 max_bytes: int = 128 * 1024 * 1024):
+        self.ttl_seconds = ttl_seconds
+        self.table_ttls = {table.lower(): ttl for table, ttl in (table_ttls or {}).items()}
+        self.max_bytes = max_bytes
+
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._total_bytes = 0
+        # Bumped on invalidation so results of queries already in flight aren't stored
+        self._generations: Dict[Optional[str], int] = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "bypassed": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0
+        }
+
+    def ttl_for(self, query: str) -> int:
+        """TTL in seconds for a query's result (0 = don't cache)"""
+        if not query.lstrip().upper().startswith("SELECT") or UNCACHEABLE.search(query):
+            return 0
+
+        ttls = [self.table_ttls[table] for table in referenced_tables(query) if table in self.table_ttls]
+        return min(ttls) if ttls else self.ttl_seconds
+
+    def get(self, connection_string: str, normalized_sql: str) -> Optional[Dict]:
+        """Cached result for a query, or None on a miss"""
+        key = (connection_string, normalized_sql)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self._stats["misses"] += 1
+            return None
+
+        if entry["expires_at"] <= time.time():
+            self._remove(key)
+            self._stats["expirations"] += 1
+            self._stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self._stats["hits"] += 1
+        return entry["result"]
+
+    def generation(self, connection_string: str) -> Tuple[int, int]:
+        """Invalidation generation to capture before running a query and pass to put"""
+        return self._generations.get(None, 0), self._generations.get(connection_string, 0)
+
+    def put(self, connection_string: str, normalized_sql: str, result: Dict, ttl_seconds: int,
+            generation: Optional[Tuple[int, int]] = None):
+        """Store a successful query result, unless the cache was invalidated since generation"""
+        if generation is not None and generation != self.generation(connection_string):
+            return
+
+        size = _estimate_result_bytes(result)
+        if ttl_seconds <= 0 or size > self.max_bytes:
+            return
+
+        key = (connection_string, normalized_sql)
+        if key in self._entries:
+            self._remove(key)
+
+        self._entries[key] = {
+            "result": result,
+            "bytes": size,
+            "expires_at": time.time() + ttl_seconds
+        }
+        self._total_bytes += size
+        self._stats["stores"] += 1
+
+        while self._total_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats["evictions"] += 1
+
+    def note_bypass(self):
+        self._stats["bypassed"] += 1
+
+    def invalidate(self, connection_string: Optional[str] = None) -> int:
+        """Drop entries for one connection string (or all); returns how many were dropped"""
+        self._generations[connection_string] = self._generations.get(connection_string, 0) + 1
+
+        keys = [key for key in self._entries if connection_string is None or key[0] == connection_string]
+        for key in keys:
+            self._remove(key)
+        self._stats["invalidations"] += len(keys)
+
+        if keys:
+            logger.info(f"Invalidated {len(keys)} cached SQL results")
+        return len(keys)
+
+    def _remove(self, key: Tuple[str, str]):
+        self._total_bytes -= self._entries.pop(key)["bytes"]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._stats["hits"] + self._stats["misses"]
+        return {
+            "entries": len(self._entries),
+            "bytes": self._total_bytes,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else 0.0,
+            **self._stats
+        }
+
+def _estimate_result_bytes(result: Dict) -> int:
+    """Rough in-memory size of a query result: its table's rows (or text when it has no table)"""
+    table = result["table"]
+    if table is not None:
+        # Twice the rows, allowing for the text rendering a reader may add later
+        return 2 * table_bytes(table)
+    return len(result["text"] or "")
+
+# Create a global cache instance
+_sql_result_cache = None
+
+def get_sql_result_cache() -> Optional[SqlResultCache]:
+    """Get the SQL result cache (singleton pattern), or None when disabled"""
+    global _sql_result_cache
+    settings = get_settings()
+    if not settings.SQL_RESULT_CACHE_ENABLED:
+        return None
+    if _sql_result_cache is None:
+        _sql_result_cache = SqlResultCache(
+            settings.SQL_RESULT_CACHE_TTL_SECONDS,
+            settings.SQL_RESULT_CACHE_TABLE_TTLS,
+            settings.SQL_RESULT_CACHE_MAX_BYTES
+        )
+    return _sql_result_cache
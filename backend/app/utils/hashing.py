@@ -0,0 +1,13 @@
+"""
+Hashing helpers for cache keys and fingerprints.
+"""
+import hashlib
+
+def schema_fingerprint(schema_context: str) -> str:
+    """
+    Stable short fingerprint of a schema context string
+
+    Any change to the discovered schema yields a different fingerprint,
+    which lets caches keyed on it invalidate themselves.
+    """
+    return hashlib.sha256((schema_context or "").encode("utf-8")).hexdigest()[:16]
@@ -0,0 +1,28 @@
+"""
+Newline-delimited JSON helpers for streaming endpoints.
+"""
+import json
+from typing import Any, AsyncIterator
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+def format_ndjson_line(data: Any) -> str:
+    """Serialize one item (Pydantic models are supported) as a JSON line"""
+    return json.dumps(jsonable_encoder(data)) + "\n"
+
+def ndjson_response(items: AsyncIterator[Any]) -> StreamingResponse:
+    """Wrap an async iterator of items in an application/x-ndjson response, one line per item"""
+
+    async def line_stream():
+        async for item in items:
+            yield format_ndjson_line(item)
+
+    return StreamingResponse(
+        line_stream(),
+        media_type="application/x-ndjson",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering so lines flush immediately
+        }
+    )
@@ -0,0 +1,90 @@
+"""
+SQL query results with a lazily rendered text form.
+The structured rows are built once while fetching; the plain-text table
+(the old DataFrame.to_string output) is only rendered when a caller reads it.
+UPDATED: table_bytes reuses the size measured while fetching instead of re-stringifying every cell
+"""
+from collections.abc import Mapping
+from typing import Any, Iterator, List, Optional, Sequence
+
+from app.models.api import TableData
+
+class QueryResult(Mapping):
+    """
+    Result of one SQL statement
+
+    Reads like the {"text": ..., "table": ...} dict results used to be, but the
+    text is rendered from the table on first access and then kept.
+    """
+
+    def __init__(self, table: Optional[TableData], text: Optional[str] = None,
+                 total_rows: Optional[int] = None, total_is_exact: bool = True):
+        self.table = table
+        self._text = text
+        self.total_rows = total_rows if total_rows is not None else (table.row_count if table else 0)
+        self.total_is_exact = total_is_exact
+
+    @property
+    def text(self) -> str:
+        """Plain-text table of every fetched row, with a row count footer"""
+        if self._text is None:
+            self._text = self.text_for_rows(self.table.rows)
+        return self._text
+
+    def text_for_rows(self, rows: Sequence[Sequence[Any]]) -> str:
+        """Plain-text table of some leading rows (e.g. the first page), footer counting the whole result"""
+        shown = len(rows)
+        if shown < self.total_rows:
+            footer = f"(showing first {shown} of {'' if self.total_is_exact else 'at least '}{self.total_rows} rows)"
+        else:
+            footer = f"({shown} rows returned)"
+        return f"{render_table_text(self.table.headers, rows)}\n\n{footer}"
+
+    def text_within(self, max_chars: int) -> Optional[str]:
+        """The text if it is at most max_chars long, else None - large results aren't rendered to find out"""
+        if self._text is None and self.table is not None:
+            # Every cell renders to at least one character plus a separator
+            if len(self.table.rows) * max(len(self.table.headers), 1) * 2 > max_chars:
+                return None
+        text = self.text
+        return text if len(text) <= max_chars else None
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "text":
+            return self.text
+        if key == "table":
+            return self.table
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(("text", "table"))
+
+    def __len__(self) -> int:
+        return 2
+
+# Per-value cost assumed for tables that carry no fetch-time size estimate
+FALLBACK_BYTES_PER_VALUE = 24
+
+def table_bytes(table: TableData) -> int:
+    """Rough in-memory size of a table's rows: the fetch-time estimate, else a per-value guess"""
+    if table.estimated_bytes is not None:
+        return table.estimated_bytes
+    return FALLBACK_BYTES_PER_VALUE * len(table.rows) * len(table.headers)
+
+def render_table_text(headers: List[str], rows: Sequence[Sequence[Any]]) -> str:
+    """
+    Render rows as a right-aligned plain-text table, one line per row
+
+    Works column by column: each column's cells are stringified once and padded
+    to the column's widest cell, matching DataFrame.to_string(index=False).
+    """
+    columns = [[str(header)] for header in headers]
+    for index, values in enumerate(zip(*rows)):
+        columns[index].extend(map(str, values))
+
+    padded = []
+    for cells in columns:
+        width = max(map(len, cells))
+        padded.append([cell.rjust(width) for cell in cells])
+
+    return "\n".join(" " + " ".join(line) for line in zip(*padded))
@@ -0,0 +1,124 @@
+"""
+Per-request stage timing and token accounting.
+A RequestTimings lives in a context variable for the duration of a request, so
+services record stages without threading it through every call. Executor work
+sees it when submitted with contextvars.copy_context().
+"""
+import math
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Deque, Dict, Iterator, Optional
+
+_current_timings: ContextVar[Optional["RequestTimings"]] = ContextVar("request_timings", default=None)
+
+class RequestTimings:
+    """Accumulated milliseconds per stage plus Gemini token usage for one request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+        self.tokens: Dict[str, int] = {"prompt": 0, "completion": 0, "cached": 0, "total": 0}
+        self.llm_calls = 0
+
+    def add_stage(self, name: str, elapsed_ms: float):
+        self.stages[name] = self.stages.get(name, 0.0) + elapsed_ms
+
+    def add_usage(self, usage: Any):
+        """Add a Gemini usage_metadata block (missing counts are treated as 0)"""
+        self.llm_calls += 1
+        if usage is None:
+            return
+        self.tokens["prompt"] += getattr(usage, "prompt_token_count", None) or 0
+        self.tokens["completion"] += getattr(usage, "candidates_token_count", None) or 0
+        self.tokens["cached"] += getattr(usage, "cached_content_token_count", None) or 0
+        self.tokens["total"] += getattr(usage, "total_token_count", None) or 0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "total_ms": round((time.perf_counter() - self.started) * 1000, 1),
+            "stages": {name: round(ms, 1) for name, ms in self.stages.items()},
+            "tokens": dict(self.tokens),
+            "llm_calls": self.llm_calls
+        }
+
+@contextmanager
+def request_timings() -> Iterator[RequestTimings]:
+    """Make a fresh RequestTimings current for the enclosed block"""
+    timings = RequestTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+def current_timings() -> Optional[RequestTimings]:
+    """The RequestTimings of the request being served, if any"""
+    return _current_timings.get()
+
+@contextmanager
+def timed_stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as a stage of the current request (no-op outside one)"""
+    timings = _current_timings.get()
+    if timings is None:
+        yield
+        return
+
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add_stage(name, (time.perf_counter() - started) * 1000)
+
+def record_llm_usage(response: Any):
+    """Add a model response's usage metadata to the current request"""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add_usage(getattr(response, "usage_metadata", None))
+
+class TimingAggregator:
+    """Recent per-endpoint timings summarised for the debug endpoint"""
+
+    def __init__(self, window: int = 1000):
+        self._samples: Dict[str, Deque[Dict[str, Any]]] = defaultdict(lambda: deque(maxlen=window))
+
+    def record(self, endpoint: str, timings: Dict[str, Any]):
+        self._samples[endpoint].append(timings)
+
+    def stats(self) -> Dict[str, Any]:
+        summary = {}
+        for endpoint, samples in self._samples.items():
+            stage_values: Dict[str, list] = defaultdict(list)
+            token_totals: Dict[str, int] = defaultdict(int)
+
+            for sample in samples:
+                stage_values["total"].append(sample["total_ms"])
+                for name, ms in sample["stages"].items():
+                    stage_values[name].append(ms)
+                for name, count in sample["tokens"].items():
+                    token_totals[name] += count
+
+            summary[endpoint] = {
+                "requests": len(samples),
+                "stages_ms": {name: _distribution(values) for name, values in stage_values.items()},
+                "avg_tokens": {name: round(total / len(samples), 1) for name, total in token_totals.items()}
+            }
+        return summary
+
+def _distribution(values: list) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "avg": round(sum(ordered) / len(ordered), 1),
+        "p50": round(ordered[len(ordered) // 2], 1),
+        "p95": round(ordered[math.ceil(len(ordered) * 0.95) - 1], 1),
+        "max": round(ordered[-1], 1)
+    }
+
+# Singleton aggregator
+_aggregator = TimingAggregator()
+
+def get_timing_aggregator() -> TimingAggregator:
+    """Get the process-wide timing aggregator"""
+    return _aggregator
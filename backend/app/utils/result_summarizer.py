@@ -0,0 +1,130 @@
+"""
+Token-bounded digests of SQL results for AI interpretation.
+The client still receives the full table; Gemini gets a compact summary
+(row count, per-column statistics, top values, head and tail rows).
+UPDATED: Truncated results are described against the query's total row count
+"""
+from typing import List, Optional
+
+import pandas as pd
+
+from app.core.logging import configure_logging
+from app.models.api import TableData
+from app.utils.tokens import estimate_tokens
+
+# Configure logging
+logger = configure_logging(logger_name="result-summarizer")
+
+def summarize_table(table_data: Optional[TableData], max_tokens: int = 2000,
+                    text_result: Optional[str] = None) -> str:
+    """
+    Build a digest of a query result that fits the token budget
+
+    Args:
+        table_data: Structured query result
+        max_tokens: Token budget for the digest
+        text_result: Full text rendering; returned as-is when it already fits
+
+    Returns:
+        Result text for the interpretation prompt
+    """
+    if text_result is not None and estimate_tokens(text_result) <= max_tokens:
+        return text_result
+
+    if table_data is None:
+        return (text_result or "")[:max_tokens * 4]
+
+    df = pd.DataFrame.from_records(table_data.rows, columns=table_data.headers)
+    df = _coerce_types(df)
+    total_rows = len(df)
+    row_description = _describe_rows(table_data)
+
+    # Shrink sample sizes until the digest fits
+    head_rows, tail_rows, top_k = 10, 5, 5
+    while True:
+        digest = _build_digest(df, row_description, head_rows, tail_rows, top_k)
+        if estimate_tokens(digest) <= max_tokens or (head_rows <= 1 and top_k <= 1):
+            break
+        head_rows, tail_rows, top_k = max(1, head_rows // 2), tail_rows // 2, max(1, top_k - 2)
+
+    if estimate_tokens(digest) > max_tokens:
+        digest = digest[:max_tokens * 4] + "\n... (digest truncated)"
+
+    logger.info(f"Summarized {total_rows} rows into ~{estimate_tokens(digest)} tokens")
+    return digest
+
+def _describe_rows(table_data: TableData) -> str:
+    """Row count for the digest header, flagging results cut off by the fetch caps"""
+    if not table_data.truncated:
+        return f"{table_data.row_count} rows"
+    at_least = "" if table_data.total_is_exact else "at least "
+    return (f"first {table_data.row_count} of {at_least}{table_data.total_rows_estimate} rows "
+            f"(result truncated; statistics cover the returned rows only)")
+
+def _coerce_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Convert object columns holding numbers (e.g. Decimal) to numeric dtypes"""
+    for column in df.columns:
+        if df[column].dtype == "object":
+            try:
+                df[column] = pd.to_numeric(df[column])
+            except (ValueError, TypeError):
+                pass
+    return df
+
+def _build_digest(df: pd.DataFrame, row_description: str, head_rows: int, tail_rows: int, top_k: int) -> str:
+    """Render the digest text for the given sample sizes"""
+    lines = [
+        f"Result summary: {row_description} x {len(df.columns)} columns "
+        f"(digest of the full result, not every row)",
+        "",
+        "Columns:"
+    ]
+    lines.extend(_column_summaries(df, top_k))
+
+    lines.append("")
+    lines.append(f"First {min(head_rows, len(df))} rows:")
+    lines.append(df.head(head_rows).to_string(index=False, max_colwidth=40))
+
+    if tail_rows and len(df) > head_rows:
+        lines.append("")
+        lines.append(f"Last {min(tail_rows, len(df) - head_rows)} rows:")
+        lines.append(df.tail(min(tail_rows, len(df) - head_rows)).to_string(index=False, max_colwidth=40))
+
+    return "\n".join(lines)
+
+def _column_summaries(df: pd.DataFrame, top_k: int) -> List[str]:
+    """One line of statistics per column"""
+    null_counts = df.isna().sum()
+    numeric = df.select_dtypes(include="number")
+    numeric_stats = numeric.agg(["min", "max", "mean", "sum"]) if not numeric.empty else None
+
+    summaries = []
+    for column in df.columns:
+        series = df[column]
+        line = f"- {column} ({series.dtype}): {int(null_counts[column])} nulls"
+
+        if numeric_stats is not None and column in numeric_stats.columns:
+            stats = numeric_stats[column]
+            line += (f", min={_fmt(stats['min'])}, max={_fmt(stats['max'])}, "
+                     f"mean={_fmt(stats['mean'])}, sum={_fmt(stats['sum'])}")
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            line += f", from {series.min()} to {series.max()}"
+        else:
+            values = series.dropna().astype(str).str.slice(0, 40)
+            counts = values.value_counts()
+            top = ", ".join(f"{value} ({count})" for value, count in counts.head(top_k).items())
+            line += f", {len(counts)} distinct"
+            if top:
+                line += f", top: {top}"
+
+        summaries.append(line)
+
+    return summaries
+
+def _fmt(value) -> str:
+    """Compact number formatting"""
+    if pd.isna(value):
+        return "n/a"
+    if float(value).is_integer():
+        return str(int(value))
+    return f"{value:.4g}"
@@ -0,0 +1,52 @@
+"""
+Single-flight request coalescing.
+Concurrent callers asking for the same key share one in-flight computation.
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls by key
+
+    The first caller for a key runs the computation; callers arriving while
+    it is in flight await the same result (or exception). Once it completes
+    the key is released, so later calls compute afresh.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+        self._stats = {"executed": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run fn for key, or join the computation already running for it
+
+        Args:
+            key: Coalescing key
+            fn: Coroutine factory, only called by the first caller
+        """
+        future = self._in_flight.get(key)
+
+        if future is not None:
+            self._stats["coalesced"] += 1
+        else:
+            self._stats["executed"] += 1
+            future = asyncio.ensure_future(fn())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+
+        # Shield so one caller going away doesn't cancel the work for the others
+        return await asyncio.shield(future)
+
+    def stats(self) -> Dict[str, Any]:
+        """Executed/coalesced counters and current in-flight keys"""
+        calls = self._stats["executed"] + self._stats["coalesced"]
+        return {
+            **self._stats,
+            "in_flight": len(self._in_flight),
+            "coalesced_rate": round(self._stats["coalesced"] / calls, 3) if calls else 0.0
+        }
@@ -0,0 +1,38 @@
+"""
+Server-Sent Events helpers for streaming endpoints.
+"""
+import json
+from typing import Any, AsyncIterator, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+
+def format_sse_event(event: str, data: Any) -> str:
+    """
+    Format a single Server-Sent Event
+
+    Args:
+        event: Event name (e.g. "sql_generated", "token", "done")
+        data: JSON-serializable payload (Pydantic models are supported)
+
+    Returns:
+        SSE wire-format string
+    """
+    payload = json.dumps(jsonable_encoder(data))
+    return f"event: {event}\ndata: {payload}\n\n"
+
+def sse_response(events: AsyncIterator[Tuple[str, Any]]) -> StreamingResponse:
+    """Wrap an async iterator of (event, data) pairs in a text/event-stream response"""
+
+    async def event_stream():
+        async for event, data in events:
+            yield format_sse_event(event, data)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no"  # Disable proxy buffering so events flush immediately
+        }
+    )
@@ -0,0 +1,7 @@
+"""
+Token estimation helpers for prompt budgeting.
+"""
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate for prompt budgeting (~4 characters per token)"""
+    return len(text or "") // 4 + 1
@@ -0,0 +1,150 @@
+"""
+Micro-benchmark: turning a SELECT cursor into a result the old way (fetchall +
+pandas DataFrame + to_string + validated TableData) against the current path
+(db_service._execute_and_fetch, with the text rendered only on demand).
+
+Both paths read the same rows from the same in-memory cursor, so the numbers
+cover fetching, building the table and rendering the text - not the network.
+The current path is measured three ways: fetch only (the text is never read),
+plus the first-page text a paged chat response renders, and plus the full text.
+The fetch is uncapped so both paths keep every row.
+
+Usage (from backend/):
+    python benchmarks/result_formatting.py [--rows 1000 10000 100000] [--repeat 5]
+
+pandas is only needed for the old-path numbers. db_service imports pyodbc, so
+the driver module must be importable (no database is contacted).
+"""
+import argparse
+import datetime
+import decimal
+import logging
+import os
+import sys
+import time
+import tracemalloc
+from typing import Callable, List, Sequence, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Settings require a connection string even though the benchmark never connects
+os.environ.setdefault("DB_CONNECTION_STRING", "DRIVER={benchmark};SERVER=none")
+
+from app.core.config import get_settings  # noqa: E402
+from app.models.api import TableData  # noqa: E402
+from app.services.db_service import _execute_and_fetch  # noqa: E402
+from app.utils.query_result import QueryResult  # noqa: E402
+
+HEADERS = ["id", "name", "amount", "created", "note"]
+QUERY = "SELECT id, name, amount, created, note FROM Benchmark"
+
+class BenchmarkCursor:
+    """In-memory stand-in for a pyodbc cursor over a fixed result"""
+
+    def __init__(self, rows: Sequence[tuple]):
+        self.description = [(name,) for name in HEADERS]
+        self.rowcount = -1
+        self._rows = rows
+        self._position = 0
+
+    def execute(self, query: str):
+        self._position = 0
+
+    def fetchmany(self, size: int) -> List[tuple]:
+        batch = self._rows[self._position:self._position + size]
+        self._position += len(batch)
+        return list(batch)
+
+    def fetchall(self) -> List[tuple]:
+        return self.fetchmany(len(self._rows) - self._position)
+
+    def cancel(self):
+        pass
+
+    def close(self):
+        pass
+
+class BenchmarkConnection:
+    def commit(self):
+        pass
+
+def make_rows(count: int) -> List[tuple]:
+    """Rows shaped like pyodbc returns them (tuple-like rows of driver values)"""
+    start = datetime.date(2024, 1, 1)
+    return [
+        (i, f"customer {i % 997}", decimal.Decimal(i % 10000) / 100,
+         start + datetime.timedelta(days=i % 365), None if i % 7 else "flagged")
+        for i in range(count)
+    ]
+
+def pandas_path(rows: List[tuple]) -> Tuple[str, TableData]:
+    """What execute_sql_query did before: fetchall, DataFrame for the text, validated TableData for the rows"""
+    import pandas as pd
+
+    cursor = BenchmarkCursor(rows)
+    cursor.execute(QUERY)
+    column_names = [column[0] for column in cursor.description]
+    fetched = cursor.fetchall()
+
+    df = pd.DataFrame.from_records(fetched, columns=column_names)
+    text = df.to_string(index=False) + f"\n\n({len(df)} rows returned)"
+    table = TableData(headers=column_names, rows=[list(row) for row in fetched], row_count=len(fetched))
+    return text, table
+
+def fetch_path(rows: List[tuple]) -> QueryResult:
+    """What execute_sql_query does now; the text is never read"""
+    return _execute_and_fetch(BenchmarkCursor(rows), BenchmarkConnection(), QUERY, capped=False)
+
+def first_page_path(rows: List[tuple]) -> str:
+    """Current path plus the text a chat response carries (first page only when the result is paged)"""
+    result = fetch_path(rows)
+    page_size = get_settings().RESULT_PAGE_SIZE
+    if len(result.table.rows) > page_size:
+        return result.text_for_rows(result.table.rows[:page_size])
+    return result.text
+
+def full_text_path(rows: List[tuple]) -> str:
+    """Current path when a caller does need the full text"""
+    return fetch_path(rows).text
+
+def measure(fn: Callable, rows: List[tuple], repeat: int) -> Tuple[float, float]:
+    """Best wall time (ms) over repeat runs, and peak traced allocation (MB) of one run"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(rows)
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    fn(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return best * 1000, peak / (1024 * 1024)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    # Per-query info logging would dominate the small cases
+    logging.getLogger("db-service").setLevel(logging.WARNING)
+
+    try:
+        import pandas  # noqa: F401
+        paths = [("pandas + TableData", pandas_path)]
+    except ImportError:
+        print("pandas not installed - skipping the old path")
+        paths = []
+    paths += [("fetch", fetch_path), ("fetch + first page", first_page_path),
+              ("fetch + full text", full_text_path)]
+
+    print(f"{'rows':>8}  {'path':<20} {'best ms':>10} {'peak MB':>10}")
+    for count in args.rows:
+        rows = make_rows(count)
+        for name, fn in paths:
+            elapsed_ms, peak_mb = measure(fn, rows, args.repeat)
+            print(f"{count:>8}  {name:<20} {elapsed_ms:>10.1f} {peak_mb:>10.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Shared test setup.
+Tests run offline: the mock LLM backend and the local context cache are
+selected, and when the ODBC driver manager isn't installed a minimal pyodbc
+module is registered so db_service imports. Tests that need a database use
+the fake_database fixture or replace pyodbc.connect themselves.
+"""
+import os
+import sys
+import tempfile
+import threading
+import types
+from typing import Callable, List, Optional
+
+import pytest
+
+os.environ.setdefault("DB_CONNECTION_STRING", "Driver={ODBC Driver 18 for SQL Server};Server=test;Database=TestDb;")
+os.environ.setdefault("LLM_BACKEND", "mock")
+os.environ.setdefault("GEMINI_CONTEXT_CACHE", "local")
+os.environ.setdefault("MOCK_LLM_LATENCY_DISTRIBUTION", "fixed")
+os.environ.setdefault("MOCK_LLM_LATENCY_MEDIAN_MS", "0")
+os.environ.setdefault("DB_RETRY_BACKOFF_BASE_SECONDS", "0")
+os.environ.setdefault("QUERY_CACHE_PATH", os.path.join(tempfile.mkdtemp(), "query_cache.sqlite3"))
+
+try:
+    import pyodbc  # noqa: F401
+except ImportError:
+    pyodbc = types.ModuleType("pyodbc")
+
+    class Error(Exception):
+        pass
+
+    pyodbc.Error = Error
+    pyodbc.DatabaseError = Error
+    pyodbc.InterfaceError = Error
+    pyodbc.OperationalError = Error
+    pyodbc.ProgrammingError = Error
+
+    def connect(connection_string, **kwargs):
+        raise Error("08001", "No database in tests (pyodbc.connect was not replaced)")
+
+    pyodbc.connect = connect
+    sys.modules["pyodbc"] = pyodbc
+
+class FakeCursor:
+    def __init__(self, database: "FakeDatabase"):
+        self.database = database
+        self.description = None
+        self.rowcount = -1
+        self._rows: list = []
+        self._cancelled = threading.Event()
+
+    def execute(self, query: str):
+        self.database.queries.append(query)
+        if self.database.block:
+            # Like a long-running statement: only cursor.cancel() ends it
+            if not self._cancelled.wait(5):
+                raise AssertionError("Blocked statement was never cancelled")
+            raise db_pyodbc().Error("HY008", "[Microsoft][ODBC Driver 18 for SQL Server]Operation canceled (0) (SQLExecDirectW)")
+        if self.database.execute_error is not None:
+            error = self.database.execute_error(query)
+            if error is not None:
+                raise error
+        if query.strip().upper().startswith("SELECT"):
+            self.description = [(name, None, None, None, None, None, None) for name in self.database.headers]
+            self._rows = [tuple(row) for row in self.database.rows]
+        else:
+            self.rowcount = 1
+        return self
+
+    def fetchmany(self, size: int):
+        batch, self._rows = self._rows[:size], self._rows[size:]
+        return batch
+
+    def fetchall(self):
+        return self.fetchmany(len(self._rows))
+
+    def cancel(self):
+        self.database.cancels += 1
+        self._cancelled.set()
+        self._rows = []
+
+    def close(self):
+        pass
+
+class FakeConnection:
+    def __init__(self, database: "FakeDatabase"):
+        self.database = database
+        self.timeout = 0
+
+    def cursor(self):
+        return FakeCursor(self.database)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+class FakeDatabase:
+    """
+    In-memory stand-in for pyodbc.connect
+
+    SELECTs return headers/rows; connect_error and execute_error are optional
+    callables returning the exception to raise (or None) for a connection
+    string or query. With block set, statements run until cancelled.
+    """
+
+    def __init__(self):
+        self.headers = ["id", "name"]
+        self.rows = [[1, "alpha"], [2, "beta"]]
+        self.connects: List[str] = []
+        self.queries: List[str] = []
+        self.block = False
+        self.cancels = 0
+        self.connect_error: Optional[Callable[[str], Optional[Exception]]] = None
+        self.execute_error: Optional[Callable[[str], Optional[Exception]]] = None
+
+    def connect(self, connection_string: str, **kwargs):
+        self.connects.append(connection_string)
+        if self.connect_error is not None:
+            error = self.connect_error(connection_string)
+            if error is not None:
+                raise error
+        return FakeConnection(self)
+
+def db_pyodbc():
+    """The pyodbc module db_service uses (the real one or the stand-in above)"""
+    from app.services import db_service
+    return db_service.pyodbc
+
+@pytest.fixture
+def fake_database(monkeypatch) -> FakeDatabase:
+    """Route db_service to a FakeDatabase with fresh pools, breakers and result cache"""
+    from app.services import circuit_breaker, db_service, sql_result_cache
+
+    database = FakeDatabase()
+    monkeypatch.setattr(db_service.pyodbc, "connect", database.connect)
+    monkeypatch.setattr(db_service, "_pools", {})
+    monkeypatch.setattr(circuit_breaker, "_breakers", {})
+    monkeypatch.setattr(sql_result_cache, "_sql_result_cache", None)
+    return database
@@ -0,0 +1,74 @@
+"""Tests for bounded, batched result fetching"""
+import pytest
+
+from app.core.config import get_settings
+from app.services import db_service
+
+CS = "Driver={ODBC Driver 18 for SQL Server};Server=test;Database=Sales;"
+
+@pytest.fixture
+def limits(monkeypatch):
+    """Small fetch limits: batches of 10, at most 25 rows or 10 KB"""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "DB_FETCH_BATCH_SIZE", 10)
+    monkeypatch.setattr(settings, "DB_MAX_RESULT_ROWS", 25)
+    monkeypatch.setattr(settings, "DB_MAX_RESULT_BYTES", 10_000)
+    monkeypatch.setattr(settings, "DB_COUNT_TRUNCATED_ROWS_LIMIT", 0)
+    return settings
+
+def run_select(fake_database, rows, capped=True):
+    fake_database.rows = rows
+    result, error = db_service.execute_sql_query("SELECT id, name FROM Orders", CS, capped=capped)
+    assert error is None
+    return result
+
+def test_result_under_the_caps_is_complete(fake_database, limits):
+    table = run_select(fake_database, [[i, "x"] for i in range(20)]).table
+
+    assert table.row_count == 20
+    assert not table.truncated
+    assert table.total_rows_estimate == 20 and table.total_is_exact
+
+def test_row_cap_truncates_with_lower_bound_total(fake_database, limits):
+    result = run_select(fake_database, [[i, "x"] for i in range(100)])
+    table = result.table
+
+    assert table.row_count == 25
+    assert table.rows[-1] == [24, "x"]
+    assert table.truncated
+    # Counting stopped with the batch that crossed the cap
+    assert table.total_rows_estimate == 30
+    assert not table.total_is_exact
+    assert "at least 30" in result.text
+
+def test_byte_cap_truncates(fake_database, limits):
+    result = run_select(fake_database, [[i, "x" * 1000] for i in range(20)])
+    table = result.table
+
+    assert table.row_count == 10
+    assert table.truncated
+    assert table.total_rows_estimate > table.row_count
+    assert table.estimated_bytes >= limits.DB_MAX_RESULT_BYTES
+
+def test_opt_in_counting_gives_exact_total(fake_database, limits, monkeypatch):
+    monkeypatch.setattr(limits, "DB_COUNT_TRUNCATED_ROWS_LIMIT", 1000)
+
+    table = run_select(fake_database, [[i, "x"] for i in range(100)]).table
+
+    assert table.row_count == 25
+    assert table.truncated
+    assert table.total_rows_estimate == 100 and table.total_is_exact
+
+def test_counting_limit_caps_the_count(fake_database, limits, monkeypatch):
+    monkeypatch.setattr(limits, "DB_COUNT_TRUNCATED_ROWS_LIMIT", 20)
+
+    table = run_select(fake_database, [[i, "x"] for i in range(100)]).table
+
+    assert table.total_rows_estimate == 50
+    assert not table.total_is_exact
+
+def test_uncapped_fetch_reads_everything(fake_database, limits):
+    table = run_select(fake_database, [[i, "x"] for i in range(100)], capped=False).table
+
+    assert table.row_count == 100
+    assert not table.truncated
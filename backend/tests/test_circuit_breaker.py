@@ -0,0 +1,173 @@
+"""Tests for the database circuit breaker and the error classification that feeds it"""
+import pytest
+
+from app.services import circuit_breaker, db_service
+from app.services.circuit_breaker import STATE_CLOSED, STATE_HALF_OPEN, STATE_OPEN, CircuitBreaker
+from app.services.db_service import (
+    DB_ERROR_CONNECTION,
+    DB_ERROR_PERMANENT,
+    DB_ERROR_TRANSIENT,
+    SQL_ERROR_TIMEOUT,
+    SQL_ERROR_UNAVAILABLE,
+    ConnectError,
+    classify_db_error,
+    sql_error_type,
+)
+
+CS = "Driver={ODBC Driver 18 for SQL Server};Server=test;Database=Sales;"
+
+def odbc_error(sqlstate, message="[Microsoft][ODBC Driver 18 for SQL Server]Error (0) (SQLExecDirectW)"):
+    return db_service.pyodbc.Error(sqlstate, message)
+
+LOGIN_TIMEOUT = "[Microsoft][ODBC Driver 18 for SQL Server]Login timeout expired (0) (SQLDriverConnect)"
+QUERY_TIMEOUT = "[Microsoft][ODBC Driver 18 for SQL Server]Query timeout expired (0) (SQLExecDirectW)"
+DEADLOCK = "[Microsoft][ODBC Driver 18 for SQL Server][SQL Server]Transaction was deadlocked (1205) (SQLExecDirectW)"
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic() for the breaker"""
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+def test_breaker_opens_at_failure_threshold():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert not breaker.allow()
+    assert breaker.stats()["state"] == STATE_OPEN
+    assert breaker.stats()["opened"] == 1
+    assert breaker.stats()["rejected"] == 1
+
+def test_success_resets_failure_count():
+    breaker = CircuitBreaker(failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+
+    assert breaker.stats()["state"] == STATE_CLOSED
+
+def test_half_open_lets_one_probe_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 29
+    assert not breaker.allow()
+    assert breaker.retry_in() == pytest.approx(1)
+
+    clock[0] += 1
+
+    assert breaker.allow()
+    assert breaker.stats()["state"] == STATE_HALF_OPEN
+    assert not breaker.allow()
+    assert breaker.stats()["probes"] == 1
+
+def test_successful_probe_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    breaker.allow()
+
+    breaker.record_success()
+
+    assert breaker.stats()["state"] == STATE_CLOSED
+    assert breaker.allow() and breaker.allow()
+
+def test_failed_probe_reopens(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_timeout=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock[0] += 30
+    breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.stats()["state"] == STATE_OPEN
+    assert breaker.retry_in() == pytest.approx(30)
+    assert breaker.stats()["opened"] == 2
+
+def test_probe_failing_for_other_reasons_closes(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+    breaker.record_failure()
+    clock[0] += 30
+    breaker.allow()
+
+    breaker.record_other()
+
+    assert breaker.stats()["state"] == STATE_CLOSED
+
+@pytest.mark.parametrize("error, expected", [
+    (odbc_error("08001"), DB_ERROR_CONNECTION),
+    (odbc_error("08S01"), DB_ERROR_CONNECTION),
+    (odbc_error("HYT01"), DB_ERROR_CONNECTION),
+    (odbc_error("HYT00", LOGIN_TIMEOUT), DB_ERROR_CONNECTION),
+    (ConnectError(odbc_error("HYT00", "Timeout expired (0) (SQLDriverConnectW)")), DB_ERROR_CONNECTION),
+    (ConnectError(odbc_error("HYT00")), DB_ERROR_CONNECTION),
+    (odbc_error("HYT00", QUERY_TIMEOUT), DB_ERROR_PERMANENT),
+    (odbc_error("40001", DEADLOCK), DB_ERROR_TRANSIENT),
+    (odbc_error("42000", DEADLOCK), DB_ERROR_TRANSIENT),
+    (odbc_error("42000", "Service is busy (40501) (SQLExecDirectW)"), DB_ERROR_TRANSIENT),
+    (odbc_error("42000", "Incorrect syntax near 'FORM'. (102) (SQLExecDirectW)"), DB_ERROR_PERMANENT),
+    (odbc_error("28000", "Login failed for user 'app'. (18456) (SQLDriverConnect)"), DB_ERROR_PERMANENT),
+    (ValueError("not a driver error"), DB_ERROR_PERMANENT),
+])
+def test_classify_db_error(error, expected):
+    assert classify_db_error(error) == expected
+
+def test_login_timeout_counts_against_breaker(fake_database):
+    fake_database.connect_error = lambda connection_string: odbc_error("HYT00", LOGIN_TIMEOUT)
+
+    _, error = db_service.execute_sql_query("SELECT 1", CS)
+
+    assert sql_error_type(error) != SQL_ERROR_TIMEOUT
+    # Reads retry connection failures
+    assert len(fake_database.connects) == 3
+    assert db_service.get_circuit_state(CS)["consecutive_failures"] == 1
+
+def test_query_timeout_is_not_a_connection_failure(fake_database):
+    fake_database.execute_error = lambda query: odbc_error("HYT00", QUERY_TIMEOUT)
+
+    _, error = db_service.execute_sql_query("SELECT 1", CS)
+
+    assert sql_error_type(error) == SQL_ERROR_TIMEOUT
+    assert len(fake_database.queries) == 1
+    assert db_service.get_circuit_state(CS)["consecutive_failures"] == 0
+
+def test_deadlock_is_retried(fake_database):
+    attempts = []
+
+    def deadlock_once(query):
+        attempts.append(query)
+        return odbc_error("40001", DEADLOCK) if len(attempts) == 1 else None
+
+    fake_database.execute_error = deadlock_once
+
+    result, error = db_service.execute_sql_query("UPDATE Orders SET Total = 0", CS)
+
+    assert error is None
+    assert len(attempts) == 2
+
+def test_lost_connection_during_write_is_not_retried(fake_database):
+    fake_database.execute_error = lambda query: odbc_error("08S01", "Communication link failure (0) (SQLExecDirectW)")
+
+    _, error = db_service.execute_sql_query("UPDATE Orders SET Total = 0", CS)
+
+    assert error is not None
+    assert len(fake_database.queries) == 1
+
+def test_open_breaker_fails_fast(fake_database):
+    fake_database.connect_error = lambda connection_string: odbc_error("08001", "Server not found (0) (SQLDriverConnect)")
+    threshold = db_service.get_settings().DB_BREAKER_FAILURE_THRESHOLD
+    for _ in range(threshold):
+        db_service.execute_sql_query("SELECT 1", CS, max_attempts=1)
+    connects = len(fake_database.connects)
+
+    _, error = db_service.execute_sql_query("SELECT 1", CS)
+
+    assert sql_error_type(error) == SQL_ERROR_UNAVAILABLE
+    assert len(fake_database.connects) == connects
+    assert db_service.get_circuit_state(CS)["state"] == STATE_OPEN
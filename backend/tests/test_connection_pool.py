@@ -0,0 +1,161 @@
+"""Tests for the per-connection-string pyodbc pool"""
+import threading
+
+import pytest
+
+from app.services import db_service
+from app.services.db_service import ConnectionPool, PoolTimeout
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+        self.rollback_fails = False
+
+    def cursor(self):
+        if not self.alive:
+            raise db_service.pyodbc.Error("08S01", "Communication link failure")
+        return FakeCursor()
+
+    def rollback(self):
+        if self.rollback_fails:
+            raise db_service.pyodbc.Error("08S01", "Communication link failure")
+
+    def close(self):
+        self.closed = True
+
+class FakeCursor:
+    def execute(self, query):
+        return self
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+@pytest.fixture
+def connections(monkeypatch):
+    """Connections opened through pyodbc.connect, in order"""
+    opened = []
+
+    def connect(connection_string, **kwargs):
+        conn = FakeConnection()
+        opened.append(conn)
+        return conn
+
+    monkeypatch.setattr(db_service.pyodbc, "connect", connect)
+    return opened
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic() for the pool"""
+    now = [1000.0]
+    monkeypatch.setattr(db_service.time, "monotonic", lambda: now[0])
+    return now
+
+def test_released_connection_is_reused(connections):
+    pool = ConnectionPool("cs")
+    first = pool.acquire()
+    pool.release(first)
+    second = pool.acquire()
+
+    assert second is first
+    assert len(connections) == 1
+    assert pool.stats()["opened"] == 1
+    assert pool.stats()["reused"] == 1
+
+def test_most_recently_used_connection_is_reused_first(connections):
+    pool = ConnectionPool("cs")
+    a, b = pool.acquire(), pool.acquire()
+    pool.release(a)
+    pool.release(b)
+
+    assert pool.acquire() is b
+
+def test_acquire_times_out_when_pool_is_exhausted(connections):
+    pool = ConnectionPool("cs", max_size=1, acquire_timeout=0.01)
+    pool.acquire()
+
+    with pytest.raises(PoolTimeout):
+        pool.acquire()
+    assert pool.stats()["timeouts"] == 1
+
+def test_waiter_gets_connection_released_by_another_thread(connections):
+    pool = ConnectionPool("cs", max_size=1, acquire_timeout=5)
+    held = pool.acquire()
+    timer = threading.Timer(0.05, pool.release, args=(held,))
+    timer.start()
+
+    assert pool.acquire() is held
+    assert pool.stats()["waits"] >= 1
+    timer.join()
+
+def test_prune_closes_idle_connections_down_to_min_size(connections, clock):
+    pool = ConnectionPool("cs", min_size=1, idle_timeout=60)
+    held = [pool.acquire() for _ in range(3)]
+    for conn in held:
+        pool.release(conn)
+
+    clock[0] += 61
+    pool.prune()
+
+    assert pool.stats()["size"] == 1
+    assert pool.stats()["closed_idle"] == 2
+    assert [conn.closed for conn in held] == [True, True, False]
+
+def test_recently_returned_connections_survive_prune(connections, clock):
+    pool = ConnectionPool("cs", min_size=0, idle_timeout=60)
+    conn = pool.acquire()
+    pool.release(conn)
+
+    clock[0] += 30
+    pool.prune()
+
+    assert pool.stats()["idle"] == 1
+    assert not conn.closed
+
+def test_dead_idle_connection_is_replaced_on_checkout(connections, clock):
+    pool = ConnectionPool("cs", validate_after=30)
+    dead = pool.acquire()
+    pool.release(dead)
+    dead.alive = False
+
+    clock[0] += 31
+    conn = pool.acquire()
+
+    assert conn is not dead
+    assert dead.closed
+    assert pool.stats()["validation_failures"] == 1
+    assert pool.stats()["size"] == 1
+
+def test_failed_rollback_discards_connection(connections):
+    pool = ConnectionPool("cs")
+    conn = pool.acquire()
+    conn.rollback_fails = True
+    pool.release(conn, rollback=True)
+
+    assert conn.closed
+    assert pool.stats()["size"] == 0
+    assert pool.stats()["discarded"] == 1
+
+def test_failed_connect_frees_its_slot(monkeypatch):
+    def connect(connection_string, **kwargs):
+        raise db_service.pyodbc.Error("08001", "Server not found")
+
+    monkeypatch.setattr(db_service.pyodbc, "connect", connect)
+    pool = ConnectionPool("cs", max_size=1)
+
+    for _ in range(2):
+        with pytest.raises(db_service.pyodbc.Error):
+            pool.acquire()
+    assert pool.stats()["size"] == 0
+
+def test_pooling_disabled_closes_on_release(connections):
+    pool = ConnectionPool("cs", reuse=False)
+    conn = pool.acquire()
+    pool.release(conn)
+
+    assert conn.closed
+    assert pool.stats()["size"] == 0
+    assert pool.acquire() is not conn
@@ -0,0 +1,165 @@
+"""Tests for the per-database schema prompt context cache, run against LocalCachesAPI"""
+import asyncio
+import time
+
+from app.core.context_cache import ContextCacheManager, LocalCachesAPI
+
+PROMPT = "You are a SQL assistant. Tables: Orders(Id, CustomerId, Total)"
+
+def make_manager(caches_api=None, ttl_seconds=3600):
+    return ContextCacheManager(caches_api or LocalCachesAPI(), "test-model", ttl_seconds=ttl_seconds, remote=False)
+
+def test_handle_is_created_once_and_shared():
+    caches_api = LocalCachesAPI()
+    manager = make_manager(caches_api)
+
+    async def scenario():
+        return await asyncio.gather(*(manager.get_handle("Sales", PROMPT) for _ in range(5)))
+
+    handles = asyncio.run(scenario())
+
+    assert len({handle.name for handle in handles}) == 1
+    assert handles[0].remote is False
+    assert caches_api.system_instruction(handles[0].name) == PROMPT
+    assert manager.stats()["created"] == 1
+    assert manager.stats()["reused"] == 4
+
+def test_databases_get_separate_handles():
+    manager = make_manager()
+
+    async def scenario():
+        return await manager.get_handle("Sales", PROMPT), await manager.get_handle("Hr", PROMPT)
+
+    sales, hr = asyncio.run(scenario())
+
+    assert sales.name != hr.name
+    assert set(manager.stats()["handles"]) == {"Sales", "Hr"}
+
+def test_schema_change_replaces_handle():
+    caches_api = LocalCachesAPI()
+    manager = make_manager(caches_api)
+
+    async def scenario():
+        old = await manager.get_handle("Sales", PROMPT)
+        new = await manager.get_handle("Sales", PROMPT + ", Customers(Id, Name)")
+        return old, new
+
+    old, new = asyncio.run(scenario())
+
+    assert old.name != new.name
+    assert caches_api.system_instruction(old.name) is None
+    assert manager.stats()["invalidated"] == 1
+
+def test_handle_close_to_expiry_is_refreshed():
+    caches_api = LocalCachesAPI()
+    manager = make_manager(caches_api)
+
+    async def scenario():
+        handle = await manager.get_handle("Sales", PROMPT)
+        handle.expires_at = time.time() + manager.refresh_margin / 2
+        return handle, await manager.get_handle("Sales", PROMPT)
+
+    handle, refreshed = asyncio.run(scenario())
+
+    assert refreshed is handle
+    assert refreshed.expires_at > time.time() + manager.refresh_margin
+    assert manager.stats()["refreshed"] == 1
+    assert manager.stats()["created"] == 1
+
+def test_expired_handle_is_recreated():
+    manager = make_manager()
+
+    async def scenario():
+        handle = await manager.get_handle("Sales", PROMPT)
+        handle.expires_at = time.time() - 1
+        return handle, await manager.get_handle("Sales", PROMPT)
+
+    expired, recreated = asyncio.run(scenario())
+
+    assert recreated.name != expired.name
+    assert manager.stats()["created"] == 2
+
+def test_failed_create_is_not_retried_during_backoff():
+    class RejectingCachesAPI(LocalCachesAPI):
+        def __init__(self):
+            super().__init__()
+            self.creates = 0
+
+        async def create(self, *, model, config=None):
+            self.creates += 1
+            raise ValueError("Cached content is too small")
+
+    caches_api = RejectingCachesAPI()
+    manager = make_manager(caches_api)
+
+    async def scenario():
+        return await manager.get_handle("Sales", PROMPT), await manager.get_handle("Sales", PROMPT)
+
+    assert asyncio.run(scenario()) == (None, None)
+    assert caches_api.creates == 1
+    assert manager.stats()["failed"] == 1
+
+def test_invalidate_deletes_handle():
+    caches_api = LocalCachesAPI()
+    manager = make_manager(caches_api)
+
+    async def scenario():
+        old = await manager.get_handle("Sales", PROMPT)
+        await manager.invalidate("Sales")
+        return old, await manager.get_handle("Sales", PROMPT)
+
+    old, new = asyncio.run(scenario())
+
+    assert caches_api.system_instruction(old.name) is None
+    assert new.name != old.name
+    assert manager.stats()["created"] == 2
+
+def test_local_caches_api_expires_contents():
+    caches_api = LocalCachesAPI()
+
+    async def scenario():
+        from google.genai import types
+        cached = await caches_api.create(
+            model="test-model",
+            config=types.CreateCachedContentConfig(system_instruction=PROMPT, ttl="0s")
+        )
+        try:
+            await caches_api.get(name=cached.name)
+        except KeyError:
+            return True
+        return False
+
+    assert asyncio.run(scenario())
+
+def test_failed_create_entries_are_forgotten(monkeypatch):
+    from app.core import context_cache
+
+    class FlakyCachesAPI(LocalCachesAPI):
+        def __init__(self):
+            super().__init__()
+            self.fail = True
+
+        async def create(self, *, model, config=None):
+            if self.fail:
+                raise ValueError("Cached content is too small")
+            return await super().create(model=model, config=config)
+
+    now = [1_000_000.0]
+    monkeypatch.setattr(context_cache.time, "time", lambda: now[0])
+    caches_api = FlakyCachesAPI()
+    manager = make_manager(caches_api)
+
+    async def scenario():
+        # Each schema version that fails leaves a backoff entry...
+        for version in range(3):
+            await manager.get_handle("Sales", f"{PROMPT} v{version}")
+        assert len(manager._failed) == 3
+
+        # ...until its backoff passes
+        now[0] += context_cache.FAILED_CREATE_BACKOFF_SECONDS
+        caches_api.fail = False
+        handle = await manager.get_handle("Sales", f"{PROMPT} v2")
+        assert handle is not None
+        assert manager._failed == {}
+
+    asyncio.run(scenario())
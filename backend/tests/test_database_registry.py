@@ -0,0 +1,63 @@
+"""Tests for the database registry"""
+import asyncio
+
+import pytest
+
+from app.core.config import get_settings
+from app.services import database_registry
+from app.services.database_registry import ensure_database, validate_database_name
+
+@pytest.fixture
+def discoveries(monkeypatch):
+    """Database names schema discovery ran for; discovery of "missing" fails"""
+    calls = []
+
+    def discover(connection_string, database_name=None):
+        calls.append((database_name, connection_string))
+        if database_name == "missing":
+            return None, "Cannot open database"
+        return f"schema of {database_name}", None
+
+    monkeypatch.setattr(database_registry, "discover_database_schema_with_connection", discover)
+    monkeypatch.setattr(database_registry, "_databases", {})
+    monkeypatch.setattr(database_registry, "_failed_discoveries", {})
+    return calls
+
+@pytest.mark.parametrize("name", ["pa", "erp_mbl", "Sales2024"])
+def test_plain_identifiers_are_valid(name):
+    assert validate_database_name(name) is None
+
+@pytest.mark.parametrize("name", ["x;Server=evil", "pa;Trusted_Connection=yes", "a b", "", "db-1", "[pa]"])
+def test_other_names_are_rejected(name):
+    assert validate_database_name(name) is not None
+
+def test_allow_list(monkeypatch):
+    monkeypatch.setattr(get_settings(), "DB_ALLOWED_DATABASES", ["PA", "erp_mbl"])
+
+    assert validate_database_name("pa") is None
+    assert validate_database_name("sales") is not None
+
+def test_injected_name_never_reaches_discovery(discoveries):
+    entry, error = asyncio.run(ensure_database("x;Server=evil"))
+
+    assert entry is None and error
+    assert discoveries == []
+
+def test_database_is_discovered_once(discoveries):
+    async def scenario():
+        return await asyncio.gather(*(ensure_database("sales") for _ in range(3)))
+
+    results = asyncio.run(scenario())
+
+    assert all(entry["context"] == "schema of sales" for entry, _ in results)
+    assert len(discoveries) == 1
+    assert "Database=sales;" in discoveries[0][1]
+
+def test_failed_discovery_backs_off(discoveries, monkeypatch):
+    assert asyncio.run(ensure_database("missing"))[1] == "Cannot open database"
+    assert asyncio.run(ensure_database("missing"))[1] is not None
+    assert len(discoveries) == 1
+
+    monkeypatch.setattr(get_settings(), "DB_DISCOVERY_RETRY_SECONDS", 0)
+    asyncio.run(ensure_database("missing"))
+    assert len(discoveries) == 2
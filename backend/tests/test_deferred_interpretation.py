@@ -0,0 +1,37 @@
+"""Tests for deferred interpretation of SQL results"""
+import asyncio
+
+from app.services import ai_service
+from app.services.interpretation_service import get_interpretation
+
+CS = "Driver={ODBC Driver 18 for SQL Server};Server=test;Database=Sales;"
+
+def history_texts(chat):
+    return [part.text for content in chat.get_history(curated=True) for part in content.parts]
+
+def test_deferred_interpretation_leaves_session_history_alone(fake_database):
+    async def scenario():
+        first = await ai_service.process_db_message(
+            "SELECT id, name FROM Orders", None, "Orders(id, name)", "sales",
+            defer_interpretation=True, connection_string=CS
+        )
+        assert first.interpretation_id and first.interpretation is None
+        session_id = first.session_id
+        assert history_texts(ai_service._chat_sessions[session_id]["chat"]) == []
+
+        # A follow-up answered before the client fetches the interpretation
+        await ai_service.process_db_message(
+            "How many tables are there?", session_id, "Orders(id, name)", "sales", connection_string=CS
+        )
+        chat = ai_service._chat_sessions[session_id]["chat"]
+        before = history_texts(chat)
+
+        interpretation = await get_interpretation(first.interpretation_id)
+        return interpretation, before, history_texts(ai_service._chat_sessions[session_id]["chat"])
+
+    interpretation, before, after = asyncio.run(scenario())
+
+    assert interpretation["status"] == "ready"
+    assert interpretation["interpretation"]
+    assert after == before
+    assert before[0] == "How many tables are there?"
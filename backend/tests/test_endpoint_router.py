@@ -0,0 +1,118 @@
+"""Tests for read-replica routing"""
+import pytest
+
+from app.core.config import get_settings
+from app.services import endpoint_router
+from app.services.endpoint_router import ROLE_PRIMARY, EndpointRouter
+
+PRIMARY = "Server=primary;Database=Sales;"
+REPLICAS = ["Server=replica1;Database=Sales;", "Server=replica2;Database=Sales;"]
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic() for the router"""
+    now = [1000.0]
+    monkeypatch.setattr(endpoint_router.time, "monotonic", lambda: now[0])
+    return now
+
+def make_router(**kwargs):
+    return EndpointRouter(PRIMARY, REPLICAS, **kwargs)
+
+def test_writes_go_to_the_primary():
+    router = make_router()
+
+    assert router.acquire(read_only=False) is router.primary
+
+def test_reads_pick_the_replica_with_fewest_outstanding():
+    router = make_router()
+    busy, idle = router.replicas
+    busy.outstanding = 3
+    idle.outstanding = 1
+
+    picked = [router.acquire(read_only=True) for _ in range(3)]
+
+    # idle takes reads until it is as loaded as busy, then they alternate
+    assert picked[:2] == [idle, idle]
+    assert busy.outstanding == 3 + picked.count(busy)
+    assert idle.outstanding == 1 + picked.count(idle)
+
+def test_ties_go_to_the_least_used_replica():
+    router = make_router()
+    used = router.acquire(read_only=True)
+    router.release(used, failed=False)
+
+    other = router.acquire(read_only=True)
+
+    assert other is not used
+    assert other.outstanding == 1 and used.outstanding == 0
+
+def test_primary_serves_reads_without_replicas():
+    router = EndpointRouter(PRIMARY, [])
+
+    assert router.acquire(read_only=True) is router.primary
+
+def test_failing_replica_is_ejected_then_restored(clock):
+    router = make_router(eject_after_failures=2, eject_seconds=30)
+    bad, good = router.replicas
+    for _ in range(2):
+        router.acquire(read_only=True, exclude=[good])
+        router.release(bad, failed=True)
+
+    assert bad.ejections == 1
+    assert all(router.acquire(read_only=True) is good for _ in range(3))
+    assert router.stats()["endpoints"][1]["healthy"] is False
+
+    clock[0] += 30
+    assert router.acquire(read_only=True) is bad
+
+def test_success_resets_consecutive_failures():
+    router = make_router(eject_after_failures=2)
+    replica = router.replicas[0]
+    for failed in (True, False, True):
+        router.acquire(read_only=True, exclude=[router.replicas[1]])
+        router.release(replica, failed=failed)
+
+    assert replica.ejections == 0
+    assert replica.failures == 2
+
+def test_reads_fall_back_to_the_primary_when_replicas_are_ejected(clock):
+    router = make_router(eject_after_failures=1)
+    for replica in router.replicas:
+        router.acquire(read_only=True, exclude=[other for other in router.replicas if other is not replica])
+        router.release(replica, failed=True)
+
+    assert router.acquire(read_only=True) is router.primary
+
+def test_failover_excludes_tried_endpoints():
+    router = make_router()
+    first = router.acquire(read_only=True)
+    router.release(first, failed=True)
+    second = router.acquire(read_only=True, exclude=[first])
+    router.release(second, failed=True)
+
+    third = router.acquire(read_only=True, exclude=[first, second])
+
+    assert third.role == ROLE_PRIMARY
+    assert router.acquire(read_only=True, exclude=[first, second, third]) is None
+    assert router.stats()["failovers"] == 2
+
+def test_primary_is_never_ejected():
+    router = make_router(eject_after_failures=1)
+    for _ in range(3):
+        router.release(router.acquire(read_only=False), failed=True)
+
+    assert router.primary.ejections == 0
+    assert router.acquire(read_only=False) is router.primary
+
+def test_router_is_built_from_settings(monkeypatch):
+    monkeypatch.setattr(endpoint_router, "_routers", {})
+    monkeypatch.setattr(get_settings(), "DB_ENDPOINTS", {"sales": [
+        {"role": "primary", "connection_string": "Server=listener;Database=Sales;"},
+        {"role": "replica", "connection_string": REPLICAS[0]}
+    ]})
+
+    router = endpoint_router.get_endpoint_router(PRIMARY, "Sales")
+
+    assert router.primary.connection_string == "Server=listener;Database=Sales;"
+    assert [replica.connection_string for replica in router.replicas] == [REPLICAS[0]]
+    assert endpoint_router.get_endpoint_router("Server=other;Database=Hr;", "Hr") is None
@@ -0,0 +1,173 @@
+"""Tests for Gemini admission control"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.gemini_scheduler import (
+    PRIORITY_DEFERRED,
+    PRIORITY_FILE_ANALYSIS,
+    PRIORITY_INTERACTIVE,
+    AdmissionTimeout,
+    GeminiScheduler,
+    retry_after_seconds,
+)
+
+class ApiError(Exception):
+    """Shaped like google.genai errors: status code, details and the HTTP response"""
+
+    def __init__(self, code, headers=None, details=""):
+        super().__init__(f"{code} error")
+        self.code = code
+        self.details = details
+        self.response = SimpleNamespace(headers=headers or {})
+
+def make_scheduler(**kwargs):
+    options = {
+        "max_in_flight": 1,
+        "requests_per_minute": 0,
+        "tokens_per_minute": 0,
+        "backoff_base_seconds": 0.001,
+        "backoff_max_seconds": 1.0
+    }
+    options.update(kwargs)
+    return GeminiScheduler(**options)
+
+def test_waiters_are_admitted_by_priority_then_arrival():
+    scheduler = make_scheduler()
+    order = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def hold():
+            await release.wait()
+
+        async def record(name):
+            order.append(name)
+
+        holder = asyncio.ensure_future(scheduler.run(hold))
+        await asyncio.sleep(0)
+        waiters = [
+            asyncio.ensure_future(scheduler.run(lambda: record("file"), priority=PRIORITY_FILE_ANALYSIS)),
+            asyncio.ensure_future(scheduler.run(lambda: record("deferred"), priority=PRIORITY_DEFERRED)),
+            asyncio.ensure_future(scheduler.run(lambda: record("interactive-1"), priority=PRIORITY_INTERACTIVE)),
+            asyncio.ensure_future(scheduler.run(lambda: record("interactive-2"), priority=PRIORITY_INTERACTIVE))
+        ]
+        await asyncio.sleep(0.01)
+        assert order == []
+        release.set()
+        await asyncio.gather(holder, *waiters)
+
+    asyncio.run(scenario())
+
+    assert order == ["interactive-1", "interactive-2", "deferred", "file"]
+    assert scheduler.stats()["max_queue_depth"] == 4
+    assert scheduler.stats()["in_flight"] == 0
+
+def test_in_flight_limit_is_respected():
+    scheduler = make_scheduler(max_in_flight=3)
+    running = []
+    peak = []
+
+    async def call():
+        running.append(1)
+        peak.append(len(running))
+        await asyncio.sleep(0.01)
+        running.pop()
+
+    async def scenario():
+        await asyncio.gather(*(scheduler.run(call) for _ in range(10)))
+
+    asyncio.run(scenario())
+
+    assert max(peak) == 3
+    assert scheduler.stats()["admitted"] == 10
+
+def test_transient_failures_are_retried():
+    scheduler = make_scheduler(max_retries=3)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise ApiError(503)
+        return "ok"
+
+    assert asyncio.run(scheduler.run(call)) == "ok"
+    assert scheduler.stats()["retries"] == 2
+    assert scheduler.stats()["in_flight"] == 0
+
+def test_permanent_failures_are_not_retried():
+    scheduler = make_scheduler()
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        raise ApiError(400)
+
+    with pytest.raises(ApiError):
+        asyncio.run(scheduler.run(call))
+    assert len(attempts) == 1
+    assert scheduler.stats()["failures"] == 1
+
+def test_retries_stop_at_max_retries():
+    scheduler = make_scheduler(max_retries=2)
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        raise ApiError(429)
+
+    with pytest.raises(ApiError):
+        asyncio.run(scheduler.run(call))
+    assert len(attempts) == 3
+
+def test_retry_delay_honours_server_hint():
+    scheduler = make_scheduler(backoff_base_seconds=0.5, backoff_max_seconds=30)
+
+    delay = scheduler._retry_delay(ApiError(429, headers={"retry-after": "7"}), attempt=0)
+    assert 7 <= delay <= 7.5
+
+    capped = scheduler._retry_delay(ApiError(429, headers={"retry-after": "120"}), attempt=0)
+    assert capped == 30
+
+    backoff = scheduler._retry_delay(ApiError(503), attempt=2)
+    assert 0 <= backoff <= 2.0
+
+def test_retry_after_seconds():
+    assert retry_after_seconds(ApiError(429, headers={"retry-after": "12"})) == 12.0
+    assert retry_after_seconds(ApiError(429, details="{'@type': 'RetryInfo', 'retryDelay': '3.5s'}")) == 3.5
+    assert retry_after_seconds(ApiError(429, headers={"retry-after": "soon"})) is None
+    assert retry_after_seconds(ValueError("no hint")) is None
+
+def test_queue_timeout_raises_and_frees_queue():
+    scheduler = make_scheduler(queue_timeout_seconds=0.02)
+
+    async def scenario():
+        release = asyncio.Event()
+        holder = asyncio.ensure_future(scheduler.run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionTimeout):
+            await scheduler.run(lambda: asyncio.sleep(0))
+        release.set()
+        await holder
+
+    asyncio.run(scenario())
+
+    assert scheduler.stats()["queue_timeouts"] == 1
+    assert scheduler.stats()["queue_depth"] == 0
+    assert scheduler.stats()["in_flight"] == 0
+
+def test_request_rate_limit_delays_admission():
+    scheduler = make_scheduler(max_in_flight=10, requests_per_minute=600)
+    scheduler._requests.tokens = 1.0
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.gather(scheduler.run(lambda: asyncio.sleep(0)), scheduler.run(lambda: asyncio.sleep(0)))
+        return loop.time() - started
+
+    # 600/min refills one request every 0.1s
+    assert asyncio.run(scenario()) >= 0.08
@@ -0,0 +1,32 @@
+"""Tests for database health probing"""
+import pytest
+
+from app.services import db_service
+from app.services.endpoint_router import EndpointRouter
+
+PRIMARY = "Driver={ODBC Driver 18 for SQL Server};Server=primary;Database=Sales;"
+REPLICA = "Driver={ODBC Driver 18 for SQL Server};Server=replica;Database=Sales;"
+
+@pytest.fixture
+def replicated(fake_database, monkeypatch):
+    """Sales has one read replica; the primary is down"""
+    router = EndpointRouter(PRIMARY, [REPLICA])
+    monkeypatch.setattr(db_service, "get_endpoint_router", lambda connection_string, database_name: router)
+    fake_database.connect_error = lambda connection_string: (
+        db_service.pyodbc.Error("08001", "Server not found (0) (SQLDriverConnect)")
+        if "Server=primary" in connection_string else None
+    )
+    return fake_database
+
+def test_probe_checks_the_primary_not_a_replica(replicated):
+    error = db_service.probe_database(PRIMARY)
+
+    assert error is not None
+    assert not db_service.check_database_connection(PRIMARY)
+    assert all("Server=primary" in connection_string for connection_string in replicated.connects)
+
+def test_reads_still_fail_over_to_the_replica(replicated):
+    result, error = db_service.execute_sql_query("SELECT id, name FROM Orders", PRIMARY)
+
+    assert error is None
+    assert replicated.connects[-1] == REPLICA
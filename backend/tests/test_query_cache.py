@@ -0,0 +1,78 @@
+"""Tests for the persistent NL->SQL cache"""
+import pytest
+
+from app.services import query_cache
+from app.services.query_cache import QueryCache, normalize_question
+
+SCHEMA = "Orders(Id, CustomerId, Total)"
+SQL = "SELECT COUNT(*) FROM Orders"
+
+@pytest.fixture
+def cache(tmp_path):
+    return QueryCache(str(tmp_path / "query_cache.sqlite3"), max_entries=3, ttl_seconds=60)
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the cache"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(query_cache.time, "time", lambda: now[0])
+    return now
+
+def test_normalize_question():
+    assert normalize_question("  How many   ORDERS are there? ") == "how many orders are there"
+
+def test_hit_for_rephrased_question(cache):
+    cache.put("How many orders?", "Sales", SCHEMA, SQL)
+
+    assert cache.get("how many  orders", "Sales", SCHEMA) == SQL
+    assert cache.get("How many orders?", "Hr", SCHEMA) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_schema_change_invalidates_database_entries(cache):
+    cache.put("How many orders?", "Sales", SCHEMA, SQL)
+    cache.put("How many employees?", "Hr", "Employees(Id)", "SELECT COUNT(*) FROM Employees")
+
+    assert cache.get("How many orders?", "Sales", SCHEMA + ", Customers(Id)") is None
+    assert cache.stats()["invalidations"] == 1
+    # The old schema's entries are gone, other databases are untouched
+    assert cache.get("How many orders?", "Sales", SCHEMA) is None
+    assert cache.get("How many employees?", "Hr", "Employees(Id)") is not None
+
+def test_entries_expire_after_ttl(cache, clock):
+    cache.put("How many orders?", "Sales", SCHEMA, SQL)
+
+    clock[0] += 61
+
+    assert cache.get("How many orders?", "Sales", SCHEMA) is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+
+def test_least_recently_used_entries_are_evicted(cache, clock):
+    for number in range(3):
+        cache.put(f"question {number}", "Sales", SCHEMA, f"SELECT {number}")
+        clock[0] += 1
+    cache.get("question 0", "Sales", SCHEMA)
+    clock[0] += 1
+
+    cache.put("question 3", "Sales", SCHEMA, "SELECT 3")
+
+    assert cache.get("question 1", "Sales", SCHEMA) is None
+    assert cache.get("question 0", "Sales", SCHEMA) == "SELECT 0"
+    assert cache.stats()["evictions"] == 1
+
+def test_discard_and_clear(cache):
+    cache.put("How many orders?", "Sales", SCHEMA, SQL)
+    cache.put("Total revenue?", "Sales", SCHEMA, "SELECT SUM(Total) FROM Orders")
+
+    cache.discard("how many orders", "Sales", SCHEMA)
+    assert cache.get("How many orders?", "Sales", SCHEMA) is None
+
+    assert cache.clear() == 1
+    assert cache.stats()["entries"] == 0
+
+def test_entries_survive_reopening(tmp_path):
+    path = str(tmp_path / "query_cache.sqlite3")
+    QueryCache(path).put("How many orders?", "Sales", SCHEMA, SQL)
+
+    assert QueryCache(path).get("How many orders?", "Sales", SCHEMA) == SQL
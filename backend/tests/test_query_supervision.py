@@ -0,0 +1,93 @@
+"""Tests for query timeouts and cancellation when clients disconnect"""
+import asyncio
+
+import pytest
+
+from app.core.config import get_settings
+from app.services import db_service
+from app.services.db_service import SQL_ERROR_CANCELLED, SQL_ERROR_TIMEOUT, sql_error_type
+
+CS = "Driver={ODBC Driver 18 for SQL Server};Server=test;Database=Sales;"
+
+@pytest.fixture
+def supervised(fake_database, monkeypatch):
+    """A blocking database with a 1s query timeout for Sales and fast disconnect polling"""
+    settings = get_settings()
+    monkeypatch.setattr(settings, "DB_QUERY_TIMEOUTS", {"sales": 1})
+    monkeypatch.setattr(settings, "DB_CANCEL_POLL_SECONDS", 0.02)
+    fake_database.block = True
+    return fake_database
+
+def test_sql_error_type():
+    assert sql_error_type(None) is None
+    assert sql_error_type(db_service._interrupted_error(SQL_ERROR_TIMEOUT, 30)) == SQL_ERROR_TIMEOUT
+    assert sql_error_type(db_service._interrupted_error(SQL_ERROR_CANCELLED, 30)) == SQL_ERROR_CANCELLED
+    assert sql_error_type("Database unavailable: recent connections failed") == "unavailable"
+    assert sql_error_type("SQL syntax error in query") == "error"
+
+def test_query_is_cancelled_at_the_database_timeout(supervised):
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await db_service.execute_sql_query_async("SELECT id FROM Orders WHERE slow = 1", CS)
+        return result, loop.time() - started
+
+    (result, error), elapsed = asyncio.run(scenario())
+
+    assert result is None
+    assert sql_error_type(error) == SQL_ERROR_TIMEOUT
+    assert supervised.cancels == 1
+    assert 1 <= elapsed < 3
+    # A timed-out statement says nothing about server health
+    assert db_service.get_circuit_state(CS)["consecutive_failures"] == 0
+
+def test_query_is_cancelled_when_the_client_disconnects(supervised):
+    disconnected = asyncio.Event()
+
+    async def is_disconnected():
+        return disconnected.is_set()
+
+    async def scenario():
+        query = asyncio.ensure_future(db_service.execute_sql_query_async(
+            "SELECT id FROM Orders WHERE slow = 2", CS, is_disconnected
+        ))
+        await asyncio.sleep(0.1)
+        assert not query.done()
+        disconnected.set()
+        return await query
+
+    result, error = asyncio.run(scenario())
+
+    assert result is None
+    assert sql_error_type(error) == SQL_ERROR_CANCELLED
+    assert supervised.cancels == 1
+
+def test_shared_query_keeps_running_while_one_client_remains(supervised, monkeypatch):
+    monkeypatch.setattr(get_settings(), "DB_QUERY_TIMEOUTS", {"sales": 0})
+    gone = asyncio.Event()
+    last_gone = asyncio.Event()
+
+    async def left():
+        return gone.is_set()
+
+    async def stays():
+        return last_gone.is_set()
+
+    async def scenario():
+        first = asyncio.ensure_future(db_service.execute_sql_query_async("SELECT id FROM Orders WHERE slow = 3", CS, left))
+        second = asyncio.ensure_future(db_service.execute_sql_query_async("SELECT id FROM Orders WHERE slow = 3", CS, stays))
+        await asyncio.sleep(0.05)
+        gone.set()
+        await asyncio.sleep(0.1)
+        assert supervised.cancels == 0
+        assert not second.done()
+
+        # Once the last client goes too, the statement is cancelled for both
+        last_gone.set()
+        return await asyncio.gather(first, second)
+
+    results = asyncio.run(scenario())
+
+    assert [sql_error_type(error) for _, error in results] == [SQL_ERROR_CANCELLED, SQL_ERROR_CANCELLED]
+    assert supervised.cancels == 1
+    assert supervised.queries.count("SELECT id FROM Orders WHERE slow = 3") == 1
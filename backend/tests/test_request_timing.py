@@ -0,0 +1,66 @@
+"""Tests for per-request stage timing and token accounting"""
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+from app.utils.request_timing import (
+    TimingAggregator,
+    current_timings,
+    record_llm_usage,
+    request_timings,
+    timed_stage,
+)
+
+def test_stages_accumulate_within_a_request():
+    with request_timings() as timings:
+        with timed_stage("sql"):
+            pass
+        with timed_stage("sql"):
+            pass
+        timings.add_stage("llm", 5.0)
+
+    assert set(timings.stages) == {"sql", "llm"}
+    assert timings.stages["llm"] == 5.0
+    assert current_timings() is None
+
+def test_timed_stage_outside_a_request_is_a_no_op():
+    with timed_stage("sql"):
+        pass
+    record_llm_usage(SimpleNamespace(usage_metadata=None))
+
+    assert current_timings() is None
+
+def test_llm_usage_is_summed():
+    usage = SimpleNamespace(prompt_token_count=100, candidates_token_count=20,
+                            cached_content_token_count=None, total_token_count=120)
+
+    with request_timings() as timings:
+        record_llm_usage(SimpleNamespace(usage_metadata=usage))
+        record_llm_usage(SimpleNamespace(usage_metadata=usage))
+        record_llm_usage(SimpleNamespace())
+
+    assert timings.tokens == {"prompt": 200, "completion": 40, "cached": 0, "total": 240}
+    assert timings.llm_calls == 3
+
+def test_executor_work_records_into_the_submitting_request():
+    def run_query():
+        with timed_stage("db"):
+            pass
+
+    with request_timings() as timings, ThreadPoolExecutor(max_workers=1) as executor:
+        executor.submit(contextvars.copy_context().run, run_query).result()
+
+    assert "db" in timings.stages
+
+def test_aggregator_summarises_per_endpoint():
+    aggregator = TimingAggregator()
+    for total in (10.0, 20.0, 30.0):
+        aggregator.record("/db/chat", {"total_ms": total, "stages": {"sql": total / 2}, "tokens": {"total": 100}})
+
+    summary = aggregator.stats()["/db/chat"]
+
+    assert summary["requests"] == 3
+    assert summary["stages_ms"]["total"]["avg"] == 20.0
+    assert summary["stages_ms"]["total"]["max"] == 30.0
+    assert summary["stages_ms"]["sql"]["p50"] == 10.0
+    assert summary["avg_tokens"]["total"] == 100.0
@@ -0,0 +1,64 @@
+"""Tests for sending pruned schema with questions"""
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import ai_service
+
+class FakeIndex:
+    def select_tables(self, question, top_k, max_tokens, exclude=()):
+        return [table for table in ("orders", "customers") if table not in exclude]
+
+    def render(self, tables):
+        return "\n".join(f"{table}(id)" for table in tables)
+
+@pytest.fixture
+def session(monkeypatch):
+    monkeypatch.setattr(ai_service, "get_pruning_index", lambda database_name: FakeIndex())
+    chat = SimpleNamespace(get_history=lambda curated=False: [SimpleNamespace(parts=[])])
+    ai_service._chat_sessions["pruning-test"] = {"type": "db_query", "database": "sales", "chat": chat,
+                                                 "schema_tables": set()}
+    yield ai_service._chat_sessions["pruning-test"]
+    del ai_service._chat_sessions["pruning-test"]
+
+def test_tables_are_marked_sent_after_successful_send(session, monkeypatch):
+    prompts = []
+
+    async def send_message(chat, message, priority=0):
+        prompts.append(message)
+        return SimpleNamespace(text="ok")
+
+    monkeypatch.setattr(ai_service.llm_client, "send_message", send_message)
+
+    async def scenario():
+        await ai_service._generate_reply("pruning-test", session["chat"], "orders per customer", "ctx", "sales")
+        await ai_service._generate_reply("pruning-test", session["chat"], "orders per customer", "ctx", "sales")
+
+    asyncio.run(scenario())
+
+    assert "orders(id)" in prompts[0]
+    assert prompts[1] == "orders per customer"
+    assert session["schema_tables"] == {"orders", "customers"}
+
+def test_failed_send_leaves_tables_unsent(session, monkeypatch):
+    prompts = []
+
+    async def send_message(chat, message, priority=0):
+        prompts.append(message)
+        if len(prompts) == 1:
+            raise RuntimeError("capacity")
+        return SimpleNamespace(text="ok")
+
+    monkeypatch.setattr(ai_service.llm_client, "send_message", send_message)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await ai_service._generate_reply("pruning-test", session["chat"], "orders per customer", "ctx", "sales")
+        assert session["schema_tables"] == set()
+        await ai_service._generate_reply("pruning-test", session["chat"], "orders per customer", "ctx", "sales")
+
+    asyncio.run(scenario())
+
+    assert "orders(id)" in prompts[1]
+    assert session["schema_tables"] == {"orders", "customers"}
@@ -0,0 +1,93 @@
+"""Tests for the bounded chat session store"""
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import session_store
+from app.services.session_store import SESSION_OVERHEAD_BYTES, SessionStore, estimate_session_bytes
+
+class FakeChat:
+    def __init__(self, *texts):
+        self.texts = list(texts)
+
+    def get_history(self):
+        return [SimpleNamespace(parts=[SimpleNamespace(text=text)]) for text in self.texts]
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the session store"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(session_store.time, "time", lambda: now[0])
+    return now
+
+def test_session_limit_evicts_least_recently_used():
+    store = SessionStore(max_sessions=2)
+    store["a"] = {}
+    store["b"] = {}
+    store["a"]  # a is now the most recent
+    store["c"] = {}
+
+    assert list(store) == ["a", "c"]
+    assert store.stats()["evictions"]["lru_count"] == 1
+
+def test_touch_counts_as_use():
+    store = SessionStore(max_sessions=2)
+    store["a"] = {}
+    store["b"] = {}
+    store.touch("a")
+    store["c"] = {}
+
+    assert "a" in store and "b" not in store
+
+def test_byte_limit_evicts_and_keeps_newest_session():
+    store = SessionStore(max_bytes=3 * SESSION_OVERHEAD_BYTES)
+    store["a"] = {}
+    store["b"] = {}
+    store["big"] = {"chat": FakeChat("x" * 10 * SESSION_OVERHEAD_BYTES)}
+
+    assert list(store) == ["big"]
+    assert store.stats()["evictions"]["lru_bytes"] == 2
+
+def test_touch_re_estimates_size():
+    chat = FakeChat("hello")
+    store = SessionStore()
+    store["a"] = {"chat": chat}
+    before = store.stats()["estimated_bytes"]
+
+    chat.texts.append("x" * 10_000)
+    store.touch("a")
+
+    assert store.stats()["estimated_bytes"] == estimate_session_bytes({"chat": chat})
+    assert store.stats()["estimated_bytes"] > before + 10_000
+
+def test_delete_and_replace_keep_byte_total():
+    store = SessionStore()
+    store["a"] = {"chat": FakeChat("x" * 1000)}
+    store["a"] = {}
+    store["b"] = {}
+    del store["b"]
+
+    assert len(store) == 1
+    assert store.stats()["estimated_bytes"] == SESSION_OVERHEAD_BYTES
+
+def test_sweep_removes_idle_sessions(clock):
+    store = SessionStore(idle_ttl_seconds=60)
+    store["old"] = {}
+    clock[0] += 45
+    store["new"] = {}
+    clock[0] += 30
+
+    assert store.sweep() == 1
+    assert list(store) == ["new"]
+    assert store.stats()["evictions"]["idle"] == 1
+    assert store.stats()["estimated_bytes"] == SESSION_OVERHEAD_BYTES
+
+def test_access_resets_idle_timer(clock):
+    store = SessionStore(idle_ttl_seconds=60)
+    store["a"] = {}
+    clock[0] += 45
+    store.get("a")
+    clock[0] += 45
+
+    assert store.sweep() == 0
+    assert "a" in store
@@ -0,0 +1,82 @@
+"""Tests for single-flight request coalescing"""
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("key", compute) for _ in range(10)))
+
+    assert asyncio.run(scenario()) == ["result"] * 10
+    assert len(calls) == 1
+    assert flight.stats()["executed"] == 1
+    assert flight.stats()["coalesced"] == 9
+    assert flight.stats()["in_flight"] == 0
+
+def test_different_keys_run_separately():
+    flight = SingleFlight("test")
+
+    async def scenario():
+        async def compute(value):
+            await asyncio.sleep(0.01)
+            return value
+        return await asyncio.gather(flight.do("a", lambda: compute("a")), flight.do("b", lambda: compute("b")))
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    assert flight.stats()["executed"] == 2
+
+def test_key_is_released_after_completion():
+    flight = SingleFlight("test")
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        return len(calls)
+
+    async def scenario():
+        return await flight.do("key", compute), await flight.do("key", compute)
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+def test_exception_is_shared_and_key_released():
+    flight = SingleFlight("test")
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("boom")
+
+    async def scenario():
+        results = await asyncio.gather(flight.do("key", fail), flight.do("key", fail), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+        return await flight.do("key", lambda: asyncio.sleep(0, result="ok"))
+
+    assert asyncio.run(scenario()) == "ok"
+    assert flight.stats()["executed"] == 2
+
+def test_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight("test")
+
+    async def compute():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("key", compute))
+        second = asyncio.ensure_future(flight.do("key", compute))
+        await asyncio.sleep(0.01)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(scenario()) == "done"
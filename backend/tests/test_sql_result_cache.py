@@ -0,0 +1,158 @@
+"""Tests for the SQL SELECT result cache"""
+import asyncio
+
+import pytest
+
+from app.models.api import TableData
+from app.services import db_service, sql_result_cache
+from app.services.sql_result_cache import SqlResultCache, referenced_tables
+
+CS = "Driver={ODBC Driver 18 for SQL Server};Server=test;Database=Sales;"
+OTHER_CS = "Driver={ODBC Driver 18 for SQL Server};Server=test;Database=Hr;"
+
+def result(text="2 rows", estimated_bytes=None):
+    """Cache entry shaped like a QueryResult, optionally with a table of the given fetch-time size"""
+    if estimated_bytes is None:
+        return {"table": None, "text": text}
+    table = TableData.model_construct(headers=["value"], rows=[["x"]], row_count=1, estimated_bytes=estimated_bytes)
+    return {"table": table, "text": text}
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.time() for the cache"""
+    now = [1_000_000.0]
+    monkeypatch.setattr(sql_result_cache.time, "time", lambda: now[0])
+    return now
+
+def test_referenced_tables():
+    query = "SELECT * FROM dbo.[Orders] o JOIN Sales.Customers c ON o.CustomerId = c.Id"
+    assert referenced_tables(query) == ["orders", "customers"]
+
+def test_ttl_for():
+    cache = SqlResultCache(ttl_seconds=60, table_ttls={"Orders": 5, "Customers": 30})
+
+    assert cache.ttl_for("SELECT * FROM Products") == 60
+    assert cache.ttl_for("SELECT * FROM Orders JOIN Customers ON 1 = 1") == 5
+    assert cache.ttl_for("UPDATE Orders SET Total = 0") == 0
+    assert cache.ttl_for("SELECT * INTO Backup FROM Orders") == 0
+    assert cache.ttl_for("SELECT NEWID()") == 0
+
+@pytest.mark.parametrize("query", [
+    "SELECT COUNT(*) FROM Orders WHERE OrderDate >= CAST(GETDATE() AS date)",
+    "SELECT * FROM Orders WHERE CreatedAt > DATEADD(hour, -1, SYSDATETIME())",
+    "SELECT * FROM Orders WHERE CreatedAt > getutcdate()",
+    "SELECT * FROM Orders WHERE CreatedAt > SYSUTCDATETIME()",
+    "SELECT * FROM Orders WHERE CreatedAt > SYSDATETIMEOFFSET()",
+    "SELECT * FROM Orders WHERE CreatedAt > CURRENT_TIMESTAMP",
+])
+def test_time_relative_queries_are_not_cached(query):
+    assert SqlResultCache().ttl_for(query) == 0
+
+def test_hit_and_expiry(clock):
+    cache = SqlResultCache()
+    cache.put(CS, "select 1", result(), ttl_seconds=10)
+
+    assert cache.get(CS, "select 1") == result()
+    clock[0] += 11
+    assert cache.get(CS, "select 1") is None
+    assert cache.stats()["expirations"] == 1
+    assert cache.stats()["entries"] == 0
+
+def test_invalidate_one_connection_string():
+    cache = SqlResultCache()
+    cache.put(CS, "select 1", result(), ttl_seconds=60)
+    cache.put(CS, "select 2", result(), ttl_seconds=60)
+    cache.put(OTHER_CS, "select 1", result(), ttl_seconds=60)
+
+    assert cache.invalidate(CS) == 2
+    assert cache.get(CS, "select 1") is None
+    assert cache.get(OTHER_CS, "select 1") is not None
+    assert cache.stats()["invalidations"] == 2
+
+def test_invalidate_all():
+    cache = SqlResultCache()
+    cache.put(CS, "select 1", result(), ttl_seconds=60)
+    cache.put(OTHER_CS, "select 1", result(), ttl_seconds=60)
+
+    assert cache.invalidate() == 2
+    assert cache.stats()["entries"] == 0
+
+def test_result_of_query_in_flight_during_invalidation_is_not_stored():
+    cache = SqlResultCache()
+    generation = cache.generation(CS)
+    cache.invalidate(CS)
+    cache.put(CS, "select 1", result(), ttl_seconds=60, generation=generation)
+
+    assert cache.get(CS, "select 1") is None
+
+    # Invalidating another database doesn't affect this one's generation
+    generation = cache.generation(CS)
+    cache.invalidate(OTHER_CS)
+    cache.put(CS, "select 1", result(), ttl_seconds=60, generation=generation)
+    assert cache.get(CS, "select 1") is not None
+
+def test_byte_budget_evicts_least_recently_used():
+    entry = result(estimated_bytes=125)
+    cache = SqlResultCache(max_bytes=600)
+    cache.put(CS, "select 1", entry, ttl_seconds=60)
+    cache.put(CS, "select 2", entry, ttl_seconds=60)
+    cache.get(CS, "select 1")
+    cache.put(CS, "select 3", entry, ttl_seconds=60)
+
+    assert cache.get(CS, "select 2") is None
+    assert cache.get(CS, "select 1") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["bytes"] <= 600
+
+def test_oversized_result_is_not_stored():
+    cache = SqlResultCache(max_bytes=100)
+    cache.put(CS, "select 1", result(estimated_bytes=1000), ttl_seconds=60)
+
+    assert cache.stats()["entries"] == 0
+
+def test_repeated_select_is_served_from_cache_until_invalidated(fake_database):
+    async def run_select():
+        return await db_service.execute_sql_query_async("SELECT id, name FROM Orders", CS)
+
+    first, error = asyncio.run(run_select())
+    assert error is None
+    second, _ = asyncio.run(run_select())
+
+    assert second is first
+    assert fake_database.queries.count("SELECT id, name FROM Orders") == 1
+
+    assert db_service.invalidate_result_cache(CS) == 1
+    third, _ = asyncio.run(run_select())
+
+    assert third is not first
+    assert third["table"].rows == [[1, "alpha"], [2, "beta"]]
+    assert third["table"].estimated_bytes > 0
+    assert fake_database.queries.count("SELECT id, name FROM Orders") == 2
+
+def test_writes_bypass_cache(fake_database):
+    async def run_update():
+        return await db_service.execute_sql_query_async("UPDATE Orders SET Total = 0", CS)
+
+    asyncio.run(run_update())
+    asyncio.run(run_update())
+
+    assert fake_database.queries.count("UPDATE Orders SET Total = 0") == 2
+
+def test_flush_uses_registered_connection_string(fake_database, monkeypatch):
+    from fastapi import HTTPException
+
+    from app.api.routes import db_query
+    from app.services import database_registry
+
+    # Registered at startup with a string the settings template wouldn't reproduce exactly
+    registered = "DRIVER={ODBC Driver 18 for SQL Server};SERVER=test;DATABASE=pa;"
+    monkeypatch.setattr(database_registry, "_databases", {})
+    database_registry.register_database("pa", "schema", registered)
+    asyncio.run(db_service.execute_sql_query_async("SELECT id FROM Orders", registered))
+
+    response = asyncio.run(db_query.flush_result_cache("PA"))
+
+    assert response["entries_flushed"] == 1
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(db_query.flush_result_cache("unknown"))
+    assert raised.value.status_code == 404
@@ -81,6 +81,7 @@ function ChatPanel() {
         sqlQuery: response.sql_query,
         sqlResult: response.sql_result,
         sqlTable: response.sql_table,
+        cursorId: response.cursor_id,  // Set when sqlTable holds only the first page
         sqlError: response.sql_error
       }]);
     } catch (error) {
@@ -144,6 +145,7 @@ function ChatPanel() {
           sqlQuery: response.sql_query,
           sqlResult: response.sql_result,
           sqlTable: response.sql_table,
+          cursorId: response.cursor_id,  // Set when sqlTable holds only the first page
           sqlError: response.sql_error
         }]);
       } catch (error) {
@@ -1,18 +1,71 @@
 // MessageItem.jsx
-import React from 'react';
+import React, { useState } from 'react';
 import { jsPDF } from 'jspdf';
 import { autoTable } from 'jspdf-autotable';
+import { fetchResultPage } from '../services/api';
+
+// Rows fetched per request when loading more of a paged result / exporting it all
+const PAGE_SIZE = 100;
+const EXPORT_PAGE_SIZE = 1000;
 
 function MessageItem({ message }) {
-  const { sender, content, sqlQuery, sqlResult, sqlTable, sqlError, fileInfo, userQuestion } = message;
+  const { sender, content, sqlQuery, sqlResult, sqlTable, cursorId, sqlError, fileInfo, userQuestion } = message;
+
+  // Large results arrive as a first page plus a cursor for the rest
+  const [rows, setRows] = useState(sqlTable ? sqlTable.rows : []);
+  const [loadingRows, setLoadingRows] = useState(false);
+  const hasMoreRows = Boolean(cursorId && sqlTable && rows.length < sqlTable.row_count);
+
+  // Fetch the next count rows of a paged result after the ones already loaded
+  const fetchRows = async (loaded, count) => {
+    const page = await fetchResultPage(cursorId, loaded.length, count);
+    return [...loaded, ...page.rows];
+  };
+
+  const loadMoreRows = async () => {
+    setLoadingRows(true);
+    try {
+      setRows(await fetchRows(rows, PAGE_SIZE));
+    } catch (error) {
+      console.error('Error loading more rows:', error);
+      alert('Could not load more rows. The result may have expired - run the query again.');
+    } finally {
+      setLoadingRows(false);
+    }
+  };
+
+  // Every row of the result, fetching what hasn't been loaded yet
+  const loadAllRows = async () => {
+    let allRows = rows;
+    while (cursorId && allRows.length < sqlTable.row_count) {
+      const before = allRows.length;
+      allRows = await fetchRows(allRows, EXPORT_PAGE_SIZE);
+      if (allRows.length === before) break;
+    }
+    setRows(allRows);
+    return allRows;
+  };
 
   // PDF Export Function with Logo - Uses user question instead of SQL query
-  const exportToPDF = () => {
+  const exportToPDF = async () => {
     if (!sqlTable || !sqlTable.headers || !sqlTable.rows) {
       alert('No table data available to export');
       return;
     }
 
+    let exportRows = rows;
+    if (hasMoreRows) {
+      setLoadingRows(true);
+      try {
+        exportRows = await loadAllRows();
+      } catch (error) {
+        console.error('Error loading rows for export:', error);
+        alert(`Could not load every row - exporting the ${rows.length} rows loaded so far.`);
+      } finally {
+        setLoadingRows(false);
+      }
+    }
+
     try {
       // Create new PDF document
       const doc = new jsPDF();
@@ -108,7 +161,7 @@ function MessageItem({ message }) {
         // Add table
         autoTable(doc, {
           head: [sqlTable.headers],
-          body: sqlTable.rows,
+          body: exportRows,
           startY: currentY,
           styles: {
             fontSize: 8,
@@ -131,7 +184,7 @@ function MessageItem({ message }) {
           doc.setPage(i);
           doc.setFontSize(8);
           doc.text(
-              `Generated on ${new Date().toLocaleString()} | ${sqlTable.row_count} rows`,
+              `Generated on ${new Date().toLocaleString()} | ${exportRows.length} rows`,
               14,
               doc.internal.pageSize.height - 10
           );
@@ -181,7 +234,7 @@ function MessageItem({ message }) {
             </tr>
             </thead>
             <tbody className="bg-white dark:bg-gray-900 divide-y divide-gray-200 dark:divide-gray-800">
-            {tableData.rows.map((row, rowIndex) => (
+            {rows.map((row, rowIndex) => (
                 <tr key={rowIndex} className={rowIndex % 2 === 0 ? '' : 'bg-gray-50 dark:bg-gray-800'}>
                   {row.map((cell, cellIndex) => (
                       <td
@@ -196,15 +249,35 @@ function MessageItem({ message }) {
             </tbody>
           </table>
           <div className="mt-2 flex justify-between items-center text-xs text-gray-500 dark:text-gray-400">
-            <span>{tableData.row_count} rows returned</span>
-            {/* Export to PDF Button */}
-            <button
-                onClick={exportToPDF}
-                className="px-3 py-1 bg-blue-600 text-white rounded text-xs hover:bg-blue-700 focus:outline-none focus:ring-2 focus:ring-blue-500 focus:ring-offset-1"
-                title="Export table to PDF"
-            >
-              📄 Export PDF
-            </button>
+            <span>
+              {hasMoreRows
+                  ? `Showing ${rows.length} of ${tableData.row_count} rows`
+                  : `${tableData.row_count} rows returned`}
+              {tableData.truncated &&
+                  ` (result cut off at ${tableData.row_count} of ${tableData.total_is_exact ? '' : 'at least '}${tableData.total_rows_estimate} rows)`}
+            </span>
+            <div className="flex gap-2">
+              {/* Load the next page of a large result */}
+              {hasMoreRows && (
+                  <button
+                      onClick={loadMoreRows}
+                      disabled={loadingRows}
+                      className="px-3 py-1 bg-gray-600 text-white rounded text-xs hover:bg-gray-700 disabled:opacity-50 focus:outline-none focus:ring-2 focus:ring-gray-500 focus:ring-offset-1"
+                      title="Load more rows"
+                  >
+                    {loadingRows ? 'Loading...' : 'Load more'}
+                  </button>
+              )}
+              {/* Export to PDF Button */}
+              <button
+                  onClick={exportToPDF}
+                  disabled={loadingRows}
+                  className="px-3 py-1 bg-blue-600 text-white rounded text-xs hover:bg-blue-700 disabled:opacity-50 focus:outline-none focus:ring-2 focus:ring-blue-500 focus:ring-offset-1"
+                  title="Export table to PDF"
+              >
+                📄 Export PDF
+              </button>
+            </div>
           </div>
         </div>
     );
@@ -37,6 +37,14 @@ export const sendDbChatMessage = async (message, sessionId = null) => {
   return response.data;
 };
 
+// Fetch a page of a large result kept server-side (responses carry the first page and a cursor_id)
+export const fetchResultPage = async (cursorId, offset = 0, limit = 100) => {
+  const response = await api.get(`/db/results/${cursorId}`, {
+    params: { offset, limit }
+  });
+  return response.data;
+};
+
 export const clearDbChat = async (sessionId) => {
   const response = await api.post('/db/clear', { 
     session_id: sessionId 